@@ -0,0 +1,218 @@
+"""
+Adaptive tests
+Each next question is the one whose difficulty is closest to the
+candidate's current ability estimate in its topic, found by bisecting a
+per-topic list of questions sorted by difficulty. Difficulties are logits
+from the nightly item statistics (item_analysis.py --save); questions
+without enough responses count as average. After every answer the
+ability moves by a Rasch/Elo step sized by how much the answers so far
+already tell about it, and a topic ends once its estimate is precise
+enough, so a usable score needs fewer questions than a fixed form.
+"""
+
+import math
+import random
+import threading
+import time
+from bisect import bisect_left
+
+from assessment_engine import assessment_engine
+from db_utils import execute
+from item_analysis import MAX_DIFFICULTY
+
+MIN_QUESTIONS_PER_TOPIC = 4
+MAX_QUESTIONS_PER_TOPIC = 8
+
+# A topic ends once the standard error of its ability estimate (in logits) is below this
+TARGET_STANDARD_ERROR = 0.6
+
+# The next question is drawn from this many closest to the ability, so the
+# same few questions are not shown to everyone of similar ability
+CANDIDATES_PER_PICK = 5
+
+# Difficulties are rounded to this for the score estimate
+DIFFICULTY_BIN = 0.1
+
+# Seconds before the difficulty estimates are read from the database again
+DIFFICULTY_REFRESH_SECONDS = 3600
+
+
+def chance_correct(ability, difficulty):
+    """Rasch probability of answering a question of the given difficulty correctly"""
+    return 1 / (1 + math.exp(difficulty - ability))
+
+
+def standard_error(topic_state):
+    """Standard error of a topic's ability estimate, counting the prior as one unit of information"""
+    return 1 / math.sqrt(1 + topic_state['information'])
+
+
+class DifficultyIndex:
+    """Question indices of one bank sorted by difficulty"""
+
+    def __init__(self, size, difficulties, rng):
+        # Shuffle first so questions of equal difficulty are not always met in bank order
+        indices = list(range(size))
+        rng.shuffle(indices)
+        indices.sort(key=lambda index: difficulties.get(index, 0.0))
+        self.indices = indices
+        self.keys = [difficulties.get(index, 0.0) for index in indices]
+        self.bins = {}
+        for key in self.keys:
+            key = round(key / DIFFICULTY_BIN) * DIFFICULTY_BIN
+            self.bins[key] = self.bins.get(key, 0) + 1
+
+    def __len__(self):
+        return len(self.indices)
+
+    def nearest(self, target, exclude=(), count=1):
+        """Indices of the count questions closest in difficulty to target, skipping exclude
+
+        Bisects to target and walks outwards, so the cost is O(log n) plus
+        the number of excluded questions passed over.
+        """
+        keys = self.keys
+        high = bisect_left(keys, target)
+        low = high - 1
+        found = []
+        while len(found) < count and (low >= 0 or high < len(keys)):
+            if high < len(keys) and (low < 0 or keys[high] - target <= target - keys[low]):
+                position, high = high, high + 1
+            else:
+                position, low = low, low - 1
+            if self.indices[position] not in exclude:
+                found.append(self.indices[position])
+        return found
+
+    def expected_score(self, ability):
+        """Expected share of the whole bank answered correctly at this ability"""
+        total = sum(self.bins.values())
+        return sum(count * chance_correct(ability, key) for key, count in self.bins.items()) / total
+
+
+class AdaptiveTestEngine:
+    """Run adaptive tests over the banks of an AssessmentEngine
+
+    A test's state is a JSON-serializable dict (kept in the session): start()
+    creates it, next_question() picks the next question (None when the test
+    is over) and answer() records the reply to it.
+    """
+
+    def __init__(self, engine, rng=None):
+        self.engine = engine
+        self.rng = rng or random.Random()
+        self._difficulties = {}
+        self._loaded_at = None
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def load_difficulties(self, db):
+        """Read question difficulties from question_difficulty, at most every DIFFICULTY_REFRESH_SECONDS"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < DIFFICULTY_REFRESH_SECONDS:
+            return
+        rows = execute(db, 'SELECT question_id, difficulty FROM question_difficulty').fetchall()
+        difficulties = {}
+        for row in rows:
+            topic, _, index = row['question_id'].rpartition(':')
+            if index.isdigit():
+                difficulties.setdefault(topic, {})[int(index)] = row['difficulty']
+        with self._lock:
+            self._difficulties = difficulties
+            self._indexes = {}
+            self._loaded_at = time.monotonic()
+
+    def index(self, topic):
+        """The topic's DifficultyIndex, rebuilt when the bank has grown"""
+        size = len(self.engine.load_bank(topic))
+        with self._lock:
+            index = self._indexes.get(topic)
+            if index is None or len(index) != size:
+                index = self._indexes[topic] = DifficultyIndex(size, self._difficulties.get(topic, {}), self.rng)
+            return index
+
+    def start(self):
+        """New test state; raises ValueError if there are no banks or a bank is too small"""
+        topics = self.engine.topics()
+        if not topics:
+            raise ValueError('No question banks found')
+        for topic in topics:
+            if len(self.engine.load_bank(topic)) < MAX_QUESTIONS_PER_TOPIC:
+                raise ValueError(f"Not enough {topic} questions")
+        return {
+            'topics': {topic: {'ability': 0.0, 'information': 0.0, 'asked': []} for topic in topics},
+            'question_ids': [],
+            'answers': [],
+            'current': None
+        }
+
+    def _topic_done(self, topic_state):
+        asked = len(topic_state['asked'])
+        if asked >= MAX_QUESTIONS_PER_TOPIC:
+            return True
+        return asked >= MIN_QUESTIONS_PER_TOPIC and standard_error(topic_state) <= TARGET_STANDARD_ERROR
+
+    def next_question(self, state):
+        """The question to show now (the same one until it is answered), or None when the test is over"""
+        if state['current'] is not None:
+            return self.engine.question(state['current'])
+        open_topics = [topic for topic, topic_state in state['topics'].items() if not self._topic_done(topic_state)]
+        if not open_topics:
+            return None
+        # Alternate between topics, least asked first
+        topic = min(open_topics, key=lambda name: len(state['topics'][name]['asked']))
+        topic_state = state['topics'][topic]
+        candidates = self.index(topic).nearest(topic_state['ability'], set(topic_state['asked']), CANDIDATES_PER_PICK)
+        index = self.rng.choice(candidates)
+        topic_state['asked'].append(index)
+        state['current'] = f"{topic}:{index}"
+        return self.engine.question(state['current'])
+
+    def answer(self, state, answer):
+        """Record the answer to the current question and update the topic's ability"""
+        question = self.engine.question(state['current'])
+        topic_state = state['topics'][question['topic']]
+        index = topic_state['asked'][-1]
+        difficulty = self._difficulties.get(question['topic'], {}).get(index, 0.0)
+
+        expected = chance_correct(topic_state['ability'], difficulty)
+        correct = 1 if answer and answer == question['answer'] else 0
+        # One Newton step on the posterior with a standard normal prior, whose
+        # curvature is the information of the answers so far including this one
+        topic_state['information'] += expected * (1 - expected)
+        topic_state['ability'] += (correct - expected) / (1 + topic_state['information'])
+        topic_state['ability'] = min(max(topic_state['ability'], -MAX_DIFFICULTY), MAX_DIFFICULTY)
+
+        state['question_ids'].append(state['current'])
+        state['answers'].append(answer or None)
+        state['current'] = None
+        return bool(correct)
+
+    def result(self, state):
+        """Grade a finished test; returns (result, questions, answers) for save_result()
+
+        Topic and overall percentages are the expected share of each bank
+        answered correctly at the final ability estimates, since raw scores
+        of adaptive tests hover around half by design.
+        """
+        questions = [self.engine.question(question_id) for question_id in state['question_ids']]
+        result = self.engine.grade(questions, state['answers'])
+        for entry in result['topic_scores']:
+            topic_state = state['topics'][entry['topic']]
+            entry['ability'] = topic_state['ability']
+            entry['percentage'] = self.index(entry['topic']).expected_score(topic_state['ability']) * 100
+        scores = result['topic_scores']
+        if scores:
+            result['percentage'] = sum(entry['percentage'] for entry in scores) / len(scores)
+        result['adaptive'] = True
+        return result, questions, state['answers']
+
+    def progress(self, state):
+        """(questions answered, most questions the test can still have in total)"""
+        answered = len(state['question_ids'])
+        remaining = sum(0 if self._topic_done(topic_state) else MAX_QUESTIONS_PER_TOPIC - len(topic_state['asked'])
+                        for topic_state in state['topics'].values())
+        return answered, answered + remaining + (1 if state['current'] is not None else 0)
+
+
+# Global instance
+adaptive_test_engine = AdaptiveTestEngine(assessment_engine)
@@ -0,0 +1,217 @@
+"""
+Structured, non-blocking logging
+Log calls on request threads only put a record on a bounded in-memory
+queue; a background listener thread formats each record as one JSON line
+and writes it to stdout. Records carry the request id, route, method,
+user id and elapsed time of the request they were logged in. Each level
+has a rate limit, and records over it are sampled, so an error storm
+cannot flood the queue or slow requests down; the number of records
+dropped is reported on the next record written.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request, session
+
+import json_codec
+
+DEFAULT_QUEUE_SIZE = 10000
+
+# (records per second, burst) allowed per level before sampling starts
+LEVEL_LIMITS = {
+    logging.DEBUG: (50, 100),
+    logging.INFO: (200, 400),
+    logging.WARNING: (50, 100),
+    logging.ERROR: (20, 50),
+    logging.CRITICAL: (20, 50),
+}
+
+# Share of records over a level's limit that are still written
+OVERFLOW_SAMPLE_RATE = 0.01
+
+# Request attributes copied onto records
+CONTEXT_FIELDS = ('request_id', 'route', 'method', 'user_id', 'elapsed_ms')
+
+# Extra attributes written when present, e.g. logger.info('...', extra={'status': 200})
+EXTRA_FIELDS = ('status', 'duration_ms', 'dropped', 'job_id', 'kind')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+logger = logging.getLogger(__name__)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS + EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json_codec.dumps(entry)
+
+
+class SamplingFilter(logging.Filter):
+    """Per-level token buckets; records over the limit pass with OVERFLOW_SAMPLE_RATE"""
+
+    def __init__(self, limits=LEVEL_LIMITS, sample_rate=OVERFLOW_SAMPLE_RATE):
+        super().__init__()
+        self.limits = limits
+        self.sample_rate = sample_rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record):
+        rate, burst = self.limits.get(record.levelno, self.limits[logging.ERROR])
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(record.levelno, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[record.levelno] = (tokens - 1, now)
+            else:
+                self._buckets[record.levelno] = (tokens, now)
+                if random.random() >= self.sample_rate:
+                    self.dropped += 1
+                    return False
+            if self.dropped:
+                record.dropped, self.dropped = self.dropped, 0
+        return True
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the current request's id, route, method, user and elapsed time onto records"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            record.route = request.url_rule.rule if request.url_rule else request.path
+            record.method = request.method
+            record.user_id = session.get('user_id')
+            started = getattr(g, 'request_started', None)
+            if started is not None:
+                record.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if self.dropped:
+            record.dropped, self.dropped = (getattr(record, 'dropped', None) or 0) + self.dropped, 0
+        # Resolve the message and traceback here, where args and exc_info are
+        # still valid, but keep the structured attributes for the formatter
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """The handler on the root logger and the listener thread writing its records
+
+    With a queue_size of 0 records are written directly by the logging
+    thread, for hosts where background threads do not outlive a request.
+    """
+
+    def __init__(self, stream=None, queue_size=DEFAULT_QUEUE_SIZE):
+        self.output = logging.StreamHandler(stream or sys.stdout)
+        self.output.setFormatter(JSONFormatter())
+        self.queue = queue.Queue(maxsize=queue_size) if queue_size else None
+        self.handler = NonBlockingQueueHandler(self.queue) if self.queue is not None else self.output
+        self.handler.addFilter(SamplingFilter())
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = None
+
+    def start(self):
+        if self.queue is not None:
+            self.listener = QueueListener(self.queue, self.output)
+            self.listener.start()
+
+    def restart_after_fork(self):
+        """The listener thread does not survive fork(); start a fresh one in the child"""
+        if self.queue is not None:
+            self.queue = self.handler.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self.start()
+
+    def stop(self):
+        """Write out everything queued and stop the listener"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+
+_pipeline = None
+
+
+def configure_logging(level=logging.INFO, queue_size=DEFAULT_QUEUE_SIZE, stream=None):
+    """Send every log record through the queue to a JSON writer thread; safe to call twice"""
+    global _pipeline
+    if _pipeline is not None:
+        return _pipeline
+    _pipeline = LogPipeline(stream, queue_size)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_pipeline.handler)
+    root.setLevel(level)
+    _pipeline.start()
+    os.register_at_fork(after_in_child=_pipeline.restart_after_fork)
+    atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def init_app(app):
+    """Configure logging from app config and log one access line per request"""
+    configure_logging(app.config.get('LOG_LEVEL', 'INFO'), app.config.get('LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+    log_requests = app.config.get('LOG_REQUESTS', True)
+    if log_requests:
+        # The development server's own access lines would log every request twice
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    @app.before_request
+    def start_request_log():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER, '')[:64] or uuid.uuid4().hex[:16]
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def finish_request_log(response):
+        response.headers.setdefault(REQUEST_ID_HEADER, getattr(g, 'request_id', ''))
+        if log_requests and request.endpoint != 'static':
+            # elapsed_ms on the record is the request's duration so far
+            logger.info('%s %s %s', request.method, request.path, response.status_code,
+                        extra={'status': response.status_code})
+        return response
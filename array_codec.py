@@ -0,0 +1,26 @@
+"""
+Binary array serialization
+The compiled topic graphs and question banks store their tables as raw
+array.array sections in little-endian byte order, whatever the byte order
+of the machine that wrote or reads them.
+"""
+
+import array
+import sys
+
+
+def to_bytes(values):
+    """Little-endian bytes of an array"""
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_bytes(typecode, data):
+    """Array of typecode decoded from little-endian bytes"""
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
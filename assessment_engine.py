@@ -0,0 +1,206 @@
+"""
+Multi-topic assessment engine
+Every <topic>_mcqs.json file next to the app, and every compiled bank in
+question_banks/, is a question bank. A test draws the same number of
+questions from each bank, is graded in one pass with per-topic counters,
+and its per-topic scores are stored as rows of test_topic_scores, so a new
+bank needs neither code nor schema changes.
+"""
+
+import json
+import os
+import random
+
+from db_utils import execute, executemany
+from question_bank import BANK_EXTENSION, BANKS_DIR, QuestionBank, bank_path
+
+BANK_DIR = os.path.dirname(os.path.abspath(__file__))
+BANK_SUFFIX = '_mcqs.json'
+QUESTIONS_PER_TOPIC = 10
+
+# Display names for topics whose id does not title-case well
+TOPIC_LABELS = {
+    'cpp': 'C++',
+    'javascript': 'JavaScript',
+    'sql': 'SQL',
+}
+
+# Topics stored in the fixed test_results columns before test_topic_scores existed
+LEGACY_SCORE_COLUMNS = {'python': 'python_score', 'cpp': 'cpp_score'}
+
+TOPIC_SCORE_INSERT = 'INSERT INTO test_topic_scores (result_id, topic, score, questions) VALUES (?, ?, ?, ?)'
+RESPONSE_INSERT = ('INSERT INTO test_responses (result_id, position, question_id, answer, correct) '
+                   'VALUES (?, ?, ?, ?, ?)')
+
+
+def topic_label(topic):
+    """Human readable name of a topic id"""
+    return TOPIC_LABELS.get(topic, topic.replace('_', ' ').title())
+
+
+class AssessmentEngine:
+    """Assemble and grade tests across every question bank in a directory"""
+
+    def __init__(self, bank_dir, questions_per_topic=QUESTIONS_PER_TOPIC, compiled_dir=BANKS_DIR):
+        self.bank_dir = bank_dir
+        self.compiled_dir = compiled_dir
+        self.questions_per_topic = questions_per_topic
+        self._topics = None
+        self._banks = {}
+
+    def topics(self):
+        """Sorted topic ids of the JSON and compiled banks"""
+        if self._topics is None:
+            topics = {name[:-len(BANK_SUFFIX)] for name in os.listdir(self.bank_dir) if name.endswith(BANK_SUFFIX)}
+            if os.path.isdir(self.compiled_dir):
+                topics.update(name[:-len(BANK_EXTENSION)] for name in os.listdir(self.compiled_dir)
+                              if name.endswith(BANK_EXTENSION))
+            self._topics = sorted(topics)
+        return self._topics
+
+    def bank_path(self, topic):
+        """Path of a topic's question file"""
+        return os.path.join(self.bank_dir, topic + BANK_SUFFIX)
+
+    def load_bank(self, topic):
+        """Return a topic's questions as a read-only sequence, loaded once per process
+
+        A compiled bank at least as new as the JSON file is memory-mapped and
+        decodes questions on access; otherwise the JSON file is parsed. Every
+        question carries 'id' ('<topic>:<index>') and 'topic'. Callers must
+        not modify the questions.
+        """
+        questions = self._banks.get(topic)
+        if questions is None or (isinstance(questions, QuestionBank) and questions.is_stale()):
+            questions = self._banks[topic] = self._open_bank(topic)
+        return questions
+
+    def _open_bank(self, topic):
+        source = self.bank_path(topic)
+        compiled = bank_path(topic, self.compiled_dir)
+        if os.path.exists(compiled) and (not os.path.exists(source) or
+                                         os.path.getmtime(compiled) >= os.path.getmtime(source)):
+            return QuestionBank(compiled, topic)
+        with open(source, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+        for index, question in enumerate(questions):
+            question['id'] = f"{topic}:{index}"
+            question['topic'] = topic
+        return tuple(questions)
+
+    def question(self, question_id):
+        """Look up a question by id; raises KeyError for unknown ids"""
+        topic, _, index = question_id.rpartition(':')
+        if topic not in self.topics() or not index.isdigit():
+            raise KeyError(question_id)
+        try:
+            return self.load_bank(topic)[int(index)]
+        except IndexError:
+            raise KeyError(question_id) from None
+
+    def assemble(self, rng=random):
+        """Draw questions_per_topic questions from every bank, shuffled together
+
+        Raises ValueError if there are no banks or a bank is too small.
+        """
+        topics = self.topics()
+        if not topics:
+            raise ValueError('No question banks found')
+        questions = []
+        for topic in topics:
+            bank = self.load_bank(topic)
+            if len(bank) < self.questions_per_topic:
+                raise ValueError(f"Not enough {topic} questions: {len(bank)}")
+            questions.extend(bank[index] for index in rng.sample(range(len(bank)), self.questions_per_topic))
+        rng.shuffle(questions)
+        return questions
+
+    def grade(self, questions, answers):
+        """Grade answers (one per question, None if unanswered) in a single pass
+
+        Returns {'topic_scores': [{'topic', 'label', 'score', 'questions', 'percentage'}],
+        'total_score', 'total_questions', 'percentage'}.
+        """
+        counters = {}
+        for question, answer in zip(questions, answers):
+            counter = counters.get(question['topic'])
+            if counter is None:
+                counter = counters[question['topic']] = [0, 0]
+            counter[1] += 1
+            if answer and answer == question['answer']:
+                counter[0] += 1
+
+        total_score = sum(score for score, _ in counters.values())
+        total_questions = len(questions)
+        return {
+            'topic_scores': [{'topic': topic, 'label': topic_label(topic), 'score': score, 'questions': count,
+                              'percentage': score / count * 100}
+                             for topic, (score, count) in sorted(counters.items())],
+            'total_score': total_score,
+            'total_questions': total_questions,
+            'percentage': total_score / total_questions * 100 if total_questions else 0
+        }
+
+
+def option_key(question, answer):
+    """answer if it is one of the question's option keys, else None"""
+    return answer if isinstance(answer, str) and answer in question.get('options', {}) else None
+
+
+def save_result(db, user_id, user_name, result, questions=(), answers=()):
+    """Insert a graded test, its per-topic scores and its answers; returns the result id
+
+    questions and answers are the ones passed to grade(); each answer is
+    stored with whether it was correct, for item_analysis.py. Answers that
+    are not one of the question's option keys are stored as None.
+    """
+    scores = {entry['topic']: entry['score'] for entry in result['topic_scores']}
+    row = execute(db, '''
+        INSERT INTO test_results (user_id, user_name, python_score, cpp_score, total_score, percentage)
+        VALUES (?, ?, ?, ?, ?, ?) RETURNING id
+    ''', (user_id, user_name, scores.get('python', 0), scores.get('cpp', 0), result['total_score'],
+          result['percentage'])).fetchone()
+    result_id = row['id']
+    executemany(db, TOPIC_SCORE_INSERT, [
+        (result_id, entry['topic'], entry['score'], entry['questions']) for entry in result['topic_scores']
+    ])
+    if questions:
+        executemany(db, RESPONSE_INSERT, [
+            (result_id, position, question['id'], answer, int(answer is not None and answer == question['answer']))
+            for position, (question, answer) in enumerate(zip(questions, map(option_key, questions, answers)))
+        ])
+    return result_id
+
+
+def attach_topic_scores(db, results):
+    """Return test_results rows as dicts with their 'topic_scores'
+
+    Results saved before test_topic_scores existed get theirs from the
+    python_score and cpp_score columns.
+    """
+    results = [dict(row) for row in results]
+    if not results:
+        return results
+    ids = [result['id'] for result in results]
+    rows = execute(db, f'''
+        SELECT result_id, topic, score, questions FROM test_topic_scores
+        WHERE result_id IN ({', '.join('?' for _ in ids)}) ORDER BY topic
+    ''', ids).fetchall()
+    by_result = {}
+    for row in rows:
+        by_result.setdefault(row['result_id'], []).append({
+            'topic': row['topic'], 'label': topic_label(row['topic']),
+            'score': row['score'], 'questions': row['questions']
+        })
+    for result in results:
+        result['topic_scores'] = by_result.get(result['id']) or [
+            {'topic': topic, 'label': topic_label(topic), 'score': result.get(column) or 0,
+             'questions': QUESTIONS_PER_TOPIC}
+            for topic, column in sorted(LEGACY_SCORE_COLUMNS.items())
+        ]
+        result['total_questions'] = sum(entry['questions'] for entry in result['topic_scores'])
+    return results
+
+
+# Global instance
+assessment_engine = AssessmentEngine(BANK_DIR)
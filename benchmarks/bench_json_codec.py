@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Compare json_codec with the standard library on generated roadmaps
+
+Times encoding and decoding full roadmaps, the work done by every roadmap
+save and read, with whichever backend json_codec picked and with stdlib
+json.
+
+Usage:
+    python benchmarks/bench_json_codec.py [iterations]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import json_codec  # noqa: E402
+from enhanced_roadmap_generator import SPECIALIZATION_MAPPING, enhanced_roadmap_generator  # noqa: E402
+
+
+def rate(func, payloads, iterations):
+    """Payloads handled per second"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for payload in payloads:
+            func(payload)
+    return iterations * len(payloads) / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    random.seed(42)
+    roadmaps = [enhanced_roadmap_generator.generate_enhanced_roadmap({'specialization': specialization}).to_dict()
+                for specialization in SPECIALIZATION_MAPPING]
+    documents = [json.dumps(roadmap) for roadmap in roadmaps]
+    size = sum(len(document) for document in documents) // len(documents)
+
+    backend = 'orjson' if json_codec.ORJSON_AVAILABLE else 'stdlib'
+    print(f"roadmaps: {len(roadmaps)}, average {size / 1024:.1f} KiB, json_codec backend: {backend}")
+    print(f"{'':18}{'stdlib':>12}{'json_codec':>12}")
+    for name, stdlib, codec, payloads in (
+        ('dumps', json.dumps, json_codec.dumps, roadmaps),
+        ('loads', json.loads, json_codec.loads, documents),
+    ):
+        stdlib_rate = rate(stdlib, payloads, iterations)
+        codec_rate = rate(codec, payloads, iterations)
+        print(f"{name + ' (per s)':18}{stdlib_rate:>12,.0f}{codec_rate:>12,.0f}  x{codec_rate / stdlib_rate:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Time the per-user database helpers of index.py on a large seeded database
+
+Seeds a throwaway SQLite database with seed_data.py (or uses the one
+given), then calls get_all_test_results, get_latest_test_result,
+get_user_roadmap_head and save_user_roadmap for random seeded users and
+reports latency percentiles. The query plans of slow statements are in
+the slow-query log printed at the end.
+
+Usage:
+    python benchmarks/bench_queries_at_scale.py [users] [calls] [existing seeded database]
+"""
+
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import index  # noqa: E402
+import seed_data  # noqa: E402
+from query_trace import slow_query_log  # noqa: E402
+
+
+def measure(label, call, user_ids):
+    timings = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        call(user_id)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{label:26}{statistics.median(timings) * 1000:>10.2f}{timings[int(len(timings) * 0.95)] * 1000:>10.2f}")
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    workdir = tempfile.mkdtemp()
+    try:
+        if len(sys.argv) > 3:
+            db_path = sys.argv[3]
+        else:
+            db_path = os.path.join(workdir, 'seed.db')
+            start = time.perf_counter()
+            conn = seed_data.connect(db_path)
+            seeder = seed_data.Seeder(random.Random(1), seed_data.datetime(2026, 1, 1), roadmap_share=0.3)
+            rows = sum(seed_data.seed(conn, users, seeder).values())
+            conn.close()
+            print(f"seeded {users} users, {rows} rows in {time.perf_counter() - start:.1f} s")
+        index.app.config['DATABASE_PATH'] = db_path
+        slow_query_log.threshold_ms = 5
+
+        rng = random.Random(2)
+        user_ids = [rng.randint(1, users) for _ in range(calls)]
+        roadmap = index.get_user_roadmap(next(user_id for user_id in range(1, users + 1)
+                                              if index.get_user_roadmap(user_id)))
+
+        print(f"{'helper':26}{'p50 ms':>10}{'p95 ms':>10}")
+        measure('get_all_test_results', index.get_all_test_results, user_ids)
+        measure('get_latest_test_result', index.get_latest_test_result, user_ids)
+        measure('get_user_roadmap_head', index.get_user_roadmap_head, user_ids)
+        measure('save_user_roadmap', lambda user_id: index.save_user_roadmap(user_id, roadmap, 'draft'), user_ids)
+
+        seen = set()
+        for entry in slow_query_log.recent():
+            if entry['sql'] not in seen:
+                seen.add(entry['sql'])
+                print(f"\nslow ({entry['duration_ms']} ms): {entry['sql']}")
+                for line in entry['plan'] or ():
+                    print(f"    {line}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
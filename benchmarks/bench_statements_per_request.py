@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Count SQL statements issued per request on the write-heavy routes
+
+Runs the Flask app against a throwaway copy of users.db and records every
+statement SQLite executes for each request.
+
+Usage:
+    python benchmarks/bench_statements_per_request.py
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STATEMENTS = []
+_connect = sqlite3.connect
+
+
+def _traced_connect(*args, **kwargs):
+    conn = _connect(*args, **kwargs)
+    conn.set_trace_callback(STATEMENTS.append)
+    return conn
+
+
+sqlite3.connect = _traced_connect
+
+import index  # noqa: E402
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+QUESTIONNAIRE_FORM = {
+    'role': 'student',
+    'company': 'google',
+    'position': 'software_engineer',
+    'skills': ['python', 'javascript'],
+    'specialization': 'web_development',
+    'skill_focus': 'hard_skills'
+}
+
+
+def run_request(client, label, method, path, repeat=20, **kwargs):
+    """Issue a request several times and report statements per request"""
+    STATEMENTS.clear()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = getattr(client, method)(path, **kwargs)
+        assert response.status_code < 500, f"{label} failed with {response.status_code}"
+    elapsed = (time.perf_counter() - start) / repeat
+    statements = [s for s in STATEMENTS if s not in ('BEGIN ', 'COMMIT')]
+    writes = sum(1 for s in statements if s.lstrip().upper().startswith(WRITE_PREFIXES))
+    print(f"{label:<28} {len(statements) / repeat:>10.1f} {writes / repeat:>8.1f} {elapsed * 1000:>10.2f}")
+    return response
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(workdir, 'users.db')
+        shutil.copy(os.path.join(ROOT, 'users.db'), db_path)
+        index.app.config['DATABASE_PATH'] = db_path
+        index.init_db()
+        # Run generation jobs inline so their statements are counted with the request
+        index.job_queue.db_path = os.path.join(workdir, 'jobs.db')
+        index.job_queue.max_workers = 0
+
+        conn = _connect(db_path)
+        user_id = conn.execute('SELECT MAX(id) FROM users').fetchone()[0]
+        conn.close()
+
+        client = index.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['user_name'] = 'bench'
+
+        print(f"{'route':<28} {'stmts/req':>10} {'writes':>8} {'ms/req':>10}")
+        run_request(client, 'GET /questionnaire', 'get', '/questionnaire')
+        run_request(client, 'POST /questionnaire', 'post', '/questionnaire', repeat=1, data=QUESTIONNAIRE_FORM)
+        response = run_request(client, 'POST /generate-roadmap', 'post', '/generate-roadmap',
+                               data={'skill_level': 'Intermediate', 'duration': '12', 'focus_area': 'practical'})
+        roadmap = client.get(response.get_json()['status_url']).get_json().get('roadmap')
+        run_request(client, 'POST /save-roadmap-draft', 'post', '/save-roadmap-draft',
+                    json={'roadmap': roadmap, 'status': 'draft'})
+        run_request(client, 'POST /accept-roadmap', 'post', '/accept-roadmap',
+                    json={'roadmap': roadmap, 'status': 'accepted'})
+        run_request(client, 'POST /update-roadmap-progress', 'post', '/update-roadmap-progress',
+                    json={'topic_id': '1.1'})
+        run_request(client, 'GET /dashboard', 'get', '/dashboard')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Measure first-request latency in a fresh process with and without the
+Jinja bytecode cache
+
+Each run starts a new interpreter, imports the app against a copy of
+users.db and times the first and second GET /dashboard plus loading the
+largest template. The cache is filled beforehand with template_cache.py.
+
+Usage:
+    python benchmarks/bench_template_cold_start.py [runs]
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LARGEST_TEMPLATE = 'DefaultDashboard.html'
+
+
+def child(db_path):
+    """Runs in the fresh process: print first, second and template timings in ms"""
+    import index
+
+    index.app.config['DATABASE_PATH'] = db_path
+    client = index.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 2
+        session['user_name'] = 'bench'
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        client.get('/dashboard')
+        timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    index.app.jinja_env.get_template(LARGEST_TEMPLATE)
+    timings.append(time.perf_counter() - start)
+    print(' '.join(f"{timing * 1000:.2f}" for timing in timings))
+
+
+def run(cache_dir, db_path):
+    env = dict(os.environ, JINJA_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, __file__, '--child', db_path], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return [float(value) for value in output.strip().splitlines()[-1].split()]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    tmp = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(tmp, 'users.db')
+        shutil.copy(os.path.join(ROOT, 'users.db'), db_path)
+        cache_dir = os.path.join(tmp, 'jinja_cache')
+        subprocess.run([sys.executable, os.path.join(ROOT, 'template_cache.py'), cache_dir], cwd=ROOT,
+                       capture_output=True, check=True)
+
+        print(f"{'median of ' + str(runs) + ' runs (ms)':28}{'1st /dashboard':>16}{'2nd /dashboard':>16}"
+              f"{LARGEST_TEMPLATE:>24}")
+        for label, directory in (('no bytecode cache', ''), ('bytecode cache', cache_dir)):
+            results = [run(directory, db_path) for _ in range(runs)]
+            medians = [statistics.median(column) for column in zip(*results)]
+            print(f"{label:28}{medians[0]:>16.2f}{medians[1]:>16.2f}{medians[2]:>24.2f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+    else:
+        main()
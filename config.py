@@ -20,15 +20,50 @@ class Config:
         FIREBASE_CLIENT_EMAIL = os.environ.get('FIREBASE_CLIENT_EMAIL')
         USE_FIREBASE = True
         USE_SQLITE = False
+        # Only /tmp is writable, and threads do not outlive a serverless request
+        JOBS_DATABASE_PATH = '/tmp/jobs.db'
+        JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS', 0))
+        TEST_FORM_POOL_SIZE = int(os.environ.get('TEST_FORM_POOL_SIZE', 0))
+        LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 0))
     else:
         # Local development - can use SQLite or Firebase
         DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db')
         USE_SQLITE = True
         USE_FIREBASE = False
+        JOBS_DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.db')
+        JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS', 2))
+        # Ready test forms kept per process by a background thread; 0 assembles each on demand
+        TEST_FORM_POOL_SIZE = int(os.environ.get('TEST_FORM_POOL_SIZE', 16))
+        # Log records queued for the writer thread before new ones are dropped; 0 writes inline
+        LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
     
     # Application settings
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     
+    # JSON logs on stdout; LOG_REQUESTS adds one access line per request
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_REQUESTS = os.environ.get('LOG_REQUESTS', 'True').lower() == 'true'
+    
+    # Statements slower than this many ms are logged with their query plan; 0 disables tracing
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 200))
+    
+    # Users allowed to see /admin/slow-queries, e.g. ADMIN_USER_IDS=1,7
+    ADMIN_USER_IDS = frozenset(int(user_id) for user_id in os.environ.get('ADMIN_USER_IDS', '').split(',')
+                               if user_id.strip())
+    
+    # In-process profile cache (user row, preferences, profile completion)
+    PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 1024))
+    PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 300))
+    
+    # In-process cache of active roadmaps as compact Roadmap objects
+    ROADMAP_CACHE_SIZE = int(os.environ.get('ROADMAP_CACHE_SIZE', 256))
+    ROADMAP_CACHE_TTL = int(os.environ.get('ROADMAP_CACHE_TTL', 300))
+    
+    # Compiled Jinja templates, filled by template_cache.py before deploying; empty disables
+    JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR',
+                                     os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jinja_cache'))
+    
     @staticmethod
     def init_app(app):
         """Initialize application with configuration"""
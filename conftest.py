@@ -0,0 +1,57 @@
+"""
+Shared pytest fixtures
+The app runs against a fresh SQLite database in a temporary directory, so
+tests never touch users.db.
+"""
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import index
+from profile_cache import profile_cache
+from roadmap_model import roadmap_cache
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setitem(index.app.config, 'DATABASE_PATH', str(tmp_path / 'users.db'))
+    monkeypatch.setitem(index.app.config, 'TESTING', True)
+    index.init_db()
+    profile_cache.clear()
+    roadmap_cache.clear()
+    yield index.app
+    profile_cache.clear()
+    roadmap_cache.clear()
+
+
+@pytest.fixture
+def db(app):
+    conn = index.get_db()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def user_id(db):
+    """A user who has filled in the questionnaire"""
+    cursor = db.execute('INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+                        ('Test User', 'test@example.com', generate_password_hash('secret')))
+    new_user_id = cursor.lastrowid
+    db.execute('''
+        INSERT INTO user_preferences (user_id, user_name, role, target_company, position, previous_skills,
+                                      specialization, skill_focus)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (new_user_id, 'Test User', 'Student', 'Tech Company', 'Developer', 'python', 'web_development',
+          'Beginner'))
+    db.commit()
+    return new_user_id
+
+
+@pytest.fixture
+def client(app, user_id):
+    """Test client logged in as user_id"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_name'] = 'Test User'
+    return client
@@ -0,0 +1,93 @@
+"""
+Backend-neutral SQL helpers
+Lets the same qmark-style queries run on SQLite (local) and PostgreSQL (Vercel)
+"""
+
+import sqlite3
+
+# Schema changes applied after the CREATE TABLE statements on both backends.
+# Every statement must be idempotent because init_db runs on each start.
+MIGRATIONS = [
+    # Older databases can hold several preference/roadmap rows per user.
+    # Keep the row the app used to read and add the unique keys the upserts need.
+    'DELETE FROM user_preferences WHERE id NOT IN (SELECT MIN(id) FROM user_preferences GROUP BY user_id)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_user_preferences_user_id ON user_preferences (user_id)',
+    # user_roadmaps holds one head per (user, status); history lives in roadmap_versions
+    'DELETE FROM user_roadmaps WHERE id NOT IN (SELECT MAX(id) FROM user_roadmaps GROUP BY user_id, status)',
+    'DROP INDEX IF EXISTS idx_user_roadmaps_user_id',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_user_roadmaps_user_status ON user_roadmaps (user_id, status)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_roadmap_versions_user_version ON roadmap_versions (user_id, version)',
+]
+
+# Columns added to existing tables: (table, column, definition)
+COLUMN_MIGRATIONS = [
+    ('user_roadmaps', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+    ('user_roadmaps', 'status', "VARCHAR(20) NOT NULL DEFAULT 'accepted'"),
+    ('user_roadmaps', 'phase_index', 'TEXT'),
+    # Bitset of previous_skills over skill_matching.SKILL_VOCABULARY (NULL until the questionnaire is saved again)
+    ('user_preferences', 'skills_mask', 'INTEGER'),
+]
+
+
+def is_sqlite(conn):
+    """Check whether a connection is a SQLite connection"""
+    return isinstance(conn, sqlite3.Connection)
+
+
+def adapt_query(query, conn):
+    """Translate qmark placeholders to the paramstyle of the connection"""
+    if is_sqlite(conn):
+        return query
+    return query.replace('?', '%s')
+
+
+def execute(conn, query, params=()):
+    """Execute a qmark-style query on either backend"""
+    return conn.execute(adapt_query(query, conn), params)
+
+
+def executemany(conn, query, rows):
+    """Execute a qmark-style statement once per row of parameters, in one batch"""
+    cursor = conn.cursor()
+    cursor.executemany(adapt_query(query, conn), rows)
+    return cursor
+
+
+def upsert_query(table, columns, conflict_columns, update_columns, touch_columns=(),
+                 increment_columns=(), returning=()):
+    """Build an INSERT ... ON CONFLICT DO UPDATE statement
+
+    The syntax is shared by SQLite (3.24+) and PostgreSQL, so one statement
+    replaces the SELECT-then-UPDATE/INSERT round trips on both backends.
+    touch_columns are set to CURRENT_TIMESTAMP and increment_columns are
+    bumped by one when an existing row is updated. RETURNING needs SQLite 3.35+.
+    """
+    assignments = [f'{column} = excluded.{column}' for column in update_columns]
+    assignments += [f'{column} = CURRENT_TIMESTAMP' for column in touch_columns]
+    assignments += [f'{column} = {table}.{column} + 1' for column in increment_columns]
+    query = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {', '.join(assignments)}"
+    )
+    if returning:
+        query += f" RETURNING {', '.join(returning)}"
+    return query
+
+
+def add_column_if_missing(cursor, table, column, definition):
+    """Add a column to an existing table unless it is already there"""
+    if isinstance(cursor, sqlite3.Cursor):
+        existing = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()]
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    else:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}')
+
+
+def apply_migrations(cursor):
+    """Run the idempotent schema migrations on an open cursor"""
+    for table, column, definition in COLUMN_MIGRATIONS:
+        add_column_if_missing(cursor, table, column, definition)
+    for statement in MIGRATIONS:
+        cursor.execute(statement)
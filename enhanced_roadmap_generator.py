@@ -1,12 +1,29 @@
 import json
 import random
 from datetime import datetime, timedelta
+from prerequisite_engine import complete_topics, init_progress
+from roadmap_model import Roadmap, as_dict
 from roadmap_references import get_roadmap_reference, get_roadmap_url
+from scheduler import WeeklyScheduler, budget_for_weeks, estimate_topic_hours
+from skill_matching import is_known, mask_skills, skills_mask, topic_mask
+from topic_graph import apply_topic_graph
+
+# Map questionnaire values to roadmap template keys
+SPECIALIZATION_MAPPING = {
+    'web_development': 'Web Development',
+    'mobile_development': 'Mobile Development',
+    'machine_learning': 'Machine Learning',
+    'data_science': 'Data Science',
+    'cloud_computing': 'Cloud Computing',
+    'cybersecurity': 'CyberSecurity'
+}
 
 class EnhancedRoadmapGenerator:
     """Enhanced AI-based personalized roadmap generator with advanced features"""
     
-    def __init__(self):
+    def __init__(self, rng=random):
+        # Draws resources, milestones and exercises; a random.Random makes generation reproducible
+        self.rng = rng
         self.roadmap_templates = self._load_roadmap_templates()
         self.skill_levels = {
             'Beginner': {'weeks': 8, 'difficulty': 1, 'topics': 5},
@@ -178,18 +195,18 @@ class EnhancedRoadmapGenerator:
     
     def generate_enhanced_roadmap(self, user_preferences):
         """Generate enhanced personalized roadmap based on user preferences"""
-        # Map questionnaire values to roadmap template keys
-        specialization_mapping = {
-            'web_development': 'Web Development',
-            'mobile_development': 'Mobile Development',
-            'machine_learning': 'Machine Learning',
-            'data_science': 'Data Science',
-            'cloud_computing': 'Cloud Computing',
-            'cybersecurity': 'CyberSecurity'
-        }
-        
+        for event, data in self.stream_enhanced_roadmap(user_preferences):
+            if event == 'roadmap':
+                return data
+    
+    def stream_enhanced_roadmap(self, user_preferences):
+        """Generate a roadmap incrementally
+
+        Yields ('phase', phase) as soon as each phase is built, then
+        ('roadmap', roadmap) with the complete document as a compact Roadmap.
+        """
         raw_specialization = user_preferences.get('specialization', 'web_development')
-        specialization = specialization_mapping.get(raw_specialization, 'Web Development')
+        specialization = SPECIALIZATION_MAPPING.get(raw_specialization, 'Web Development')
         
         # Map skill focus values
         skill_focus_mapping = {
@@ -198,7 +215,8 @@ class EnhancedRoadmapGenerator:
         }
         
         raw_skill_focus = user_preferences.get('skill_focus', 'soft_skills')
-        skill_focus = skill_focus_mapping.get(raw_skill_focus, 'Beginner')
+        skill_focus = skill_focus_mapping.get(raw_skill_focus,
+                                              raw_skill_focus if raw_skill_focus in self.skill_levels else 'Beginner')
         
         target_company = user_preferences.get('target_company', 'Tech Company')
         position = user_preferences.get('position', 'Developer')
@@ -213,13 +231,33 @@ class EnhancedRoadmapGenerator:
             total_weeks = skill_config['weeks']
         
         # Get roadmap template for specialization
-        template = self.roadmap_templates.get(specialization, self.roadmap_templates['Web Development'])
+        template, topic_graph = self._get_roadmap_template(specialization)
         skill_config = self.skill_levels.get(skill_focus, self.skill_levels['Beginner'])
         
         start_date = datetime.now()
         
+        # Topics covered by skills the user already has are fast-tracked
+        known_skills = user_preferences.get('skills_mask')
+        if known_skills is None:
+            known_skills = skills_mask(user_preferences.get('previous_skills'))
+        
+        # Pack topics into weeks of the user's study budget, or the budget that fits the duration
+        phase_configs = self._plan_phases(template, skill_config)
+        phase_hours = [
+            [estimate_topic_hours(i, skill_focus, self._is_fast_tracked(topic, i, known_skills))
+             for topic in config['topics']]
+            for i, config in enumerate(phase_configs)
+        ]
+        weekly_hours = user_preferences.get('weekly_hours') or budget_for_weeks(phase_hours, total_weeks)
+        scheduler = WeeklyScheduler(int(weekly_hours))
+        
         # Generate roadmap phases
-        roadmap_phases = self._generate_enhanced_phases(template, skill_config, total_weeks, user_preferences)
+        roadmap_phases = []
+        for phase in self._iter_enhanced_phases(phase_configs, phase_hours, scheduler, skill_config,
+                                                 user_preferences, topic_graph, known_skills):
+            roadmap_phases.append(phase)
+            yield 'phase', phase
+        total_weeks = scheduler.last_week
         
         # Get roadmap.sh reference
         roadmap_reference = get_roadmap_reference(specialization)
@@ -233,7 +271,8 @@ class EnhancedRoadmapGenerator:
                 'target_position': position,
                 'estimated_completion': (start_date + timedelta(weeks=total_weeks)).strftime('%B %Y'),
                 'learning_goals': user_preferences.get('learning_goals', ''),
-                'focus_area': user_preferences.get('focus_area', '')
+                'focus_area': user_preferences.get('focus_area', ''),
+                'known_skills': mask_skills(known_skills)
             },
             'timeline': {
                 'total_weeks': total_weeks,
@@ -241,6 +280,10 @@ class EnhancedRoadmapGenerator:
                 'end_date': (start_date + timedelta(weeks=total_weeks)).strftime('%B %d, %Y')
             },
             'phases': roadmap_phases,
+            'schedule': {
+                'weekly_hours': scheduler.weekly_hours,
+                'total_hours': sum(sum(hours) for hours in phase_hours)
+            },
             'progress': {
                 'current_phase': 0,
                 'completed_topics': 0,
@@ -262,34 +305,63 @@ class EnhancedRoadmapGenerator:
             }
         }
         
-        return roadmap
-    
-    def _generate_enhanced_phases(self, template, skill_config, total_weeks, user_preferences):
-        """Generate enhanced learning phases based on template and skill level"""
-        phases = []
-        weeks_per_phase = total_weeks // 4  # 4 main phases
+        # Prerequisite counters and the frontier of topics ready to study
+        init_progress(roadmap)
         
+        yield 'roadmap', Roadmap.from_dict(roadmap)
+    
+    def _get_roadmap_template(self, specialization):
+        """Return (template, topic_graph) for a specialization; see apply_topic_graph"""
+        template = self.roadmap_templates.get(specialization, self.roadmap_templates['Web Development'])
+        return apply_topic_graph(template, get_roadmap_url(specialization))
+    
+    def required_skills_mask(self, raw_specialization):
+        """Bitset of the skills a specialization's roadmap topics require"""
+        specialization = SPECIALIZATION_MAPPING.get(raw_specialization, 'Web Development')
+        template, _ = self._get_roadmap_template(specialization)
+        mask = 0
+        for topics in template.values():
+            for topic in topics:
+                mask |= topic_mask(topic)
+        return mask
+    
+    def _plan_phases(self, template, skill_config):
+        """Pick the phase names and topics for a template and skill level"""
         # Determine the correct core skills key based on specialization
         core_key = 'core_ml' if 'core_ml' in template else 'core_web' if 'core_web' in template else 'core_mobile' if 'core_mobile' in template else 'core_cloud' if 'core_cloud' in template else 'core_ds' if 'core_ds' in template else 'core_sec' if 'core_sec' in template else 'core_web'
         
         phase_configs = [
-            {'name': 'Foundation', 'topics': template['foundations'], 'weeks': weeks_per_phase},
-            {'name': 'Core Skills', 'topics': template[core_key], 'weeks': weeks_per_phase},
-            {'name': 'Advanced Topics', 'topics': template['advanced'], 'weeks': weeks_per_phase},
-            {'name': 'Projects & Portfolio', 'topics': template['projects'], 'weeks': weeks_per_phase}
+            {'name': 'Foundation', 'topics': template['foundations']},
+            {'name': 'Core Skills', 'topics': template[core_key]},
+            {'name': 'Advanced Topics', 'topics': template['advanced']},
+            {'name': 'Projects & Portfolio', 'topics': template['projects']}
         ]
         
-        current_week = 1
+        # Adjust topics based on skill level
+        for config in phase_configs:
+            config['topics'] = config['topics'][:skill_config['topics']//4 + 1]
+        return phase_configs
+    
+    def _is_fast_tracked(self, topic, phase_index, known_skills):
+        """Whether the user's known skills already cover a topic"""
+        # Only foundation topics teach a skill itself; later ones merely use it
+        return phase_index == 0 and is_known(topic_mask(topic), known_skills)
+    
+    def _iter_enhanced_phases(self, phase_configs, phase_hours, scheduler, skill_config, user_preferences,
+                              topic_graph=None, known_skills=0):
+        """Yield enhanced learning phases one at a time, scheduling their topics as they are built"""
+        topic_ids = {}  # title -> id of the topics generated so far
+        titles = {}  # id -> title
+        completed_ids = set()
+        previous_phase_ids = []
         for i, config in enumerate(phase_configs):
-            # Adjust topics based on skill level
-            topics = config['topics'][:skill_config['topics']//4 + 1]
+            topics = config['topics']
+            scheduler.start_phase()
             
             phase = {
                 'id': i + 1,
                 'name': config['name'],
-                'weeks': config['weeks'],
-                'start_week': current_week,
-                'end_week': current_week + config['weeks'] - 1,
+                'start_week': scheduler.week,
                 'topics': [],
                 'status': 'locked' if i > 0 else 'current',
                 'difficulty': min(skill_config['difficulty'], i + 1),
@@ -299,24 +371,42 @@ class EnhancedRoadmapGenerator:
             
             # Generate topics with enhanced details
             for j, topic in enumerate(topics):
+                prerequisite_ids = self._generate_prerequisite_ids(topic, previous_phase_ids, topic_ids, topic_graph)
+                fast_tracked = self._is_fast_tracked(topic, i, known_skills)
+                hours = phase_hours[i][j]
+                start_week, end_week = scheduler.place(hours)
                 topic_detail = {
                     'id': f"{i+1}.{j+1}",
                     'title': topic,
-                    'estimated_hours': random.randint(8, 20),
+                    'estimated_hours': hours,
+                    'start_week': start_week,
+                    'end_week': end_week,
                     'resources': self._generate_enhanced_resources(topic, user_preferences),
                     'milestones': self._generate_enhanced_milestones(topic, user_preferences),
-                    'status': 'pending',
+                    'status': 'completed' if fast_tracked else 'pending',
+                    'fast_tracked': fast_tracked,
+                    'locked': not fast_tracked and any(p not in completed_ids for p in prerequisite_ids),
                     'priority': 'high' if j < 2 else 'medium',
-                    'prerequisites': self._generate_prerequisites(topic, i),
-                    'learning_path': self._generate_learning_path(topic),
+                    'prerequisite_ids': prerequisite_ids,
+                    'prerequisites': self._generate_prerequisites(topic, [titles[p] for p in prerequisite_ids]),
+                    'learning_path': self._generate_learning_path(topic, topic_graph),
                     'practical_exercises': self._generate_practical_exercises(topic)
                 }
                 phase['topics'].append(topic_detail)
+                topic_ids.setdefault(topic, topic_detail['id'])
+                titles[topic_detail['id']] = topic
+                if fast_tracked:
+                    completed_ids.add(topic_detail['id'])
             
-            phases.append(phase)
-            current_week += config['weeks']
-        
-        return phases
+            previous_phase_ids = [topic_detail['id'] for topic_detail in phase['topics']]
+            if all(topic_detail['id'] in completed_ids for topic_detail in phase['topics']):
+                phase['status'] = 'completed'
+            elif any(not topic_detail['locked'] for topic_detail in phase['topics']):
+                phase['status'] = 'current'
+            
+            phase['end_week'] = max(phase['start_week'], scheduler.last_week)
+            phase['weeks'] = phase['end_week'] - phase['start_week'] + 1
+            yield phase
     
     def _generate_enhanced_resources(self, topic, user_preferences):
         """Generate enhanced learning resources for a topic"""
@@ -329,7 +419,7 @@ class EnhancedRoadmapGenerator:
             {'type': 'Community', 'name': f'{topic} Community Forum', 'platform': 'Stack Overflow/Reddit', 'difficulty': 'All'}
         ]
         
-        return random.sample(resource_types, 4)
+        return self.rng.sample(resource_types, 4)
     
     def _generate_enhanced_milestones(self, topic, user_preferences):
         """Generate enhanced learning milestones for a topic"""
@@ -342,7 +432,7 @@ class EnhancedRoadmapGenerator:
             f'Teach {topic} to others'
         ]
         
-        return random.sample(milestones, 3)
+        return self.rng.sample(milestones, 3)
     
     def _generate_learning_objectives(self, phase_name, user_preferences):
         """Generate learning objectives for each phase"""
@@ -386,17 +476,41 @@ class EnhancedRoadmapGenerator:
         
         return criteria.get(phase_name, [])
     
-    def _generate_prerequisites(self, topic, phase_index):
+    def _generate_prerequisite_ids(self, topic, previous_phase_ids, topic_ids, topic_graph=None):
+        """Ids of the roadmap topics that must be completed before a topic
+        
+        Topics from an ingested roadmap.sh graph depend on their nearest
+        graph ancestors that made it into the roadmap; other topics depend
+        on the whole previous phase.
+        """
+        node = topic_graph.index_of(topic) if topic_graph else None
+        if node is None:
+            return list(previous_phase_ids)
+        
+        prerequisite_ids = []
+        seen = set()
+        stack = list(topic_graph.prerequisites(node))
+        while stack:
+            prerequisite = stack.pop()
+            if prerequisite in seen:
+                continue
+            seen.add(prerequisite)
+            topic_id = topic_ids.get(topic_graph.labels[prerequisite])
+            if topic_id is None:
+                stack.extend(topic_graph.prerequisites(prerequisite))
+            elif topic_id not in prerequisite_ids:
+                prerequisite_ids.append(topic_id)
+        return sorted(prerequisite_ids, key=lambda topic_id: [int(part) for part in topic_id.split('.')])
+    
+    def _generate_prerequisites(self, topic, prerequisite_titles):
         """Generate prerequisites for a topic"""
-        if phase_index == 0:
-            return ['Basic computer skills', 'Internet access']
-        elif phase_index == 1:
-            return ['Foundation phase completion', 'Basic programming knowledge']
-        else:
-            return ['Previous phase completion', 'Intermediate programming skills']
+        return prerequisite_titles or ['Basic computer skills', 'Internet access']
     
-    def _generate_learning_path(self, topic):
+    def _generate_learning_path(self, topic, topic_graph=None):
         """Generate a structured learning path for a topic"""
+        node = topic_graph.index_of(topic) if topic_graph else None
+        if node is not None and topic_graph.subtopics(node):
+            return [topic_graph.labels[subtopic] for subtopic in topic_graph.subtopics(node)]
         return [
             'Theory and concepts',
             'Hands-on practice',
@@ -413,27 +527,12 @@ class EnhancedRoadmapGenerator:
             f'Create {topic} documentation'
         ]
         
-        return random.sample(exercises, 2)
+        return self.rng.sample(exercises, 2)
     
     def update_progress(self, roadmap, completed_topics):
-        """Update roadmap progress with enhanced tracking"""
-        total_topics = roadmap['progress']['total_topics']
-        completed_count = len(completed_topics)
-        
-        roadmap['progress']['completed_topics'] = completed_count
-        roadmap['progress']['completion_percentage'] = int((completed_count / total_topics) * 100)
-        
-        # Update current phase based on progress
-        for i, phase in enumerate(roadmap['phases']):
-            phase_completed = all(topic['id'] in completed_topics for topic in phase['topics'])
-            if phase_completed:
-                phase['status'] = 'completed'
-                roadmap['progress']['current_phase'] = i + 1
-            elif i == roadmap['progress']['current_phase']:
-                phase['status'] = 'current'
-            else:
-                phase['status'] = 'locked'
-        
+        """Mark topics completed and unlock the topics that depend on them"""
+        roadmap = as_dict(roadmap)
+        complete_topics(roadmap, completed_topics)
         return roadmap
 
 # Global instance
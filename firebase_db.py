@@ -1,3 +1,4 @@
+import logging
 import os
 
 import firebase_admin
@@ -5,6 +6,8 @@ from firebase_admin import credentials, firestore
 
 from config import Config
 
+logger = logging.getLogger(__name__)
+
 
 # Initialize Firebase Admin SDK
 def initialize_firebase():
@@ -26,7 +29,7 @@ def initialize_firebase():
                 'projectId': Config.FIREBASE_PROJECT_ID
             })
         else:
-            print("Firebase not configured - using local SQLite")
+            logger.warning("Firebase not configured - using local SQLite")
     
     return firestore.client() if Config.USE_FIREBASE else None
 
@@ -38,8 +41,8 @@ def get_db():
             return firestore.client()
         else:
             return None
-    except Exception as e:
-        print(f"Firebase connection error: {e}")
+    except Exception:
+        logger.exception("Firebase connection error")
         return None
 
 # Firestore helper functions
@@ -54,8 +57,8 @@ class FirebaseDB:
             user_data['created_at'] = firestore.SERVER_TIMESTAMP
             doc_ref.set(user_data)
             return doc_ref.id
-        except Exception as e:
-            print(f"Error creating user: {e}")
+        except Exception:
+            logger.exception("Error creating user")
             return None
     
     def get_user_by_email(self, email):
@@ -70,8 +73,8 @@ class FirebaseDB:
                 user_data['id'] = doc.id
                 return user_data
             return None
-        except Exception as e:
-            print(f"Error getting user: {e}")
+        except Exception:
+            logger.exception("Error getting user")
             return None
     
     def get_user_by_id(self, user_id):
@@ -84,8 +87,8 @@ class FirebaseDB:
                 user_data['id'] = doc.id
                 return user_data
             return None
-        except Exception as e:
-            print(f"Error getting user by ID: {e}")
+        except Exception:
+            logger.exception("Error getting user by ID")
             return None
     
     def create_user_preferences(self, user_id, preferences_data):
@@ -96,8 +99,8 @@ class FirebaseDB:
             preferences_data['created_at'] = firestore.SERVER_TIMESTAMP
             doc_ref.set(preferences_data)
             return doc_ref.id
-        except Exception as e:
-            print(f"Error creating user preferences: {e}")
+        except Exception:
+            logger.exception("Error creating user preferences")
             return None
     
     def get_user_preferences(self, user_id):
@@ -112,6 +115,6 @@ class FirebaseDB:
                 prefs_data['id'] = doc.id
                 return prefs_data
             return None
-        except Exception as e:
-            print(f"Error getting user preferences: {e}")
+        except Exception:
+            logger.exception("Error getting user preferences")
             return None
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Pre-assembled test forms
+A background thread keeps a bounded queue of sampled, shuffled and
+optionally pre-rendered test forms, so /test only takes one off the queue.
+Questions are dealt from a shuffled deck per topic: every question appears
+in a form once before any appears again, which spreads exposure evenly
+across the bank. A user is given a queued form that shares no question
+with their recent tests, or a freshly dealt one that avoids them.
+"""
+
+import array
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from assessment_engine import assessment_engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 16
+
+# How many of a user's latest tests a new form avoids repeating questions from
+RECENT_TESTS_AVOIDED = 2
+
+# Seconds without a take() before the producer refills, so it runs between requests
+# rather than competing with them for the interpreter
+REFILL_IDLE_SECONDS = 0.002
+
+# Queued forms checked for one without the user's recent questions before dealing a new one
+MAX_FORMS_SCANNED = 8
+
+
+class Form:
+    """Questions of one test, in order, and their rendered HTML (or None)"""
+
+    __slots__ = ('questions', 'question_ids', 'html')
+
+    def __init__(self, questions, html=None):
+        self.questions = questions
+        self.question_ids = [question['id'] for question in questions]
+        self.html = html
+
+
+class _Deck:
+    """Question indices of one bank in shuffled order, dealt front to back"""
+
+    def __init__(self, size, rng):
+        self.rng = rng
+        self.order = array.array('I', range(size))
+        rng.shuffle(self.order)
+        self.position = 0
+
+    def _reshuffle(self):
+        """Start a new round: undealt questions first, then the dealt ones reshuffled"""
+        dealt = self.order[:self.position]
+        self.rng.shuffle(dealt)
+        self.order = self.order[self.position:] + dealt
+        self.position = 0
+
+    def grow(self, size):
+        """Add questions appended to the bank to the undealt part of this round"""
+        undealt = self.order[self.position:] + array.array('I', range(len(self.order), size))
+        self.rng.shuffle(undealt)
+        self.order = self.order[:self.position] + undealt
+
+    def deal(self, count, skip=frozenset()):
+        """Return count distinct indices, passing over those in skip while the bank allows"""
+        if len(self.order) < count + len(skip):
+            skip = frozenset()
+        if len(self.order) - self.position < count + len(skip):
+            self._reshuffle()
+        order = self.order
+        picked = []
+        i = self.position
+        while len(picked) < count:
+            if order[i] not in skip:
+                # Move the pick to the dealt part; skipped indices stay in this round
+                order[self.position], order[i] = order[i], order[self.position]
+                picked.append(order[self.position])
+                self.position += 1
+            i += 1
+        return picked
+
+
+class FormPool:
+    """Bounded queue of ready test forms, refilled by a background thread
+
+    With size=0 every form is dealt when it is taken and no thread is
+    started; use this where threads do not outlive the request (e.g.
+    serverless functions). render, if given, is called as
+    render(questions) in the producer thread and returns the form's HTML.
+    """
+
+    def __init__(self, engine, size=DEFAULT_POOL_SIZE, render=None, rng=None):
+        self.engine = engine
+        self.size = size
+        self.render = render
+        self.rng = rng or random.Random()
+        self._forms = deque()
+        self._decks = {}
+        self._deal_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._pid = None
+        self._last_take = 0.0
+        self.taken = 0
+        self.dealt_on_demand = 0
+
+    def _ensure_started(self):
+        """Start the producer thread, again in a forked child whose parent had one"""
+        with self._condition:
+            if self.size <= 0 or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._forms.clear()
+            thread = threading.Thread(target=self._produce, name='test-form-producer', daemon=True)
+            thread.start()
+
+    def _deck(self, topic, size):
+        deck = self._decks.get(topic)
+        if deck is None or len(deck.order) > size:
+            deck = self._decks[topic] = _Deck(size, self.rng)
+        elif len(deck.order) < size:
+            deck.grow(size)
+        return deck
+
+    def assemble(self, recent_ids=()):
+        """Deal a new form, avoiding the given question ids where the banks allow
+
+        Raises ValueError if there are no banks or a bank is too small.
+        """
+        topics = self.engine.topics()
+        if not topics:
+            raise ValueError('No question banks found')
+        skip = {}
+        for question_id in recent_ids:
+            topic, _, index = question_id.rpartition(':')
+            if index.isdigit():
+                skip.setdefault(topic, set()).add(int(index))
+
+        count = self.engine.questions_per_topic
+        questions = []
+        with self._deal_lock:
+            for topic in topics:
+                bank = self.engine.load_bank(topic)
+                if len(bank) < count:
+                    raise ValueError(f"Not enough {topic} questions: {len(bank)}")
+                indices = self._deck(topic, len(bank)).deal(count, skip.get(topic, frozenset()))
+                questions.extend(bank[index] for index in indices)
+            self.rng.shuffle(questions)
+        html = self.render(questions) if self.render else None
+        return Form(questions, html)
+
+    def _produce(self):
+        while True:
+            with self._condition:
+                while True:
+                    idle = time.monotonic() - self._last_take
+                    if len(self._forms) >= self.size:
+                        self._condition.wait()
+                    elif idle < REFILL_IDLE_SECONDS:
+                        self._condition.wait(REFILL_IDLE_SECONDS - idle)
+                    else:
+                        break
+            try:
+                form = self.assemble()
+            except Exception:
+                logger.exception("Test form producer error")
+                with self._condition:
+                    self._condition.wait(timeout=30)
+                continue
+            with self._condition:
+                self._forms.append(form)
+
+    def take(self, recent_ids=()):
+        """Return a form sharing no question with recent_ids
+
+        The first such form among the oldest MAX_FORMS_SCANNED queued ones is
+        taken; otherwise (or when the queue is empty) a form is dealt now.
+        """
+        self._ensure_started()
+        recent = set(recent_ids)
+        form = None
+        with self._condition:
+            for i in range(min(len(self._forms), MAX_FORMS_SCANNED)):
+                if recent.isdisjoint(self._forms[i].question_ids):
+                    form = self._forms[i]
+                    del self._forms[i]
+                    self._condition.notify()
+                    break
+            self.taken += 1
+            self._last_take = time.monotonic()
+        if form is None:
+            self.dealt_on_demand += 1
+            form = self.assemble(recent)
+        return form
+
+    def stats(self):
+        """Return pool statistics"""
+        with self._condition:
+            return {'queued': len(self._forms), 'taken': self.taken, 'dealt_on_demand': self.dealt_on_demand}
+
+
+# Global instance
+form_pool = FormPool(assessment_engine)
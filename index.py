@@ -1,15 +1,34 @@
 import json
+import logging
 import os
-import random
 import sqlite3
 
-from flask import (Flask, flash, redirect, render_template, request, session,
-                   url_for)
+from flask import (Flask, Response, flash, redirect, render_template, request,
+                   session, stream_with_context, url_for)
+from werkzeug.http import quote_etag
 from werkzeug.security import check_password_hash, generate_password_hash
 
+import app_logging
+import json_codec
+import roadmap_history
+from adaptive_test import adaptive_test_engine
+from assessment_engine import assessment_engine, attach_topic_scores, save_result, topic_label
 from config import config
+from db_utils import apply_migrations, execute, upsert_query
 from enhanced_roadmap_generator import enhanced_roadmap_generator
+from form_pool import RECENT_TESTS_AVOIDED, form_pool
+from job_queue import JobQueue
+from json_codec import FastJSONProvider
+from json_patch import JsonPatchError
+from prerequisite_engine import complete_topics, next_topics
+from profile_cache import compute_profile_completion, profile_cache
+from query_trace import connect_postgres, connect_sqlite, slow_query_log
 from roadmap_generator import roadmap_generator
+from roadmap_history import ROADMAP_STATUSES, RoadmapVersionConflict
+from roadmap_model import Roadmap, as_dict, roadmap_cache
+from scheduler import MAX_WEEKLY_HOURS, MIN_WEEKLY_HOURS, current_week, reschedule
+from skill_matching import skills_mask
+from template_cache import install_bytecode_cache
 
 # Import Firebase for Vercel
 try:
@@ -26,12 +45,29 @@ try:
 except ImportError:
     POSTGRES_AVAILABLE = False
 
+# Driver errors and unique-constraint violations from either database
+if POSTGRES_AVAILABLE:
+    DB_ERRORS = (sqlite3.Error, psycopg.Error)
+    UNIQUE_VIOLATIONS = (sqlite3.IntegrityError, psycopg.errors.UniqueViolation)
+else:
+    DB_ERRORS = (sqlite3.Error,)
+    UNIQUE_VIOLATIONS = (sqlite3.IntegrityError,)
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Load configuration
 config_name = os.environ.get('FLASK_ENV', 'default')
 app.config.from_object(config[config_name])
 
+# JSON logs written by a background thread, with request context on every record
+app_logging.init_app(app)
+logger = logging.getLogger(__name__)
+
+# Load compiled templates from disk instead of compiling them in every process
+install_bytecode_cache(app)
+app.add_template_filter(topic_label)
+
 # Initialize Firebase if using it
 if app.config.get('USE_FIREBASE') and FIREBASE_AVAILABLE:
     initialize_firebase()
@@ -39,28 +75,52 @@ if app.config.get('USE_FIREBASE') and FIREBASE_AVAILABLE:
 else:
     firebase_db = None
 
+# Size the in-process profile cache from configuration
+profile_cache.max_entries = app.config.get('PROFILE_CACHE_SIZE', profile_cache.max_entries)
+profile_cache.ttl_seconds = app.config.get('PROFILE_CACHE_TTL', profile_cache.ttl_seconds)
+roadmap_cache.max_entries = app.config.get('ROADMAP_CACHE_SIZE', roadmap_cache.max_entries)
+roadmap_cache.ttl_seconds = app.config.get('ROADMAP_CACHE_TTL', roadmap_cache.ttl_seconds)
+
+# Statements slower than SLOW_QUERY_MS are kept, with their plans, for /admin/slow-queries
+slow_query_log.threshold_ms = app.config.get('SLOW_QUERY_MS', slow_query_log.threshold_ms)
+slow_query_log.size = app.config.get('SLOW_QUERY_LOG_SIZE', slow_query_log.size)
+
+# Background workers for roadmap generation
+job_queue = JobQueue(app.config['JOBS_DATABASE_PATH'], app.config.get('JOB_QUEUE_WORKERS', 2))
+
+
+def render_test_questions(questions):
+    """Render a test form's questions ahead of time, outside any request"""
+    with app.app_context():
+        return render_template('test_questions.html', questions=questions)
+
+
+# Test forms assembled and rendered ahead of /test requests
+form_pool.size = app.config.get('TEST_FORM_POOL_SIZE', form_pool.size)
+form_pool.render = render_test_questions
+
 # --- Database Functions ---
 def get_db():
     """Get database connection with proper error handling"""
     try:
         if app.config.get('USE_SQLITE', True):
             # SQLite for local development
-            conn = sqlite3.connect(app.config['DATABASE_PATH'])
+            conn = connect_sqlite(app.config['DATABASE_PATH'])
             conn.row_factory = sqlite3.Row
             return conn
         else:
             # PostgreSQL for Vercel
             if not POSTGRES_AVAILABLE:
-                print("PostgreSQL adapter not available")
+                logger.warning("PostgreSQL adapter not available")
                 return None
             
-            conn = psycopg.connect(
+            conn = connect_postgres(
                 app.config['DATABASE_URL'],
                 row_factory=dict_row
             )
             return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
+    except Exception:
+        logger.exception("Database connection error")
         return None
 
 def init_db():
@@ -89,6 +149,7 @@ def init_db():
                     target_company TEXT NOT NULL,
                     position TEXT NOT NULL,
                     previous_skills TEXT NOT NULL,
+                    skills_mask INTEGER,
                     specialization TEXT NOT NULL,
                     skill_focus TEXT NOT NULL,
                     FOREIGN KEY (user_id) REFERENCES users (id)
@@ -109,25 +170,76 @@ def init_db():
                 )
             ''')
             
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS test_topic_scores (
+                    result_id INTEGER NOT NULL,
+                    topic TEXT NOT NULL,
+                    score INTEGER NOT NULL,
+                    questions INTEGER NOT NULL,
+                    PRIMARY KEY (result_id, topic),
+                    FOREIGN KEY (result_id) REFERENCES test_results (id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS test_responses (
+                    result_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    question_id TEXT NOT NULL,
+                    answer TEXT,
+                    correct INTEGER NOT NULL,
+                    PRIMARY KEY (result_id, position),
+                    FOREIGN KEY (result_id) REFERENCES test_results (id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS question_difficulty (
+                    question_id TEXT PRIMARY KEY,
+                    difficulty REAL NOT NULL,
+                    responses INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS user_roadmaps (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'accepted',
                     roadmap_data TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    phase_index TEXT,
                     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES users (id)
                 )
             ''')
             
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS roadmap_versions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    base_version INTEGER,
+                    chain_length INTEGER NOT NULL DEFAULT 0,
+                    data TEXT NOT NULL,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            apply_migrations(cursor)
+            
             conn.commit()
             conn.close()
-            print("SQLite database initialized successfully")
+            logger.info("SQLite database initialized successfully")
             
         else:
             # PostgreSQL initialization for Vercel
             if not POSTGRES_AVAILABLE or not app.config.get('DATABASE_URL'):
-                print("PostgreSQL not available or DATABASE_URL not set")
+                logger.warning("PostgreSQL not available or DATABASE_URL not set")
                 return
                 
             conn = psycopg.connect(app.config['DATABASE_URL'])
@@ -151,6 +263,7 @@ def init_db():
                     target_company VARCHAR(255) NOT NULL,
                     position VARCHAR(255) NOT NULL,
                     previous_skills TEXT NOT NULL,
+                    skills_mask INTEGER,
                     specialization VARCHAR(255) NOT NULL,
                     skill_focus VARCHAR(255) NOT NULL,
                     FOREIGN KEY (user_id) REFERENCES users (id)
@@ -171,45 +284,122 @@ def init_db():
                 )
             ''')
             
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS test_topic_scores (
+                    result_id INTEGER NOT NULL,
+                    topic VARCHAR(64) NOT NULL,
+                    score INTEGER NOT NULL,
+                    questions INTEGER NOT NULL,
+                    PRIMARY KEY (result_id, topic),
+                    FOREIGN KEY (result_id) REFERENCES test_results (id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS test_responses (
+                    result_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    question_id VARCHAR(128) NOT NULL,
+                    answer TEXT,
+                    correct INTEGER NOT NULL,
+                    PRIMARY KEY (result_id, position),
+                    FOREIGN KEY (result_id) REFERENCES test_results (id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS question_difficulty (
+                    question_id VARCHAR(128) PRIMARY KEY,
+                    difficulty REAL NOT NULL,
+                    responses INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS user_roadmaps (
                     id SERIAL PRIMARY KEY,
                     user_id INTEGER NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'accepted',
                     roadmap_data TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    phase_index TEXT,
                     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES users (id)
                 )
             ''')
             
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS roadmap_versions (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    status VARCHAR(20) NOT NULL,
+                    base_version INTEGER,
+                    chain_length INTEGER NOT NULL DEFAULT 0,
+                    data TEXT NOT NULL,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            apply_migrations(cursor)
+            
             conn.commit()
             conn.close()
-            print("PostgreSQL database initialized successfully")
+            logger.info("PostgreSQL database initialized successfully")
         
-    except Exception as e:
-        print(f"Database initialization error: {e}")
+    except Exception:
+        logger.exception("Database initialization error")
 
 # --- Helper Functions ---
-def calculate_profile_completion(user_id):
-    """Calculate user profile completion percentage"""
+def load_user_profile(user_id):
+    """Load user row, preferences and profile completion from the database"""
     db = get_db()
     if not db:
-        return 0
-        
+        return None
+
     try:
-        user_prefs = db.execute('SELECT * FROM user_preferences WHERE user_id = ?', (user_id,)).fetchone()
-        if not user_prefs:
-            return 0
-        
-        fields = ['role', 'target_company', 'position', 'previous_skills', 'specialization', 'skill_focus']
-        filled_fields = sum(1 for field in fields if user_prefs[field])
-        return int((filled_fields / len(fields)) * 100)
-    except sqlite3.Error as e:
-        print(f"Error calculating profile completion: {e}")
-        return 0
+        # One round trip for both the account row and the questionnaire answers
+        row = db.execute('''
+            SELECT u.id AS account_id, u.username AS account_username, u.email AS account_email, p.*
+            FROM users u LEFT JOIN user_preferences p ON p.user_id = u.id
+            WHERE u.id = ?
+        ''', (user_id,)).fetchone()
+        if not row:
+            return None
+        
+        row = dict(row)
+        user = {'id': row.pop('account_id'), 'username': row.pop('account_username'), 'email': row.pop('account_email')}
+        preferences = row if row['id'] is not None else None
+        return {
+            'user': user,
+            'preferences': preferences,
+            'profile_completion': compute_profile_completion(preferences)
+        }
+    except DB_ERRORS:
+        logger.exception("Error loading user profile")
+        return None
     finally:
         db.close()
 
+def get_user_profile(user_id):
+    """Get user's cached profile, loading it from the database on a miss"""
+    return profile_cache.get_or_load(user_id, load_user_profile)
+
+def get_user_preferences(user_id):
+    """Get a copy of user's preferences, or None if the questionnaire is not done"""
+    profile = get_user_profile(user_id)
+    if not profile or not profile['preferences']:
+        return None
+    return dict(profile['preferences'])
+
+def calculate_profile_completion(user_id):
+    """Calculate user profile completion percentage"""
+    profile = get_user_profile(user_id)
+    return profile['profile_completion'] if profile else 0
+
 def get_latest_test_result(user_id):
     """Get user's latest test result"""
     db = get_db()
@@ -217,10 +407,12 @@ def get_latest_test_result(user_id):
         return None
         
     try:
-        result = db.execute('SELECT * FROM test_results WHERE user_id = ? ORDER BY test_date DESC LIMIT 1', (user_id,)).fetchone()
-        return result
-    except sqlite3.Error as e:
-        print(f"Error getting latest test result: {e}")
+        results = execute(db, 'SELECT * FROM test_results WHERE user_id = ? ORDER BY test_date DESC LIMIT 1',
+                          (user_id,)).fetchall()
+        results = attach_topic_scores(db, results)
+        return results[0] if results else None
+    except sqlite3.Error:
+        logger.exception("Error getting latest test result")
         return None
     finally:
         db.close()
@@ -232,92 +424,232 @@ def get_all_test_results(user_id):
         return []
         
     try:
-        results = db.execute('SELECT * FROM test_results WHERE user_id = ? ORDER BY test_date DESC', (user_id,)).fetchall()
-        return results
-    except sqlite3.Error as e:
-        print(f"Error getting test results: {e}")
+        results = execute(db, 'SELECT * FROM test_results WHERE user_id = ? ORDER BY test_date DESC',
+                          (user_id,)).fetchall()
+        return attach_topic_scores(db, results)
+    except sqlite3.Error:
+        logger.exception("Error getting test results")
         return []
     finally:
         db.close()
 
-def get_user_roadmap(user_id):
-    """Get user's personalized roadmap"""
+def get_user_roadmap_head(user_id, status=None):
+    """Get user's roadmap head as a (roadmap, status, version) tuple
+
+    Without a status the accepted roadmap is preferred over the latest draft.
+    """
     db = get_db()
     if not db:
-        return None
+        return None, None, None
         
     try:
-        result = db.execute('SELECT roadmap_data FROM user_roadmaps WHERE user_id = ? ORDER BY updated_date DESC LIMIT 1', (user_id,)).fetchone()
+        if status:
+            result = execute(db, 'SELECT roadmap_data, status, version FROM user_roadmaps WHERE user_id = ? AND status = ?',
+                             (user_id, status)).fetchone()
+        else:
+            result = execute(db, f'''
+                SELECT roadmap_data, status, version FROM user_roadmaps WHERE user_id = ?
+                {roadmap_history.ACTIVE_HEAD_ORDER}
+            ''', (user_id,)).fetchone()
         if result:
-            return json.loads(result['roadmap_data'])
+            return json_codec.loads(result['roadmap_data']), result['status'], result['version']
+        return None, None, None
+    except (*DB_ERRORS, json.JSONDecodeError):
+        logger.exception("Error getting user roadmap")
+        return None, None, None
+    finally:
+        db.close()
+
+def get_user_roadmap(user_id, status=None):
+    """Get user's personalized roadmap"""
+    return get_user_roadmap_head(user_id, status)[0]
+
+def get_active_roadmap(user_id):
+    """Get user's active roadmap as a read-only Roadmap, cached per version"""
+    db = get_db()
+    if not db:
         return None
-    except (sqlite3.Error, json.JSONDecodeError) as e:
-        print(f"Error getting user roadmap: {e}")
+
+    try:
+        head = roadmap_history.load_active_head_meta(db, user_id)
+        if not head:
+            return None
+        cached = roadmap_cache.get(user_id)
+        if cached is not None and cached[0] == head['version']:
+            return cached[1]
+
+        result = execute(db, 'SELECT roadmap_data FROM user_roadmaps WHERE user_id = ? AND status = ?',
+                         (user_id, head['status'])).fetchone()
+        if not result:
+            return None
+        roadmap = Roadmap.from_dict(json_codec.loads(result['roadmap_data']))
+        roadmap_cache.set(user_id, (head['version'], roadmap))
+        return roadmap
+    except (*DB_ERRORS, json.JSONDecodeError):
+        logger.exception("Error getting user roadmap")
         return None
     finally:
         db.close()
 
-def save_user_roadmap(user_id, roadmap_data):
-    """Save or update user's roadmap"""
+def get_roadmap_history(user_id):
+    """List user's roadmap versions, newest first"""
     db = get_db()
     if not db:
-        return False
-        
+        return []
+
     try:
-        # Check if roadmap exists
-        existing = db.execute('SELECT id FROM user_roadmaps WHERE user_id = ?', (user_id,)).fetchone()
-        
-        if existing:
-            # Update existing roadmap
-            db.execute('''
-                UPDATE user_roadmaps 
-                SET roadmap_data = ?, updated_date = CURRENT_TIMESTAMP 
-                WHERE user_id = ?
-            ''', (json.dumps(roadmap_data), user_id))
-        else:
-            # Create new roadmap
-            db.execute('''
-                INSERT INTO user_roadmaps (user_id, roadmap_data) 
-                VALUES (?, ?)
-            ''', (user_id, json.dumps(roadmap_data)))
-        
-        db.commit()
-        return True
-    except (sqlite3.Error, json.JSONEncodeError) as e:
-        print(f"Error saving user roadmap: {e}")
-        return False
+        return roadmap_history.list_versions(db, user_id)
+    except DB_ERRORS:
+        logger.exception("Error getting roadmap history")
+        return []
     finally:
         db.close()
 
-def generate_user_roadmap(user_id):
-    """Generate a new roadmap for user based on their preferences"""
+def get_roadmap_version(user_id, version):
+    """Rebuild one version of user's roadmap from the history"""
     db = get_db()
     if not db:
         return None
-        
+
     try:
-        # Get user preferences
-        prefs = db.execute('SELECT * FROM user_preferences WHERE user_id = ?', (user_id,)).fetchone()
-        if not prefs:
-            return None
-        
-        # Convert preferences to dict
-        preferences = dict(prefs)
-        
-        # Generate enhanced roadmap
-        roadmap = enhanced_roadmap_generator.generate_enhanced_roadmap(preferences)
-        
-        # Save roadmap
-        if save_user_roadmap(user_id, roadmap):
-            return roadmap
+        return roadmap_history.get_version(db, user_id, version)
+    except (*DB_ERRORS, JsonPatchError):
+        logger.exception("Error getting roadmap version")
+        return None
+    finally:
+        db.close()
+
+PREFERENCES_UPSERT = upsert_query(
+    'user_preferences',
+    ['user_id', 'user_name', 'role', 'target_company', 'position', 'previous_skills', 'skills_mask', 'specialization',
+     'skill_focus'],
+    ['user_id'],
+    ['role', 'target_company', 'position', 'previous_skills', 'skills_mask', 'specialization', 'skill_focus']
+)
+
+def save_user_roadmap(user_id, roadmap_data, status):
+    """Save user's roadmap as a new version and make it the head for status
+
+    Returns the new roadmap version, or None if the save failed.
+    """
+    db = get_db()
+    if not db:
         return None
         
-    except sqlite3.Error as e:
-        print(f"Error generating user roadmap: {e}")
+    try:
+        version = roadmap_history.save_roadmap(db, user_id, as_dict(roadmap_data), status)
+        db.commit()
+        return version
+    except (*DB_ERRORS, TypeError, ValueError):
+        logger.exception("Error saving user roadmap")
         return None
     finally:
         db.close()
 
+def patch_user_roadmap(user_id, operations, base_version, status):
+    """Apply a JSON Patch to user's roadmap at base_version and save it under status
+
+    Returns the new version, or None if the user has no roadmap. Raises
+    RoadmapVersionConflict when another save got there first and
+    JsonPatchError when the patch does not apply.
+    """
+    db = get_db()
+    if not db:
+        return None
+
+    try:
+        version = roadmap_history.patch_roadmap(db, user_id, operations, base_version, status)
+        db.commit()
+        return version
+    except UNIQUE_VIOLATIONS:
+        # A concurrent save took the next version number
+        db.rollback()
+        raise RoadmapVersionConflict(None)
+    finally:
+        db.close()
+
+def save_roadmap_edit(user_id, data, status):
+    """Persist a roadmap edit sent as a JSON Patch delta or as a full document
+
+    Returns a (response, status code) pair for the roadmap save endpoints.
+    """
+    if status not in ROADMAP_STATUSES:
+        return {'error': f'Unknown roadmap status: {status}'}, 400
+
+    if data.get('patch') is not None:
+        base_version = data.get('base_version')
+        if not isinstance(base_version, int):
+            return {'error': 'base_version is required with a patch'}, 400
+        try:
+            version = patch_user_roadmap(user_id, data['patch'], base_version, status)
+        except RoadmapVersionConflict as e:
+            return {'error': 'Roadmap was changed elsewhere. Please reload it.',
+                    'version': e.current_version}, 409
+        except JsonPatchError as e:
+            return {'error': f'Invalid roadmap patch: {e}'}, 422
+        if version is None:
+            return {'error': 'No roadmap found'}, 404
+        return {'success': True, 'version': version}, 200
+
+    roadmap_data = data.get('roadmap')
+    if not roadmap_data:
+        return {'error': 'No roadmap data provided'}, 400
+    if not isinstance(roadmap_data, dict):
+        return {'error': 'roadmap must be a JSON object'}, 400
+
+    version = save_user_roadmap(user_id, roadmap_data, status)
+    if not version:
+        return {'error': 'Failed to save roadmap'}, 500
+    return {'success': True, 'version': version}, 200
+
+def generate_user_roadmap(user_id, status='accepted'):
+    """Generate a new roadmap for user based on their preferences
+
+    Roadmaps generated from the dashboard become the active (accepted) one;
+    the previous roadmap stays in the version history.
+    """
+    preferences = get_user_preferences(user_id)
+    if not preferences:
+        return None
+    
+    # Generate enhanced roadmap
+    roadmap = enhanced_roadmap_generator.generate_enhanced_roadmap(preferences)
+    
+    # Save roadmap
+    if save_user_roadmap(user_id, roadmap, status):
+        return roadmap
+    return None
+
+@job_queue.handler('generate_roadmap')
+def run_generate_roadmap_job(user_id, options):
+    """Generate a draft roadmap from the roadmap page options"""
+    preferences = get_user_preferences(user_id)
+    if not preferences:
+        raise ValueError('User preferences not found')
+    
+    # Update preferences with new data
+    preferences['skill_focus'] = options.get('skill_level')
+    preferences['learning_duration'] = options.get('duration')
+    preferences['weekly_hours'] = options.get('weekly_hours')
+    preferences['focus_area'] = options.get('focus_area')
+    preferences['learning_goals'] = options.get('learning_goals', '')
+    
+    # Generate enhanced roadmap
+    roadmap = enhanced_roadmap_generator.generate_enhanced_roadmap(preferences)
+    
+    # Save roadmap as a draft until the user accepts it
+    version = save_user_roadmap(user_id, roadmap, 'draft')
+    if not version:
+        raise RuntimeError('Failed to save roadmap')
+    return {'roadmap': roadmap.to_dict(), 'version': version}
+
+@job_queue.handler('regenerate_roadmap')
+def run_regenerate_roadmap_job(user_id, options):
+    """Regenerate the active roadmap from the user's saved preferences"""
+    if not generate_user_roadmap(user_id):
+        raise RuntimeError('Failed to regenerate roadmap')
+    return {}
+
 def validate_form_data(form_data, required_fields):
     """Validate form data"""
     errors = []
@@ -326,6 +658,15 @@ def validate_form_data(form_data, required_fields):
             errors.append(f"{field.replace('_', ' ').title()} is required")
     return errors
 
+def weekly_hours_from_form(form_data):
+    """Return (weekly_hours or None, error message or None) from a roadmap options form"""
+    if not form_data.get('weekly_hours'):
+        return None, None
+    weekly_hours = form_data.get('weekly_hours', type=int)
+    if weekly_hours is None or not MIN_WEEKLY_HOURS <= weekly_hours <= MAX_WEEKLY_HOURS:
+        return None, f'weekly_hours must be a whole number from {MIN_WEEKLY_HOURS} to {MAX_WEEKLY_HOURS}'
+    return weekly_hours, None
+
 # --- Routes ---
 @app.route('/')
 @app.route('/home')
@@ -359,8 +700,8 @@ def login():
                 return redirect(url_for('dashboard'))
             else:
                 flash('Invalid credentials', 'danger')
-        except sqlite3.Error as e:
-            print(f"Login database error: {e}")
+        except sqlite3.Error:
+            logger.exception("Login database error")
             flash('Database error. Please try again.', 'danger')
         finally:
             db.close()
@@ -450,7 +791,7 @@ def signup():
             if 'UNIQUE constraint failed' in str(e) or 'duplicate key' in str(e) or 'already exists' in str(e):
                 flash('Email already registered.', 'warning')
             else:
-                print(f"Signup database error: {e}")
+                logger.exception("Signup database error")
                 flash('Database error. Please try again.', 'danger')
             
     return render_template('signup.html')
@@ -473,7 +814,7 @@ def dashboard():
         latest_test_result = get_latest_test_result(user_id)
         
         # Get or generate user roadmap
-        user_roadmap = get_user_roadmap(user_id)
+        user_roadmap = get_active_roadmap(user_id)
         if not user_roadmap and profile_completion > 0:
             # Generate roadmap if user has completed profile but no roadmap exists
             user_roadmap = generate_user_roadmap(user_id)
@@ -483,8 +824,8 @@ def dashboard():
                                profile_completion=profile_completion,
                                latest_test_result=latest_test_result,
                                user_roadmap=user_roadmap)
-    except Exception as e:
-        print(f"Dashboard error: {e}")
+    except Exception:
+        logger.exception("Dashboard error")
         flash('Error loading dashboard. Please try again.', 'danger')
         return redirect(url_for('home'))
 
@@ -499,8 +840,8 @@ def test_history():
         return render_template('test_history.html', 
                                user_name=session['user_name'], 
                                results=results)
-    except Exception as e:
-        print(f"Test history error: {e}")
+    except Exception:
+        logger.exception("Test history error")
         flash('Error loading test history.', 'danger')
         return redirect(url_for('dashboard'))
 
@@ -511,58 +852,37 @@ def test():
         return redirect(url_for('login'))
 
     try:
-        # Check if question files exist
-        python_file = 'python_mcqs.json'
-        cpp_file = 'cpp_mcqs.json'
-        
-        if not os.path.exists(python_file) or not os.path.exists(cpp_file):
+        # Check if any question banks exist
+        if not assessment_engine.topics():
             flash('Test questions not available. Please contact administrator.', 'danger')
             return redirect(url_for('dashboard'))
         
-        # Load Python questions
-        with open(python_file, 'r', encoding='utf-8') as f:
-            python_questions = json.load(f)
-            for q in python_questions:
-                q['topic'] = 'python'
-        
-        # Load C++ questions
-        with open(cpp_file, 'r', encoding='utf-8') as f:
-            cpp_questions = json.load(f)
-            for q in cpp_questions:
-                q['topic'] = 'cpp'
-
-        # Validate we have enough questions
-        if len(python_questions) < 10 or len(cpp_questions) < 10:
-            flash('Not enough questions available for testing.', 'danger')
-            return redirect(url_for('dashboard'))
-
-        # Select 10 random questions from each topic
-        selected_python = random.sample(python_questions, 10)
-        selected_cpp = random.sample(cpp_questions, 10)
-        
-        # Combine and shuffle
-        final_questions = selected_python + selected_cpp
-        random.shuffle(final_questions)
+        # Ready-made form: the same number of questions from every bank, shuffled together,
+        # with none from the user's recent tests
+        recent_ids = session.get('recent_questions', [])
+        form = form_pool.take(recent_ids)
         
-        # Store questions in session for submission validation
-        session['test_questions'] = final_questions
+        # Store question ids in session for submission validation
+        session['test_questions'] = form.question_ids
+        session['recent_questions'] = (form.question_ids + recent_ids)[:len(form.question_ids) * RECENT_TESTS_AVOIDED]
         
     except FileNotFoundError as e:
         flash(f"Test file not found: {e.filename}", 'danger')
         return redirect(url_for('dashboard'))
-    except json.JSONDecodeError as e:
+    except json.JSONDecodeError:
         flash("Error reading test questions. Please contact administrator.", 'danger')
         return redirect(url_for('dashboard'))
-    except ValueError as e:
+    except ValueError:
         flash("Not enough questions available for testing.", 'danger')
         return redirect(url_for('dashboard'))
-    except Exception as e:
-        print(f"Test loading error: {e}")
+    except Exception:
+        logger.exception("Test loading error")
         flash("Error loading test. Please try again.", 'danger')
         return redirect(url_for('dashboard'))
 
     return render_template('test.html', 
-                           questions=final_questions,
+                           questions=form.questions,
+                           questions_html=form.html,
                            user_name=session.get('user_name'))
 
 @app.route('/submit_test', methods=['POST'])
@@ -572,53 +892,36 @@ def submit_test():
         flash('Your session has expired. Please start the test again.', 'warning')
         return redirect(url_for('test'))
     
-    questions = session.get('test_questions', [])
-    if not questions:
+    question_ids = session.get('test_questions', [])
+    if not question_ids:
         flash('No questions found in your session. Please start the test again.', 'warning')
         return redirect(url_for('test'))
 
     try:
-        python_score = 0
-        cpp_score = 0
-        
-        for i, question in enumerate(questions):
-            user_answer = request.form.get(f'q{i}')
-            if user_answer and user_answer == question['answer']:
-                if question['topic'] == 'python':
-                    python_score += 1
-                elif question['topic'] == 'cpp':
-                    cpp_score += 1
-        
-        total_score = python_score + cpp_score
-        total_questions = len(questions)
-        percentage = (total_score / total_questions) * 100 if total_questions > 0 else 0
+        questions = [assessment_engine.question(question_id) for question_id in question_ids]
+        answers = [request.form.get(f'q{i}') for i in range(len(questions))]
+        result = assessment_engine.grade(questions, answers)
         
         # Save to database
         db = get_db()
         if db:
             try:
-                db.execute('''
-                    INSERT INTO test_results (user_id, user_name, python_score, cpp_score, total_score, percentage)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (session['user_id'], session['user_name'], python_score, cpp_score, total_score, percentage))
+                save_result(db, session['user_id'], session['user_name'], result, questions, answers)
                 db.commit()
-            except sqlite3.Error as e:
-                print(f"Database error saving test result: {e}")
+            except DB_ERRORS:
+                logger.exception("Database error saving test result")
                 flash('Error saving test result.', 'danger')
             finally:
                 db.close()
         
         session.pop('test_questions', None)
+        session['last_test_result'] = result
         
         flash('Test submitted successfully!', 'success')
-        return redirect(url_for('test_result', 
-                               python_score=python_score,
-                               cpp_score=cpp_score,
-                               total_score=total_score,
-                               percentage=round(percentage, 2)))
+        return redirect(url_for('test_result'))
                                
-    except Exception as e:
-        print(f"Test submission error: {e}")
+    except Exception:
+        logger.exception("Test submission error")
         flash('Error submitting test. Please try again.', 'danger')
         return redirect(url_for('test'))
 
@@ -628,103 +931,148 @@ def test_result():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    try:
-        python_score = request.args.get('python_score', 0, type=int)
-        cpp_score = request.args.get('cpp_score', 0, type=int)
-        total_score = request.args.get('total_score', 0, type=int)
-        percentage = request.args.get('percentage', 0, type=float)
-        
-        # Validate scores
-        if python_score < 0 or cpp_score < 0 or total_score < 0 or percentage < 0:
-            flash('Invalid test result data.', 'danger')
-            return redirect(url_for('dashboard'))
-            
-    except (ValueError, TypeError):
-        flash('Invalid test result data.', 'danger')
+    result = session.get('last_test_result')
+    if not result:
+        flash('No test result to show. Take a test first.', 'warning')
         return redirect(url_for('dashboard'))
 
     return render_template('test_result.html',
                            user_name=session.get('user_name'),
-                           python_score=python_score,
-                           cpp_score=cpp_score,
-                           total_score=total_score,
-                           percentage=percentage)
+                           topic_scores=result['topic_scores'],
+                           total_score=result['total_score'],
+                           total_questions=result['total_questions'],
+                           percentage=result['percentage'],
+                           adaptive=result.get('adaptive', False))
 
-@app.route('/questionnaire', methods=['GET', 'POST'])
-def questionnaire():
-    """Questionnaire route with improved validation"""
+@app.route('/adaptive_test', methods=['GET', 'POST'])
+def adaptive_test():
+    """Adaptive test: one question at a time, each chosen from the answers so far"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    db = get_db()
-    if not db:
-        flash('Database connection error. Please try again.', 'danger')
-        return redirect(url_for('dashboard'))
-    
+    state = session.get('adaptive_test')
     try:
+        if state is None:
+            db = get_db()
+            if db:
+                try:
+                    adaptive_test_engine.load_difficulties(db)
+                except Exception:
+                    # Without estimates every question counts as average
+                    logger.exception("Error loading question difficulties")
+                finally:
+                    db.close()
+            state = adaptive_test_engine.start()
+
         if request.method == 'POST':
-            # Get and validate form data
-            role = request.form.get('role', '').strip()
-            target_company = request.form.get('company', '').strip()
-            position = request.form.get('position', '').strip()
-            previous_skills = ','.join(request.form.getlist('skills'))
-            specialization = request.form.get('specialization', '').strip()
-            skill_focus = request.form.get('skill_focus', '').strip()
-
-            # Validate required fields
-            required_fields = ['role', 'company', 'position', 'specialization', 'skill_focus']
-            errors = validate_form_data(request.form, required_fields)
-            
-            if errors:
-                for error in errors:
-                    flash(error, 'danger')
-                return render_template('questionnaire.html', 
-                                     user_name=session['user_name'], 
-                                     preferences=None)
-
-            # Check if preferences already exist
-            existing_prefs = db.execute('SELECT id FROM user_preferences WHERE user_id = ?', (session['user_id'],)).fetchone()
-
-            if existing_prefs:
-                # Update existing preferences
-                db.execute('''
-                    UPDATE user_preferences
-                    SET role = ?, target_company = ?, position = ?, previous_skills = ?, specialization = ?, skill_focus = ?
-                    WHERE user_id = ?
-                ''', (role, target_company, position, previous_skills, specialization, skill_focus, session['user_id']))
-                flash('Profile updated successfully!', 'success')
-            else:
-                # Insert new preferences
-                db.execute('''
-                    INSERT INTO user_preferences 
-                    (user_id, user_name, role, target_company, position, previous_skills, specialization, skill_focus)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (session['user_id'], session['user_name'], role, target_company, position, previous_skills, specialization, skill_focus))
-                flash('Profile saved successfully!', 'success')
-            
-            db.commit()
-            return redirect(url_for('dashboard'))
+            if request.form.get('question_id') != state['current']:
+                flash('That question was already answered.', 'warning')
+                return redirect(url_for('adaptive_test'))
+            adaptive_test_engine.answer(state, request.form.get('q0'))
+
+        question = adaptive_test_engine.next_question(state)
+        session['adaptive_test'] = state
+    except ValueError:
+        flash("Not enough questions available for testing.", 'danger')
+        return redirect(url_for('dashboard'))
+    except Exception:
+        logger.exception("Adaptive test error")
+        session.pop('adaptive_test', None)
+        flash("Error loading test. Please try again.", 'danger')
+        return redirect(url_for('dashboard'))
+
+    if question is None:
+        result, questions, answers = adaptive_test_engine.result(state)
+        db = get_db()
+        if db:
+            try:
+                save_result(db, session['user_id'], session['user_name'], result, questions, answers)
+                db.commit()
+            except DB_ERRORS:
+                logger.exception("Database error saving test result")
+                flash('Error saving test result.', 'danger')
+            finally:
+                db.close()
+        session.pop('adaptive_test', None)
+        session['last_test_result'] = result
+        flash('Test submitted successfully!', 'success')
+        return redirect(url_for('test_result'))
+
+    if request.method == 'POST':
+        return redirect(url_for('adaptive_test'))
+
+    answered, most = adaptive_test_engine.progress(state)
+    return render_template('adaptive_test.html',
+                           question=question,
+                           answered=answered,
+                           most_questions=most,
+                           user_name=session.get('user_name'))
+
+@app.route('/questionnaire', methods=['GET', 'POST'])
+def questionnaire():
+    """Questionnaire route with improved validation"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
 
-        # For GET request, fetch existing preferences
-        prefs = db.execute('SELECT * FROM user_preferences WHERE user_id = ?', (session['user_id'],)).fetchone()
+    if request.method == 'GET':
+        # Preferences come from the profile cache, so a repeat visit needs no database
+        prefs = get_user_preferences(session['user_id'])
         
         # The 'previous_skills' are stored as a comma-separated string, so we split it for the template
         if prefs and prefs['previous_skills']:
-            # Create a mutable copy of the row object
-            prefs_dict = dict(prefs)
-            prefs_dict['previous_skills'] = prefs_dict['previous_skills'].split(',')
-            prefs = prefs_dict
+            prefs['previous_skills'] = prefs['previous_skills'].split(',')
 
         return render_template('questionnaire.html', 
                              user_name=session['user_name'], 
                              preferences=prefs)
+
+    # Get and validate form data
+    role = request.form.get('role', '').strip()
+    target_company = request.form.get('company', '').strip()
+    position = request.form.get('position', '').strip()
+    previous_skills = ','.join(request.form.getlist('skills'))
+    specialization = request.form.get('specialization', '').strip()
+    skill_focus = request.form.get('skill_focus', '').strip()
+
+    # Validate required fields
+    required_fields = ['role', 'company', 'position', 'specialization', 'skill_focus']
+    errors = validate_form_data(request.form, required_fields)
+    
+    if errors:
+        for error in errors:
+            flash(error, 'danger')
+        return render_template('questionnaire.html', 
+                             user_name=session['user_name'], 
+                             preferences=None)
+
+    # The cached profile tells us whether this is a first save, so the write is one upsert
+    is_update = get_user_preferences(session['user_id']) is not None
+
+    db = get_db()
+    if not db:
+        flash('Database connection error. Please try again.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    try:
+        execute(db, PREFERENCES_UPSERT, (session['user_id'], session['user_name'], role, target_company,
+                                         position, previous_skills, skills_mask(previous_skills),
+                                         specialization, skill_focus))
+        db.commit()
+        
+        if is_update:
+            flash('Profile updated successfully!', 'success')
+        else:
+            flash('Profile saved successfully!', 'success')
+        return redirect(url_for('dashboard'))
                              
-    except sqlite3.Error as e:
-        print(f"Questionnaire database error: {e}")
+    except DB_ERRORS:
+        logger.exception("Questionnaire database error")
         flash('Database error. Please try again.', 'danger')
         return redirect(url_for('dashboard'))
     finally:
         db.close()
+        # The questionnaire is the only writer of preferences
+        profile_cache.invalidate(session['user_id'])
 
 @app.route('/logout')
 def logout():
@@ -768,162 +1116,207 @@ def roadmap_page():
     
     try:
         # Get user preferences
-        db = get_db()
-        if not db:
-            flash('Database connection error. Please try again.', 'danger')
-            return redirect(url_for('dashboard'))
-        
-        user_prefs = db.execute('SELECT * FROM user_preferences WHERE user_id = ?', (user_id,)).fetchone()
-        db.close()
+        preferences = get_user_preferences(user_id)
         
-        if not user_prefs:
+        if not preferences:
             flash('Please complete your profile first to access the roadmap.', 'warning')
             return redirect(url_for('questionnaire'))
         
-        # Convert to dict for template
-        preferences = dict(user_prefs)
-        
         return render_template('roadmap_page.html', 
                              user_name=session['user_name'],
                              user_preferences=preferences)
                              
-    except Exception as e:
-        print(f"Roadmap page error: {e}")
+    except Exception:
+        logger.exception("Roadmap page error")
         flash('Error loading roadmap page. Please try again.', 'danger')
         return redirect(url_for('dashboard'))
 
 @app.route('/generate-roadmap', methods=['POST'])
 def generate_roadmap_api():
-    """API endpoint to generate roadmap based on user input"""
+    """API endpoint to queue roadmap generation based on user input
+
+    Returns 202 with a job id; poll /roadmap-jobs/<id> for the roadmap.
+    When the job already finished (the queue runs jobs inline without
+    workers) the roadmap is returned directly with 200.
+    """
     if 'user_id' not in session:
         return {'error': 'Not authenticated'}, 401
     
     user_id = session['user_id']
     
+    weekly_hours, error = weekly_hours_from_form(request.form)
+    if error:
+        return {'error': error}, 400
+    
     try:
         # Get form data
-        skill_level = request.form.get('skill_level')
-        duration = int(request.form.get('duration', 8))
-        focus_area = request.form.get('focus_area')
-        learning_goals = request.form.get('learning_goals', '')
-        
-        # Get user preferences
-        db = get_db()
-        if not db:
-            return {'error': 'Database connection error'}, 500
-        
-        user_prefs = db.execute('SELECT * FROM user_preferences WHERE user_id = ?', (user_id,)).fetchone()
-        db.close()
+        options = {
+            'skill_level': request.form.get('skill_level'),
+            'duration': int(request.form.get('duration', 8)),
+            'weekly_hours': weekly_hours,
+            'focus_area': request.form.get('focus_area'),
+            'learning_goals': request.form.get('learning_goals', '')
+        }
         
-        if not user_prefs:
+        if not get_user_preferences(user_id):
             return {'error': 'User preferences not found'}, 400
         
-        # Update preferences with new data
-        preferences = dict(user_prefs)
-        preferences['skill_focus'] = skill_level
-        preferences['learning_duration'] = duration
-        preferences['focus_area'] = focus_area
-        preferences['learning_goals'] = learning_goals
-        
-        # Generate enhanced roadmap
-        roadmap = enhanced_roadmap_generator.generate_enhanced_roadmap(preferences)
-        
-        # Save roadmap
-        if save_user_roadmap(user_id, roadmap):
-            return {'success': True, 'roadmap': roadmap}
-        else:
-            return {'error': 'Failed to save roadmap'}, 500
+        job = job_queue.submit('generate_roadmap', user_id, options)
+        if job['status'] in ('done', 'failed'):
+            return job_response(job)
+        response = job_response(job)
+        response['status_url'] = url_for('roadmap_job_status', job_id=job['id'])
+        return response, 202
             
-    except Exception as e:
-        print(f"Roadmap generation error: {e}")
+    except Exception:
+        logger.exception("Roadmap generation error")
         return {'error': 'Internal server error'}, 500
 
+def job_response(job):
+    """JSON body describing a roadmap job, with the roadmap once it is done"""
+    response = {'success': True, 'job_id': job['id'], 'status': job['status']}
+    if job['status'] == 'done':
+        response.update(job['result'])
+    elif job['status'] == 'failed':
+        response['error'] = job['error']
+    return response
+
+def format_sse(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json_codec.dumps(data)}\n\n"
+
+@app.route('/generate-roadmap/stream', methods=['POST'])
+def generate_roadmap_stream():
+    """Generate a roadmap and stream it as Server-Sent Events
+
+    Emits a 'phase' event as each phase is built, then 'roadmap' with the
+    remaining fields (without phases) and 'done' with the saved version.
+    """
+    if 'user_id' not in session:
+        return {'error': 'Not authenticated'}, 401
+    
+    user_id = session['user_id']
+    preferences = get_user_preferences(user_id)
+    if not preferences:
+        return {'error': 'User preferences not found'}, 400
+    weekly_hours, error = weekly_hours_from_form(request.form)
+    if error:
+        return {'error': error}, 400
+    
+    # Update preferences with new data
+    preferences['skill_focus'] = request.form.get('skill_level')
+    preferences['learning_duration'] = request.form.get('duration', 8, type=int)
+    preferences['weekly_hours'] = weekly_hours
+    preferences['focus_area'] = request.form.get('focus_area')
+    preferences['learning_goals'] = request.form.get('learning_goals', '')
+    
+    def generate():
+        try:
+            for event, data in enhanced_roadmap_generator.stream_enhanced_roadmap(preferences):
+                if event == 'phase':
+                    yield format_sse('phase', data)
+                    continue
+                
+                roadmap = data
+                yield format_sse('roadmap', roadmap.to_dict(include_phases=False))
+                
+                # Save roadmap as a draft until the user accepts it
+                version = save_user_roadmap(user_id, roadmap, 'draft')
+                if version:
+                    yield format_sse('done', {'version': version})
+                else:
+                    yield format_sse('error', {'error': 'Failed to save roadmap'})
+        except Exception:
+            logger.exception("Roadmap stream error")
+            yield format_sse('error', {'error': 'Internal server error'})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/roadmap-jobs/<int:job_id>', methods=['GET'])
+def roadmap_job_status(job_id):
+    """Poll a roadmap generation job"""
+    if 'user_id' not in session:
+        return {'error': 'Not authenticated'}, 401
+    
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != session['user_id']:
+        return {'error': 'Job not found'}, 404
+    
+    return job_response(job)
+
 @app.route('/regenerate-roadmap', methods=['POST'])
 def regenerate_roadmap():
-    """Regenerate user's roadmap"""
+    """Queue regeneration of user's roadmap"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     user_id = session['user_id']
     
     try:
-        # Generate new roadmap
-        new_roadmap = generate_user_roadmap(user_id)
-        if new_roadmap:
-            flash('Your personalized roadmap has been updated!', 'success')
-        else:
+        if not get_user_preferences(user_id):
             flash('Error generating roadmap. Please complete your profile first.', 'warning')
-    except Exception as e:
-        print(f"Roadmap regeneration error: {e}")
+        else:
+            job_queue.submit('regenerate_roadmap', user_id)
+            flash('Your personalized roadmap is being updated. Refresh in a moment to see it.', 'success')
+    except Exception:
+        logger.exception("Roadmap regeneration error")
         flash('Error regenerating roadmap. Please try again.', 'danger')
     
     return redirect(url_for('dashboard'))
 
 @app.route('/accept-roadmap', methods=['POST'])
 def accept_roadmap():
-    """Accept a roadmap and make it active"""
+    """Accept a roadmap and make it active
+
+    Accepts either {'patch': [...], 'base_version': N} or the full {'roadmap': {...}}.
+    """
     if 'user_id' not in session:
         return {'error': 'Not authenticated'}, 401
     
     user_id = session['user_id']
     
     try:
-        data = request.get_json()
-        roadmap_data = data.get('roadmap')
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return {'error': 'Request body must be a JSON object'}, 400
         status = data.get('status', 'accepted')
         
-        if not roadmap_data:
-            return {'error': 'No roadmap data provided'}, 400
-        
         # Save the accepted roadmap
-        if save_user_roadmap(user_id, roadmap_data):
-            # Update roadmap status in database
-            db = get_db()
-            if db:
-                try:
-                    db.execute('''
-                        UPDATE user_roadmaps 
-                        SET roadmap_data = ?, updated_date = CURRENT_TIMESTAMP 
-                        WHERE user_id = ?
-                    ''', (json.dumps(roadmap_data), user_id))
-                    db.commit()
-                except sqlite3.Error as e:
-                    print(f"Error updating roadmap status: {e}")
-                finally:
-                    db.close()
+        response, status_code = save_roadmap_edit(user_id, data, status)
+        if status_code == 200:
+            response['message'] = 'Roadmap accepted successfully'
+        return response, status_code
             
-            return {'success': True, 'message': 'Roadmap accepted successfully'}
-        else:
-            return {'error': 'Failed to save roadmap'}, 500
-            
-    except Exception as e:
-        print(f"Accept roadmap error: {e}")
+    except Exception:
+        logger.exception("Accept roadmap error")
         return {'error': 'Internal server error'}, 500
 
 @app.route('/save-roadmap-draft', methods=['POST'])
 def save_roadmap_draft():
-    """Save a roadmap as draft"""
+    """Save a roadmap as draft
+
+    Accepts either {'patch': [...], 'base_version': N} or the full {'roadmap': {...}}.
+    """
     if 'user_id' not in session:
         return {'error': 'Not authenticated'}, 401
     
     user_id = session['user_id']
     
     try:
-        data = request.get_json()
-        roadmap_data = data.get('roadmap')
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return {'error': 'Request body must be a JSON object'}, 400
         status = data.get('status', 'draft')
         
-        if not roadmap_data:
-            return {'error': 'No roadmap data provided'}, 400
-        
         # Save the draft roadmap
-        if save_user_roadmap(user_id, roadmap_data):
-            return {'success': True, 'message': 'Roadmap saved as draft'}
-        else:
-            return {'error': 'Failed to save roadmap'}, 500
+        response, status_code = save_roadmap_edit(user_id, data, status)
+        if status_code == 200:
+            response['message'] = 'Roadmap saved as draft'
+        return response, status_code
             
-    except Exception as e:
-        print(f"Save roadmap draft error: {e}")
+    except Exception:
+        logger.exception("Save roadmap draft error")
         return {'error': 'Internal server error'}, 500
 
 @app.route('/update-roadmap-progress', methods=['POST'])
@@ -935,59 +1328,169 @@ def update_roadmap_progress():
     user_id = session['user_id']
     
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return {'error': 'Request body must be a JSON object'}, 400
         completed_topic_id = data.get('topic_id')
         
         if not completed_topic_id:
             return {'error': 'No topic ID provided'}, 400
         
         # Get current roadmap
-        roadmap = get_user_roadmap(user_id)
+        roadmap, status, _ = get_user_roadmap_head(user_id)
         if not roadmap:
             return {'error': 'No roadmap found'}, 404
         
-        # Update roadmap progress
-        updated_roadmap = enhanced_roadmap_generator.update_progress(roadmap, [completed_topic_id])
+        # Complete the topic and unlock the topics waiting on it
+        try:
+            unlocked = complete_topics(roadmap, [completed_topic_id])
+        except KeyError:
+            return {'error': 'Topic not found'}, 404
+        
+        # Re-plan the remaining topics if the user is behind or ahead of schedule
+        reschedule(roadmap, current_week(roadmap))
         
         # Save updated roadmap
-        if save_user_roadmap(user_id, updated_roadmap):
-            return {'success': True, 'roadmap': updated_roadmap}
+        version = save_user_roadmap(user_id, roadmap, status)
+        if version:
+            return {'success': True, 'roadmap': roadmap, 'version': version, 'unlocked': unlocked}
         else:
             return {'error': 'Failed to update roadmap'}, 500
             
-    except Exception as e:
-        print(f"Update roadmap progress error: {e}")
+    except Exception:
+        logger.exception("Update roadmap progress error")
         return {'error': 'Internal server error'}, 500
 
+@app.route('/roadmap-next-topics')
+def roadmap_next_topics():
+    """List the topics the user can study next"""
+    if 'user_id' not in session:
+        return {'error': 'Not authenticated'}, 401
+    
+    roadmap = get_user_roadmap(session['user_id'])
+    if not roadmap:
+        return {'error': 'No roadmap found'}, 404
+    
+    topics = [
+        {'id': topic['id'], 'title': topic['title'], 'estimated_hours': topic.get('estimated_hours')}
+        for topic in next_topics(roadmap)
+    ]
+    return {'success': True, 'topics': topics}
+
+def get_roadmap_phase(user_id, phase_id, if_none_match):
+    """Get one phase of user's active roadmap using the per-phase index
+
+    Returns (phase, etag) with an unquoted etag. phase is None when the client's copy is still
+    current (matching ETag) and the stored roadmap was not read at all.
+    Raises LookupError when there is no roadmap or no such phase.
+    """
+    db = get_db()
+    if not db:
+        raise LookupError('Database connection error')
+
+    try:
+        head = roadmap_history.load_active_head_meta(db, user_id)
+        if not head:
+            raise LookupError('No roadmap found')
+
+        etag = f'v{head["version"]}-p{phase_id}'
+        if if_none_match.contains(etag):
+            return None, etag
+
+        phase_index = json_codec.loads(head['phase_index']) if head['phase_index'] else None
+        if phase_index is None:
+            # Heads written before the phase index existed
+            row = execute(db, 'SELECT roadmap_data FROM user_roadmaps WHERE user_id = ? AND status = ?',
+                          (user_id, head['status'])).fetchone()
+            roadmap = json_codec.loads(row['roadmap_data'])
+            phase = next((p for p in roadmap['phases'] if p['id'] == phase_id), None)
+        else:
+            span = phase_index.get(str(phase_id))
+            phase_json = span and roadmap_history.load_phase_json(db, user_id, head['status'], *span)
+            phase = json_codec.loads(phase_json) if phase_json else None
+
+        if phase is None:
+            raise LookupError('Phase not found')
+        return phase, etag
+    finally:
+        db.close()
+
 @app.route('/get-roadmap-details', methods=['GET'])
 def get_roadmap_details():
-    """Get detailed roadmap information for a specific phase"""
+    """Get detailed roadmap information for a specific phase
+
+    Responses carry an ETag derived from the roadmap version, so an
+    unchanged phase is answered with 304 Not Modified.
+    """
     if 'user_id' not in session:
         return {'error': 'Not authenticated'}, 401
     
     user_id = session['user_id']
     phase_id = request.args.get('phase_id', type=int)
+    cache_headers = {'Cache-Control': 'private, no-cache'}
     
     try:
-        roadmap = get_user_roadmap(user_id)
-        if not roadmap:
-            return {'error': 'No roadmap found'}, 404
-        
         if phase_id:
             # Return specific phase details
-            phase = next((p for p in roadmap['phases'] if p['id'] == phase_id), None)
-            if phase:
-                return {'success': True, 'phase': phase}
-            else:
-                return {'error': 'Phase not found'}, 404
+            try:
+                phase, etag = get_roadmap_phase(user_id, phase_id, request.if_none_match)
+            except LookupError as e:
+                return {'error': str(e)}, 404
+            cache_headers['ETag'] = quote_etag(etag)
+            if phase is None:
+                return '', 304, cache_headers
+            return {'success': True, 'phase': phase}, 200, cache_headers
         else:
             # Return full roadmap
-            return {'success': True, 'roadmap': roadmap}
+            roadmap, _, version = get_user_roadmap_head(user_id)
+            if not roadmap:
+                return {'error': 'No roadmap found'}, 404
+            cache_headers['ETag'] = quote_etag(f'v{version}')
+            if request.if_none_match.contains(f'v{version}'):
+                return '', 304, cache_headers
+            return {'success': True, 'roadmap': roadmap}, 200, cache_headers
             
-    except Exception as e:
-        print(f"Get roadmap details error: {e}")
+    except Exception:
+        logger.exception("Get roadmap details error")
         return {'error': 'Internal server error'}, 500
 
+@app.route('/roadmap-history', methods=['GET'])
+def roadmap_history_list():
+    """List the versions of the user's roadmap"""
+    if 'user_id' not in session:
+        return {'error': 'Not authenticated'}, 401
+    
+    return {'success': True, 'versions': get_roadmap_history(session['user_id'])}
+
+@app.route('/roadmap-history/<int:version>', methods=['GET'])
+def roadmap_history_version(version):
+    """Get one version of the user's roadmap"""
+    if 'user_id' not in session:
+        return {'error': 'Not authenticated'}, 401
+    
+    roadmap = get_roadmap_version(session['user_id'], version)
+    if not roadmap:
+        return {'error': 'Roadmap version not found'}, 404
+    return {'success': True, 'version': version, 'roadmap': roadmap}
+
+@app.route('/admin/slow-queries', methods=['GET', 'POST'])
+def admin_slow_queries():
+    """Slow statements recorded by this process, newest first; POST also empties the log afterwards"""
+    if 'user_id' not in session:
+        return {'error': 'Not authenticated'}, 401
+    if session['user_id'] not in app.config.get('ADMIN_USER_IDS', ()):
+        return {'error': 'Forbidden'}, 403
+    
+    queries = slow_query_log.recent(request.args.get('limit', type=int))
+    if request.method == 'POST':
+        slow_query_log.clear()
+    return {
+        'success': True,
+        'threshold_ms': slow_query_log.threshold_ms,
+        'pid': os.getpid(),
+        'queries': queries
+    }
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -12,6 +12,8 @@ Usage:
 import os
 import sys
 
+from db_utils import apply_migrations
+
 try:
     import psycopg2
     PSYCOPG_VERSION = 2
@@ -67,6 +69,7 @@ def init_production_db():
                 target_company VARCHAR(255) NOT NULL,
                 position VARCHAR(255) NOT NULL,
                 previous_skills TEXT NOT NULL,
+                skills_mask INTEGER,
                 specialization VARCHAR(255) NOT NULL,
                 skill_focus VARCHAR(255) NOT NULL,
                 FOREIGN KEY (user_id) REFERENCES users (id)
@@ -88,18 +91,74 @@ def init_production_db():
             )
         ''')
         
+        print("📋 Creating test_topic_scores table...")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS test_topic_scores (
+                result_id INTEGER NOT NULL,
+                topic VARCHAR(64) NOT NULL,
+                score INTEGER NOT NULL,
+                questions INTEGER NOT NULL,
+                PRIMARY KEY (result_id, topic),
+                FOREIGN KEY (result_id) REFERENCES test_results (id)
+            )
+        ''')
+        
+        print("📋 Creating test_responses table...")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS test_responses (
+                result_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                question_id VARCHAR(128) NOT NULL,
+                answer TEXT,
+                correct INTEGER NOT NULL,
+                PRIMARY KEY (result_id, position),
+                FOREIGN KEY (result_id) REFERENCES test_results (id)
+            )
+        ''')
+        
+        print("📋 Creating question_difficulty table...")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_difficulty (
+                question_id VARCHAR(128) PRIMARY KEY,
+                difficulty REAL NOT NULL,
+                responses INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         print("📋 Creating user_roadmaps table...")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_roadmaps (
                 id SERIAL PRIMARY KEY,
                 user_id INTEGER NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'accepted',
                 roadmap_data TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1,
+                phase_index TEXT,
                 created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
         
+        print("📋 Creating roadmap_versions table...")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS roadmap_versions (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                base_version INTEGER,
+                chain_length INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        print("📋 Adding columns and unique keys...")
+        apply_migrations(cursor)
+        
         conn.commit()
         print("✅ All tables created successfully!")
         
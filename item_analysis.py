@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Item statistics for the question banks
+Reads every stored answer from test_responses and computes, per question:
+difficulty (share of attempts answered correctly), discrimination (the
+point-biserial correlation between getting the question right and the
+score on the rest of the test) and how often each option was chosen. The
+responses are streamed into compact integer arrays, and with NumPy every
+statistic comes from a few bincount passes over all of them at once; the
+pure Python fallback accumulates the same sums in one loop. With --save
+the difficulties are stored in question_difficulty for adaptive tests.
+
+Usage:
+    python item_analysis.py [--database users.db] [--min-responses 30] [--all] [--save]
+"""
+
+import argparse
+import array
+import math
+import os
+import sqlite3
+import sys
+
+from db_utils import execute, executemany, upsert_query
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+FETCH_SIZE = 10000
+
+# Flag questions nearly everyone (or nearly no one) gets right, or that strong
+# candidates miss as often as weak ones
+EASY_DIFFICULTY = 0.95
+HARD_DIFFICULTY = 0.2
+LOW_DISCRIMINATION = 0.1
+DEFAULT_MIN_RESPONSES = 30
+
+# Answer code of an unanswered question
+UNANSWERED = 0
+
+# Difficulty logits saved for adaptive tests are clamped to +/- this
+MAX_DIFFICULTY = 4.0
+
+DIFFICULTY_UPSERT = upsert_query('question_difficulty', ['question_id', 'difficulty', 'responses'], ['question_id'],
+                                 ['difficulty', 'responses'], touch_columns=['updated_at'])
+
+
+class Responses:
+    """Stored answers as parallel integer arrays
+
+    question_ids and answers are the distinct question ids and answer keys;
+    the arrays hold, per response, the index of its question, the index of
+    its attempt, its answer code (1 + index into answers, or UNANSWERED) and
+    whether it was correct.
+    """
+
+    def __init__(self):
+        self.question_ids = []
+        self.answers = []
+        self.questions = array.array('I')
+        self.attempts = array.array('I')
+        self.answer_codes = array.array('H')
+        self.correct = array.array('B')
+
+    def __len__(self):
+        return len(self.correct)
+
+
+def load_responses(db, fetch_size=FETCH_SIZE):
+    """Stream test_responses into a Responses, encoding ids as integers"""
+    responses = Responses()
+    question_codes = {}
+    answer_codes = {}
+    attempt_codes = {}
+    cursor = execute(db, 'SELECT result_id, question_id, answer, correct FROM test_responses')
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for row in rows:
+            result_id, question_id, answer = row['result_id'], row['question_id'], row['answer']
+            question = question_codes.get(question_id)
+            if question is None:
+                question = question_codes[question_id] = len(responses.question_ids)
+                responses.question_ids.append(question_id)
+            if answer:
+                code = answer_codes.get(answer)
+                if code is None:
+                    responses.answers.append(answer)
+                    code = answer_codes[answer] = len(responses.answers)
+            else:
+                code = UNANSWERED
+            attempt = attempt_codes.get(result_id)
+            if attempt is None:
+                attempt = attempt_codes[result_id] = len(attempt_codes)
+            responses.questions.append(question)
+            responses.attempts.append(attempt)
+            responses.answer_codes.append(code)
+            responses.correct.append(1 if row['correct'] else 0)
+    return responses
+
+
+def _item_sums_numpy(responses):
+    """Per-question (n, sum c, sum x, sum x^2, sum cx, option counts) over all responses at once
+
+    c is 1 for a correct answer and x is the attempt's score without this question.
+    """
+    questions = np.frombuffer(responses.questions, dtype=np.uint32).astype(np.intp)
+    attempts = np.frombuffer(responses.attempts, dtype=np.uint32).astype(np.intp)
+    codes = np.frombuffer(responses.answer_codes, dtype=np.uint16).astype(np.intp)
+    correct = np.frombuffer(responses.correct, dtype=np.uint8).astype(np.float64)
+    count = len(responses.question_ids)
+    options = len(responses.answers) + 1
+
+    rest = np.bincount(attempts, weights=correct)[attempts] - correct
+    sums = [np.bincount(questions, weights=weights, minlength=count)
+            for weights in (None, correct, rest, rest * rest, correct * rest)]
+    chosen = np.bincount(questions * options + codes, minlength=count * options).reshape(count, options)
+    return [column.tolist() for column in sums] + [chosen.tolist()]
+
+
+def _item_sums_python(responses):
+    """Pure Python version of _item_sums_numpy"""
+    count = len(responses.question_ids)
+    options = len(responses.answers) + 1
+    totals = [0] * (max(responses.attempts) + 1 if responses.attempts else 0)
+    for attempt, correct in zip(responses.attempts, responses.correct):
+        totals[attempt] += correct
+
+    n, sum_c, sum_x, sum_x2, sum_cx = ([0] * count for _ in range(5))
+    chosen = [[0] * options for _ in range(count)]
+    for question, attempt, code, correct in zip(responses.questions, responses.attempts,
+                                                responses.answer_codes, responses.correct):
+        rest = totals[attempt] - correct
+        n[question] += 1
+        sum_c[question] += correct
+        sum_x[question] += rest
+        sum_x2[question] += rest * rest
+        sum_cx[question] += correct * rest
+        chosen[question][code] += 1
+    return [n, sum_c, sum_x, sum_x2, sum_cx, chosen]
+
+
+def _question_order(question_id):
+    """Sort key putting 'python:2' before 'python:10'"""
+    topic, _, index = question_id.rpartition(':')
+    return (topic, int(index)) if index.isdigit() else (question_id, -1)
+
+
+def item_statistics(responses, use_numpy=None):
+    """Return one dict per question, sorted by question id
+
+    Keys: 'question_id', 'responses', 'difficulty', 'discrimination' (None
+    when everyone or no one answered correctly, or every rest score is
+    equal) and 'options' ({answer: times chosen}, '' for unanswered).
+    """
+    if not len(responses):
+        return []
+    use_numpy = NUMPY_AVAILABLE if use_numpy is None else use_numpy
+    n, sum_c, sum_x, sum_x2, sum_cx, chosen = (_item_sums_numpy if use_numpy else _item_sums_python)(responses)
+    labels = [''] + responses.answers
+
+    items = []
+    for question, question_id in enumerate(responses.question_ids):
+        count = n[question]
+        difficulty = sum_c[question] / count
+        mean_x = sum_x[question] / count
+        variance = difficulty * (1 - difficulty) * (sum_x2[question] / count - mean_x * mean_x)
+        discrimination = None
+        if variance > 1e-12:
+            discrimination = (sum_cx[question] / count - difficulty * mean_x) / math.sqrt(variance)
+        items.append({
+            'question_id': question_id,
+            'responses': int(count),
+            'difficulty': difficulty,
+            'discrimination': discrimination,
+            'options': {labels[code]: int(times) for code, times in enumerate(chosen[question]) if times}
+        })
+    items.sort(key=lambda item: _question_order(item['question_id']))
+    return items
+
+
+def item_flags(item):
+    """Reasons a question needs review"""
+    flags = []
+    if item['difficulty'] >= EASY_DIFFICULTY:
+        flags.append('too easy')
+    elif item['difficulty'] <= HARD_DIFFICULTY:
+        flags.append('too hard')
+    if item['discrimination'] is not None and item['discrimination'] < LOW_DISCRIMINATION:
+        flags.append('low discrimination')
+    return flags
+
+
+def difficulty_logit(proportion):
+    """Logit difficulty of a question answered correctly by the given share of attempts"""
+    proportion = min(max(proportion, 0.02), 0.98)
+    return min(max(math.log((1 - proportion) / proportion), -MAX_DIFFICULTY), MAX_DIFFICULTY)
+
+
+def save_difficulties(db, items):
+    """Upsert the difficulty logit of every item into question_difficulty for adaptive tests"""
+    executemany(db, DIFFICULTY_UPSERT, [
+        (item['question_id'], difficulty_logit(item['difficulty']), item['responses']) for item in items
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute difficulty and discrimination of every question.')
+    parser.add_argument('--database', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db'))
+    parser.add_argument('--min-responses', type=int, default=DEFAULT_MIN_RESPONSES,
+                        help='skip questions answered fewer times than this')
+    parser.add_argument('--all', action='store_true', help='list every question, not only flagged ones')
+    parser.add_argument('--save', action='store_true',
+                        help='store the difficulties of questions with enough responses for adaptive tests')
+    args = parser.parse_args(argv)
+
+    try:
+        conn = sqlite3.connect(args.database)
+        conn.row_factory = sqlite3.Row
+        try:
+            responses = load_responses(conn)
+            items = [item for item in item_statistics(responses) if item['responses'] >= args.min_responses]
+            if args.save:
+                save_difficulties(conn, items)
+                conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error analysing responses: {e}")
+        return 1
+
+    print(f"{len(responses)} responses to {len(responses.question_ids)} questions, "
+          f"{len(items)} with at least {args.min_responses} responses")
+    print(f"{'question':24}{'n':>8}{'p':>7}{'r_pb':>7}  options  flags")
+    for item in items:
+        flags = item_flags(item)
+        if not flags and not args.all:
+            continue
+        discrimination = '-' if item['discrimination'] is None else f"{item['discrimination']:.2f}"
+        options = ' '.join(f"{key or '-'}:{times}" for key, times in sorted(item['options'].items()))
+        print(f"{item['question_id']:24}{item['responses']:>8}{item['difficulty']:>7.2f}{discrimination:>7}  "
+              f"{options}  {', '.join(flags)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
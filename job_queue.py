@@ -0,0 +1,193 @@
+"""
+Local background job queue
+Jobs are persisted in a SQLite table and run by a thread pool, so slow work
+such as roadmap generation does not hold up HTTP workers. Identical jobs that
+are still pending or running for the same user are deduplicated.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+# Running jobs older than this were left behind by a process that died
+STALE_AFTER_SECONDS = 600
+
+
+class JobQueue:
+    """SQLite-backed job queue with a thread pool of workers
+
+    With max_workers=0 jobs run inline in submit(); use this where threads
+    do not outlive the request (e.g. serverless functions). The job row and
+    polling API behave the same either way.
+    """
+
+    def __init__(self, db_path, max_workers=2, stale_after=STALE_AFTER_SECONDS):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.stale_after = stale_after
+        self._handlers = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def handler(self, kind):
+        """Decorator registering the function that runs jobs of a kind
+
+        The function is called as handler(user_id, payload) and returns a
+        JSON-serializable result; raising marks the job failed.
+        """
+        def register(func):
+            self._handlers[kind] = func
+            return func
+        return register
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_started(self):
+        """Create the jobs table and worker pool, requeue leftover jobs and fail stale ones"""
+        with self._lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        kind TEXT NOT NULL,
+                        user_id INTEGER NOT NULL,
+                        payload TEXT NOT NULL,
+                        dedupe_key TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        result TEXT,
+                        error TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        started_at TIMESTAMP,
+                        finished_at TIMESTAMP
+                    )
+                ''')
+                conn.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_dedupe
+                    ON jobs (dedupe_key) WHERE status IN ('pending', 'running')
+                ''')
+                # Jobs still 'running' long after they started belong to a dead
+                # worker; they would otherwise be returned by deduplication forever
+                conn.execute('''
+                    UPDATE jobs SET status = 'failed', error = 'Worker stopped before the job finished',
+                    finished_at = CURRENT_TIMESTAMP
+                    WHERE status = 'running' AND started_at < datetime('now', ?)
+                ''', (f'-{int(self.stale_after)} seconds',))
+                conn.commit()
+                pending = [row['id'] for row in conn.execute("SELECT id FROM jobs WHERE status = 'pending'")]
+            finally:
+                conn.close()
+
+            if self.max_workers > 0:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='job-worker')
+            self._initialized = True
+
+        # Jobs accepted by a previous process that never started
+        for job_id in pending:
+            self._dispatch(job_id)
+
+    def _dispatch(self, job_id):
+        if self._executor is not None:
+            self._executor.submit(self._run, job_id)
+        else:
+            self._run(job_id)
+
+    def submit(self, kind, user_id, payload=None):
+        """Queue a job and return its row as a dict
+
+        If an identical job for the user is already pending or running,
+        that job is returned instead of creating a new one.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        self._ensure_started()
+
+        payload_json = json_codec.dumps(payload or {}, sort_keys=True)
+        dedupe_key = hashlib.sha1(f"{kind}:{user_id}:{payload_json}".encode()).hexdigest()
+
+        conn = self._connect()
+        try:
+            while True:
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO jobs (kind, user_id, payload, dedupe_key) VALUES (?, ?, ?, ?)
+                ''', (kind, user_id, payload_json, dedupe_key))
+                conn.commit()
+                created = cursor.rowcount == 1
+                if created:
+                    job_id = cursor.lastrowid
+                    break
+                row = conn.execute(f'''
+                    SELECT id FROM jobs WHERE dedupe_key = ?
+                    AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})
+                ''', (dedupe_key, *ACTIVE_STATUSES)).fetchone()
+                if row:
+                    job_id = row['id']
+                    break
+                # The duplicate finished in between, so queue a fresh job
+        finally:
+            conn.close()
+
+        if created:
+            self._dispatch(job_id)
+        return self.get(job_id)
+
+    def _run(self, job_id):
+        """Claim a pending job, run its handler and store the outcome"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'pending'
+            ''', (job_id,))
+            conn.commit()
+            if cursor.rowcount == 0:
+                # Another worker or process already claimed it
+                return
+            job = conn.execute('SELECT kind, user_id, payload FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+            try:
+                result = self._handlers[job['kind']](job['user_id'], json_codec.loads(job['payload']))
+                conn.execute('''
+                    UPDATE jobs SET status = 'done', result = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?
+                ''', (json_codec.dumps(result), job_id))
+            except Exception as e:
+                logger.exception('Job %s failed', job_id, extra={'job_id': job_id, 'kind': job['kind']})
+                conn.execute('''
+                    UPDATE jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?
+                ''', (str(e) or e.__class__.__name__, job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it does not exist"""
+        self._ensure_started()
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT id, kind, user_id, status, result, error, created_at, started_at, finished_at
+                FROM jobs WHERE id = ?
+            ''', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        job = dict(row)
+        job['result'] = json_codec.loads(job['result']) if job['result'] else None
+        return job
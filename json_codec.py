@@ -0,0 +1,101 @@
+"""
+JSON serialization
+Roadmaps are encoded with orjson when it is installed and with the standard
+library otherwise. Both backends produce the same compact UTF-8 text, so
+stored roadmaps and phase offsets do not depend on which one wrote them.
+Objects with a to_dict() method (the roadmap model) serialize as that dict
+and sets as sorted lists.
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+COMPACT_SEPARATORS = (',', ':')
+
+
+def to_plain(obj):
+    """Fallback for values JSON has no type for"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_options(sort_keys, indent, default):
+    options = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        options |= orjson.OPT_SORT_KEYS
+    if indent:
+        options |= orjson.OPT_INDENT_2
+    if default is not to_plain:
+        # Leave dates and dataclasses to the caller's default, as the stdlib would
+        options |= orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    return options
+
+
+def dumps_bytes(obj, sort_keys=False, indent=None, default=to_plain):
+    """Serialize obj to UTF-8 encoded JSON"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, default=default, option=_orjson_options(sort_keys, indent, default))
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits; the stdlib handles these
+            pass
+    return _stdlib_dumps(obj, sort_keys, indent, default).encode('utf-8')
+
+
+def dumps(obj, sort_keys=False, indent=None, default=to_plain):
+    """Serialize obj to a JSON string"""
+    if ORJSON_AVAILABLE:
+        return dumps_bytes(obj, sort_keys, indent, default).decode('utf-8')
+    return _stdlib_dumps(obj, sort_keys, indent, default)
+
+
+def _stdlib_dumps(obj, sort_keys, indent, default):
+    return json.dumps(obj, sort_keys=sort_keys, indent=2 if indent else None, default=default,
+                      ensure_ascii=False, separators=None if indent else COMPACT_SEPARATORS)
+
+
+def loads(data):
+    """Parse JSON from str or bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with json_codec"""
+
+    # Responses keep the roadmap's own field order
+    sort_keys = False
+
+    @staticmethod
+    def default(obj):
+        if hasattr(obj, 'to_dict') or isinstance(obj, (set, frozenset)):
+            return to_plain(obj)
+        return DefaultJSONProvider.default(obj)
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {'sort_keys', 'indent', 'separators', 'default', 'ensure_ascii'}:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys), indent=kwargs.get('indent'),
+                     default=kwargs.get('default', self.default))
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, indent=indent, default=self.default)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
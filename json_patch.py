@@ -0,0 +1,209 @@
+"""
+JSON Patch (RFC 6902) support for roadmap edits
+Clients send small deltas instead of the whole roadmap document
+"""
+
+import copy
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch is malformed or cannot be applied"""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """Raised when a 'test' operation does not match the document"""
+
+
+def _parse_pointer(pointer):
+    """Split a JSON Pointer (RFC 6901) into unescaped reference tokens"""
+    if pointer == '':
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _escape_token(token):
+    """Escape a key for use in a JSON Pointer"""
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _list_index(container, token, allow_end=False):
+    """Convert a pointer token into a list index"""
+    if allow_end and token == '-':
+        return len(container)
+    if not (token.isascii() and token.isdigit()) or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve_parent(document, tokens):
+    """Walk to the container holding the last token of a pointer"""
+    target = document
+    for token in tokens[:-1]:
+        if isinstance(target, dict):
+            if token not in target:
+                raise JsonPatchError(f"Path not found: {token!r}")
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_list_index(target, token)]
+        else:
+            raise JsonPatchError(f"Cannot traverse into scalar at {token!r}")
+    return target
+
+
+def _get(document, tokens):
+    """Return the value a pointer refers to"""
+    if not tokens:
+        return document
+    parent = _resolve_parent(document, tokens)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {key!r}")
+        return parent[key]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, key)]
+    raise JsonPatchError(f"Cannot index scalar with {key!r}")
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve_parent(document, tokens)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add to scalar at {key!r}")
+    return document
+
+
+def _remove(document, tokens):
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    parent = _resolve_parent(document, tokens)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {key!r}")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, key))
+    raise JsonPatchError(f"Cannot remove from scalar at {key!r}")
+
+
+def _replace(document, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve_parent(document, tokens)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {key!r}")
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent[_list_index(parent, key)] = value
+    else:
+        raise JsonPatchError(f"Cannot replace in scalar at {key!r}")
+    return document
+
+
+def apply_patch(document, operations):
+    """Apply a list of JSON Patch operations and return the patched document
+
+    The document is modified in place, so each operation only touches the
+    containers on its own path. Callers that need the original on failure
+    must pass a copy.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("Patch must be a list of operations")
+
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError(f"Invalid patch operation: {operation!r}")
+
+        op = operation['op']
+        tokens = _parse_pointer(operation['path'])
+
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f"Operation '{op}' requires a value")
+
+        if op == 'add':
+            document = _add(document, tokens, operation['value'])
+        elif op == 'remove':
+            _remove(document, tokens)
+        elif op == 'replace':
+            document = _replace(document, tokens, operation['value'])
+        elif op == 'move':
+            from_tokens = _parse_pointer(operation.get('from'))
+            if tokens[:len(from_tokens)] == from_tokens and len(tokens) > len(from_tokens):
+                raise JsonPatchError("Cannot move a value into one of its children")
+            if from_tokens != tokens:
+                document = _add(document, tokens, _remove(document, from_tokens))
+        elif op == 'copy':
+            from_tokens = _parse_pointer(operation.get('from'))
+            document = _add(document, tokens, copy.deepcopy(_get(document, from_tokens)))
+        elif op == 'test':
+            if _get(document, tokens) != operation['value']:
+                raise JsonPatchTestFailed(f"Test failed at {operation['path']!r}")
+        else:
+            raise JsonPatchError(f"Unknown patch operation: {op!r}")
+
+    return document
+
+
+def _reorder_moves(source, target, path):
+    """Return 'move' operations if target is a reordering of source, else None"""
+    current = list(source)
+    operations = []
+    for index, item in enumerate(target):
+        if current[index] == item:
+            continue
+        found = next((j for j in range(index + 1, len(current)) if current[j] == item), None)
+        if found is None:
+            return None
+        current.insert(index, current.pop(found))
+        operations.append({'op': 'move', 'from': f"{path}/{found}", 'path': f"{path}/{index}"})
+    return operations
+
+
+def make_patch(source, target, path=''):
+    """Compute a JSON Patch that turns source into target
+
+    Dicts are compared key by key. A reordered list becomes 'move' operations
+    and other equal-length lists are compared item by item; anything else
+    that differs is replaced wholesale.
+    """
+    if source == target:
+        return []
+
+    if isinstance(source, dict) and isinstance(target, dict):
+        operations = []
+        for key in source:
+            if key not in target:
+                operations.append({'op': 'remove', 'path': f"{path}/{_escape_token(key)}"})
+        for key, value in target.items():
+            child = f"{path}/{_escape_token(key)}"
+            if key not in source:
+                operations.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                operations.extend(make_patch(source[key], value, child))
+        return operations
+
+    if isinstance(source, list) and isinstance(target, list) and len(source) == len(target):
+        moves = _reorder_moves(source, target, path)
+        if moves is not None:
+            return moves
+        operations = []
+        for index, (old, new) in enumerate(zip(source, target)):
+            operations.extend(make_patch(old, new, f"{path}/{index}"))
+        return operations
+
+    return [{'op': 'replace', 'path': path, 'value': target}]
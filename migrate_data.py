@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Move the app's data between databases
+export streams every table of a SQLite file or PostgreSQL database (through
+a server-side cursor) into one NDJSON file per table, reading all tables
+from one snapshot. import loads such a directory into SQLite, PostgreSQL
+(COPY into a staging table, then one INSERT ... SELECT) or Firestore
+(batched writes, one collection per table). Both hold one batch in memory
+at a time, whatever the table size.
+
+Ids are kept when the target is empty. Otherwise each table's ids are
+shifted past the target's largest id, and the foreign keys pointing at them
+move with them, so the mapping is target id = source id + offset. A user
+whose email is already registered in the target is not inserted; it maps
+to the existing user instead, and the rows referring to it are attached to
+that user. Offsets and these exceptions are recorded in the directory's
+import-<target hash>.json. That file is also the checkpoint of the import
+into that target: an interrupted import continues after the last committed
+batch, and rows already written are skipped, so a batch that is repeated
+is harmless. Rows that still clash with a unique key, such as preferences
+of a user who already has some, are counted as already present. An
+interrupted export skips the tables it had finished.
+
+Usage:
+    python migrate_data.py export SOURCE DIRECTORY [--tables users,test_results]
+    python migrate_data.py import DIRECTORY TARGET [--batch-size 5000] [--restart]
+
+SOURCE and TARGET are a SQLite file or a postgresql:// URL; TARGET can also be
+'firestore', configured as for the app.
+"""
+
+import argparse
+import datetime
+import decimal
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+import json_codec
+from db_utils import execute, is_sqlite
+
+try:
+    import psycopg
+    POSTGRES_AVAILABLE = True
+    DATABASE_ERRORS = (sqlite3.Error, psycopg.Error)
+except ImportError:
+    POSTGRES_AVAILABLE = False
+    DATABASE_ERRORS = (sqlite3.Error,)
+
+DEFAULT_BATCH_SIZE = 5000
+FETCH_SIZE = 2000
+
+# Firestore commits at most this many writes at once
+FIRESTORE_BATCH_SIZE = 500
+
+# Natural keys looked up per statement when matching imported rows to existing ones
+LOOKUP_SIZE = 500
+
+MANIFEST = 'manifest.json'
+FIRESTORE = 'firestore'
+
+# In foreign key order: key columns, the generated id column, and {column: table whose id it holds}.
+# A row whose 'natural_key' is already in the target maps to the existing row.
+TABLES = {
+    'users': {'key': ('id',), 'id': 'id', 'references': {}, 'natural_key': 'email'},
+    'user_preferences': {'key': ('id',), 'id': 'id', 'references': {'user_id': 'users'}},
+    'test_results': {'key': ('id',), 'id': 'id', 'references': {'user_id': 'users'}},
+    'test_topic_scores': {'key': ('result_id', 'topic'), 'id': None, 'references': {'result_id': 'test_results'}},
+    'test_responses': {'key': ('result_id', 'position'), 'id': None, 'references': {'result_id': 'test_results'}},
+    'question_difficulty': {'key': ('question_id',), 'id': None, 'references': {}},
+    'user_roadmaps': {'key': ('id',), 'id': 'id', 'references': {'user_id': 'users'}},
+    'roadmap_versions': {'key': ('id',), 'id': 'id', 'references': {'user_id': 'users'}},
+}
+
+
+def connect(database):
+    """SQLite or PostgreSQL connection, or the Firestore client for 'firestore'"""
+    if database == FIRESTORE:
+        # Imported here since firebase_admin is only needed for this target
+        from firebase_db import initialize_firebase
+        client = initialize_firebase()
+        if client is None:
+            raise RuntimeError('Firebase is not configured')
+        return client
+    if database.startswith(('postgres://', 'postgresql://')):
+        if not POSTGRES_AVAILABLE:
+            raise RuntimeError('psycopg is not installed')
+        return psycopg.connect(database)
+    return sqlite3.connect(database)
+
+
+def table_exists(conn, table):
+    if is_sqlite(conn):
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    else:
+        query = 'SELECT 1 FROM information_schema.tables WHERE table_name = ?'
+    return execute(conn, query, (table,)).fetchone() is not None
+
+
+def table_columns(conn, table):
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT * FROM {table} LIMIT 0')
+    columns = [column[0] for column in cursor.description]
+    cursor.close()
+    return columns
+
+
+def iter_rows(conn, table, columns, fetch_size=FETCH_SIZE):
+    """Yield the rows of a table as tuples, in key order, fetch_size at a time"""
+    query = f"SELECT {', '.join(columns)} FROM {table} ORDER BY {', '.join(TABLES[table]['key'])}"
+    if is_sqlite(conn):
+        cursor = conn.execute(query)
+    else:
+        # A named cursor keeps the result on the server
+        cursor = conn.cursor(name=f'export_{table}')
+        cursor.itersize = fetch_size
+        cursor.execute(query)
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def _plain_value(value):
+    """Dates and decimals from PostgreSQL, as SQLite would return them"""
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return json_codec.to_plain(value)
+
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'rb') as f:
+        return json_codec.loads(f.read())
+
+
+def _save_json(path, data):
+    """Replace a JSON file atomically, so a crash leaves the previous checkpoint"""
+    with open(path + '.tmp', 'wb') as f:
+        f.write(json_codec.dumps_bytes(data, indent=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def export_database(conn, directory, tables=None, report=print):
+    """Write each table to <directory>/<table>.ndjson; returns the manifest
+
+    Tables already in the directory's manifest are skipped, so a repeated
+    export finishes an interrupted one.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    manifest = _load_json(manifest_path, {'tables': {}})
+    # Read every table from one snapshot
+    if is_sqlite(conn):
+        conn.execute('BEGIN')
+    else:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+    try:
+        for table in TABLES:
+            if (tables and table not in tables) or table in manifest['tables'] or not table_exists(conn, table):
+                continue
+            columns = table_columns(conn, table)
+            path = os.path.join(directory, f"{table}.ndjson")
+            rows = 0
+            with open(path + '.part', 'wb') as f:
+                for row in iter_rows(conn, table, columns):
+                    f.write(json_codec.dumps_bytes(dict(zip(columns, row)), default=_plain_value))
+                    f.write(b'\n')
+                    rows += 1
+            os.replace(path + '.part', path)
+            manifest['tables'][table] = {'columns': columns, 'rows': rows}
+            _save_json(manifest_path, manifest)
+            report(f"{table}: {rows} rows")
+    finally:
+        conn.rollback()
+    return manifest
+
+
+class SQLWriter:
+    """Insert rows into SQLite or PostgreSQL, skipping rows whose key is already there"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def columns(self, table):
+        return table_columns(self.conn, table) if table_exists(self.conn, table) else None
+
+    def largest_id(self, table):
+        return execute(self.conn, f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0
+
+    def write(self, table, columns, rows):
+        """Insert one batch and commit; returns the number of rows inserted"""
+        column_list = ', '.join(columns)
+        if is_sqlite(self.conn):
+            before = self.conn.total_changes
+            self.conn.executemany(f"INSERT INTO {table} ({column_list}) VALUES ({', '.join('?' for _ in columns)}) "
+                                  f"ON CONFLICT DO NOTHING", rows)
+            inserted = self.conn.total_changes - before
+        else:
+            with self.conn.cursor() as cursor:
+                cursor.execute(f'CREATE TEMP TABLE import_batch (LIKE {table}) ON COMMIT DROP')
+                with cursor.copy(f'COPY import_batch ({column_list}) FROM STDIN') as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                cursor.execute(f'INSERT INTO {table} ({column_list}) SELECT {column_list} FROM import_batch '
+                               f'ON CONFLICT DO NOTHING')
+                inserted = cursor.rowcount
+        self.conn.commit()
+        return inserted
+
+    def existing_ids(self, table, column, values):
+        """{natural key: id} of the target's rows whose column holds one of values"""
+        found = {}
+        for start in range(0, len(values), LOOKUP_SIZE):
+            chunk = values[start:start + LOOKUP_SIZE]
+            rows = execute(self.conn, f"SELECT {column}, id FROM {table} WHERE {column} IN "
+                                      f"({', '.join('?' for _ in chunk)})", chunk).fetchall()
+            found.update((row[0], row[1]) for row in rows)
+        return found
+
+    def finish(self):
+        """Move PostgreSQL id sequences past the imported ids"""
+        if is_sqlite(self.conn):
+            return
+        for table, spec in TABLES.items():
+            if spec['id'] and table_exists(self.conn, table):
+                execute(self.conn, f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                   f"(SELECT MAX(id) FROM {table})) WHERE EXISTS (SELECT 1 FROM {table})")
+        self.conn.commit()
+
+
+class FirestoreWriter:
+    """Write rows as documents of one collection per table, keyed by the row's key columns
+
+    References hold the referenced document's id, as FirebaseDB stores them.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def columns(self, table):
+        return None
+
+    def largest_id(self, table):
+        # Documents the app created have generated ids, which numeric ids cannot collide with
+        return 0
+
+    def existing_ids(self, table, column, values):
+        # Imported documents are keyed by id, so there is nothing to match them to
+        return {}
+
+    def write(self, table, columns, rows):
+        collection = self.client.collection(table)
+        key_positions = [columns.index(column) for column in TABLES[table]['key']]
+        reference_positions = [columns.index(column) for column in TABLES[table]['references']]
+        for start in range(0, len(rows), FIRESTORE_BATCH_SIZE):
+            batch = self.client.batch()
+            for row in rows[start:start + FIRESTORE_BATCH_SIZE]:
+                document = dict(zip(columns, row))
+                for position in reference_positions:
+                    document[columns[position]] = str(row[position])
+                batch.set(collection.document('_'.join(str(row[position]) for position in key_positions)), document)
+            batch.commit()
+        return len(rows)
+
+    def finish(self):
+        pass
+
+
+def state_path(directory, target):
+    """Checkpoint file of importing directory into target, named without the target's credentials"""
+    return os.path.join(directory, f"import-{hashlib.sha256(target.encode('utf-8')).hexdigest()[:16]}.json")
+
+
+def import_database(directory, writer, checkpoint, batch_size=DEFAULT_BATCH_SIZE, restart=False, report=print):
+    """Load an export directory through writer, resuming from the checkpoint file; returns the import state"""
+    manifest = _load_json(os.path.join(directory, MANIFEST), None)
+    if manifest is None:
+        raise RuntimeError(f"No {MANIFEST} in {directory}")
+    state = None if restart else _load_json(checkpoint, None)
+    if state is None:
+        # Offsets are fixed at the start, so a resumed import maps ids the same way
+        state = {
+            'id_offsets': {table: writer.largest_id(table) for table, spec in TABLES.items()
+                           if spec['id'] and table in manifest['tables']},
+            # {table: {source id: target id}} for rows matched to existing ones by natural key
+            'id_map': {},
+            'tables': {}
+        }
+        _save_json(checkpoint, state)
+    offsets = state['id_offsets']
+    id_map = state['id_map']
+
+    for table, spec in TABLES.items():
+        if table not in manifest['tables']:
+            continue
+        progress = state['tables'].setdefault(table, {'offset': 0, 'read': 0, 'inserted': 0, 'done': False})
+        if progress['done']:
+            continue
+        target_columns = writer.columns(table)
+        columns = [column for column in manifest['tables'][table]['columns']
+                   if target_columns is None or column in target_columns]
+        # Columns holding ids of another table: the table's own id and its references
+        mapped = dict(spec['references'])
+        if spec['id']:
+            mapped[spec['id']] = table
+        mappings = [(columns.index(column), offsets.get(parent, 0), id_map.get(parent, {}))
+                    for column, parent in mapped.items() if column in columns]
+        natural_key = spec.get('natural_key')
+
+        def flush(rows, end):
+            if natural_key in columns:
+                match_existing(rows)
+            progress['inserted'] += writer.write(table, columns, rows)
+            progress['read'] += len(rows)
+            progress['offset'] = end
+            _save_json(checkpoint, state)
+
+        def match_existing(rows):
+            """Give rows whose natural key is in the target that row's id, and remember the mapping"""
+            id_position = columns.index(spec['id'])
+            key_position = columns.index(natural_key)
+            offset = offsets.get(table, 0)
+            existing = writer.existing_ids(table, natural_key, [row[key_position] for row in rows])
+            for row in rows:
+                target_id = existing.get(row[key_position])
+                if target_id is not None and target_id != row[id_position]:
+                    id_map.setdefault(table, {})[str(row[id_position] - offset)] = target_id
+                    row[id_position] = target_id
+
+        with open(os.path.join(directory, f"{table}.ndjson"), 'rb') as f:
+            f.seek(progress['offset'])
+            rows = []
+            for line in iter(f.readline, b''):
+                record = json_codec.loads(line)
+                row = [record.get(column) for column in columns]
+                for position, offset, exceptions in mappings:
+                    if row[position] is not None:
+                        row[position] = exceptions.get(str(row[position]), row[position] + offset)
+                rows.append(row)
+                if len(rows) >= batch_size:
+                    flush(rows, f.tell())
+                    rows = []
+            if rows:
+                flush(rows, f.tell())
+        progress['done'] = True
+        _save_json(checkpoint, state)
+        skipped = progress['read'] - progress['inserted']
+        report(f"{table}: {progress['inserted']} rows" + (f", {skipped} already present" if skipped else ''))
+
+    writer.finish()
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the app database to NDJSON or import it elsewhere.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='write every table to DIRECTORY')
+    export_parser.add_argument('source', help='SQLite file or postgresql:// URL')
+    export_parser.add_argument('directory')
+    export_parser.add_argument('--tables', type=lambda value: set(value.split(',')),
+                               help='comma-separated tables (default: all)')
+    import_parser = commands.add_parser('import', help='load DIRECTORY into TARGET')
+    import_parser.add_argument('directory')
+    import_parser.add_argument('target', help="SQLite file, postgresql:// URL or 'firestore'")
+    import_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    import_parser.add_argument('--restart', action='store_true', help='ignore the checkpoint of an earlier import')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        if args.command == 'export':
+            if args.source == FIRESTORE:
+                raise RuntimeError('Exporting from Firestore is not supported')
+            conn = connect(args.source)
+            try:
+                export_database(conn, args.directory, args.tables)
+            finally:
+                conn.close()
+        else:
+            conn = connect(args.target)
+            if args.target == FIRESTORE:
+                writer = FirestoreWriter(conn)
+            else:
+                writer = SQLWriter(conn)
+                if is_sqlite(conn) and not table_exists(conn, 'roadmap_versions'):
+                    # Imported here since it sets up the whole app
+                    import index
+                    index.app.config['DATABASE_PATH'] = args.target
+                    index.init_db()
+            try:
+                state = import_database(args.directory, writer, state_path(args.directory, args.target),
+                                        args.batch_size, args.restart)
+            finally:
+                if args.target != FIRESTORE:
+                    conn.close()
+            shifted = {table: offset for table, offset in state['id_offsets'].items() if offset}
+            if shifted:
+                print('ids shifted: ' + ', '.join(f"{table} +{offset}" for table, offset in shifted.items()))
+            for table, matched in state['id_map'].items():
+                print(f"{table}: {len(matched)} matched to existing rows")
+    except DATABASE_ERRORS + (RuntimeError, OSError) as e:
+        print(f"Error during {args.command}: {e}")
+        return 1
+
+    print(f"{args.command} finished in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
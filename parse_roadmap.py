@@ -1,25 +1,62 @@
-import json
+#!/usr/bin/env python3
+"""
+Ingest roadmap.sh JSON exports into compiled topic graphs
 
-file_path = '/run/media/pranav/New Volume/projects/ShastraBytes/roadmap_repo/src/data/roadmaps/machine-learning/machine-learning.json'
+Each export is compiled into a topic DAG and written to roadmap_graphs/<slug>.dag,
+where the roadmap generators pick it up. Pass export files, or a checkout's
+src/data/roadmaps directory to ingest every roadmap in it.
 
-with open(file_path, 'r') as f:
-    data = json.load(f)
+Usage:
+    python parse_roadmap.py path/to/machine-learning.json
+    python parse_roadmap.py roadmap_repo/src/data/roadmaps --only ai-data-scientist frontend
+"""
 
-topics = []
-subtopics = []
+import argparse
+import os
+import sys
 
-for node in data['nodes']:
-    label = node['data'].get('label', 'No Label').strip()
-    if node['type'] == 'topic':
-        topics.append(label)
-    elif node['type'] == 'subtopic':
-        subtopics.append(label)
+from topic_graph import ingest_roadmap
 
-print("--- Machine Learning Roadmap ---")
-print("\nTopics:")
-for topic in topics:
-    print(f"- {topic}")
 
-print("\nSubtopics:")
-for subtopic in subtopics:
-    print(f"- {subtopic}")
+def find_exports(path, only=None):
+    """Yield (slug, export path) for a file or a roadmap.sh roadmaps directory"""
+    if os.path.isfile(path):
+        yield os.path.splitext(os.path.basename(path))[0], path
+        return
+    for slug in sorted(os.listdir(path)):
+        export = os.path.join(path, slug, f"{slug}.json")
+        if os.path.isfile(export) and (not only or slug in only):
+            yield slug, export
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile roadmap.sh exports into topic graphs")
+    parser.add_argument('paths', nargs='+', help="roadmap.sh JSON exports or a src/data/roadmaps directory")
+    parser.add_argument('--only', nargs='*', help="slugs to ingest when a directory is given")
+    parser.add_argument('--verbose', action='store_true', help="list the compiled topics")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for path in args.paths:
+        for slug, export in find_exports(path, args.only):
+            try:
+                dag, output_path = ingest_roadmap(export, slug)
+            except (OSError, ValueError) as e:
+                print(f"❌ {slug}: {e}")
+                failures += 1
+                continue
+
+            topics = dag.topics()
+            print(f"✅ {slug}: {len(topics)} topics, {len(dag) - len(topics)} subtopics, "
+                  f"{dag.edge_count} prerequisite edges -> {output_path}")
+            if args.verbose:
+                for topic in topics:
+                    print(f"- {dag.labels[topic]}")
+                    for subtopic in dag.subtopics(topic):
+                        print(f"    - {dag.labels[subtopic]}")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Topic prerequisite engine
+Roadmap topics form a prerequisite DAG over their ids ("phase.topic"). Each
+roadmap's progress keeps a count of unfinished prerequisites per topic and
+the frontier of topics that are ready to study, so completing a topic only
+touches the topics it unlocks instead of rescanning the roadmap. The
+frontier is a set in memory and is stored as a sorted list.
+"""
+
+
+def _locate(roadmap, topic_id):
+    """Return (phase_index, topic) for a topic id, or (None, None)"""
+    try:
+        phase_number, topic_number = (int(part) for part in str(topic_id).split('.'))
+        topic = roadmap['phases'][phase_number - 1]['topics'][topic_number - 1]
+        if phase_number > 0 and topic_number > 0 and topic['id'] == topic_id:
+            return phase_number - 1, topic
+    except (ValueError, IndexError, KeyError):
+        pass
+
+    # Roadmaps edited by hand may not follow the id layout
+    for phase_index, phase in enumerate(roadmap['phases']):
+        for topic in phase['topics']:
+            if topic['id'] == topic_id:
+                return phase_index, topic
+    return None, None
+
+
+def find_topic(roadmap, topic_id):
+    """Look up a topic by id, or return None"""
+    return _locate(roadmap, topic_id)[1]
+
+
+def default_prerequisite_ids(phases, phase_index):
+    """Prerequisites for a topic with no graph information: the whole previous phase"""
+    if phase_index == 0:
+        return []
+    return [topic['id'] for topic in phases[phase_index - 1]['topics']]
+
+
+def init_progress(roadmap):
+    """Build prerequisite counters, unlock lists and frontier for a roadmap
+
+    Topics without 'prerequisite_ids' (roadmaps saved before the engine)
+    depend on the whole previous phase, matching the old phase locking.
+    Topics already marked completed stay completed. Runs in O(topics +
+    prerequisite edges); after this complete_topic() is incremental.
+    """
+    phases = roadmap['phases']
+    known_ids = {topic['id'] for phase in phases for topic in phase['topics']}
+    completed = [topic['id'] for phase in phases for topic in phase['topics'] if topic.get('status') == 'completed']
+    completed_set = set(completed)
+
+    pending = {}
+    unlocks = {topic_id: [] for topic_id in known_ids}
+    for i, phase in enumerate(phases):
+        for topic in phase['topics']:
+            if 'prerequisite_ids' not in topic:
+                topic['prerequisite_ids'] = default_prerequisite_ids(phases, i)
+            prerequisite_ids = [p for p in topic['prerequisite_ids'] if p in known_ids and p != topic['id']]
+            for prerequisite in prerequisite_ids:
+                unlocks[prerequisite].append(topic['id'])
+            pending[topic['id']] = sum(1 for p in prerequisite_ids if p not in completed_set)
+
+    frontier = set()
+    for phase in phases:
+        for topic in phase['topics']:
+            topic['locked'] = pending[topic['id']] > 0 and topic['id'] not in completed_set
+            if topic['id'] not in completed_set and not topic['locked']:
+                frontier.add(topic['id'])
+
+    progress = roadmap.setdefault('progress', {})
+    progress.update({
+        'completed_topic_ids': completed,
+        'pending_prerequisites': pending,
+        'unlocks': unlocks,
+        'frontier': frontier,
+        'phase_remaining': [sum(1 for topic in phase['topics'] if topic['id'] not in completed_set)
+                            for phase in phases]
+    })
+    current_phase = 0
+    while current_phase < len(phases) and progress['phase_remaining'][current_phase] == 0:
+        current_phase += 1
+    progress['current_phase'] = current_phase
+    progress['total_topics'] = len(pending)
+    _update_totals(roadmap)
+    for i, phase in enumerate(phases):
+        _update_phase_status(roadmap, i)
+    return roadmap
+
+
+def _frontier(progress):
+    """The progress frontier as a set, converting the list a stored roadmap has"""
+    frontier = progress['frontier']
+    if not isinstance(frontier, set):
+        frontier = progress['frontier'] = set(frontier)
+    return frontier
+
+
+def _update_totals(roadmap):
+    progress = roadmap['progress']
+    total = progress['total_topics']
+    progress['completed_topics'] = len(progress['completed_topic_ids'])
+    progress['completion_percentage'] = int(progress['completed_topics'] / total * 100) if total else 0
+
+
+def _update_phase_status(roadmap, phase_index):
+    phase = roadmap['phases'][phase_index]
+    if roadmap['progress']['phase_remaining'][phase_index] == 0:
+        phase['status'] = 'completed'
+    elif phase_index == roadmap['progress']['current_phase'] or any(not topic['locked'] for topic in phase['topics']
+                                                                    if topic.get('status') != 'completed'):
+        phase['status'] = 'current'
+    else:
+        phase['status'] = 'locked'
+
+
+def complete_topic(roadmap, topic_id):
+    """Mark one topic completed and unlock the topics that were waiting on it
+
+    Costs O(number of topics it unlocks). A topic can be completed before
+    its prerequisites (the user already knows it); it then simply leaves
+    the frontier. Returns the ids that became available.
+    """
+    progress = roadmap['progress']
+    phase_index, topic = _locate(roadmap, topic_id)
+    if topic is None:
+        raise KeyError(topic_id)
+    if topic.get('status') == 'completed':
+        return []
+
+    topic['status'] = 'completed'
+    topic['locked'] = False
+    progress['completed_topic_ids'].append(topic_id)
+    frontier = _frontier(progress)
+    frontier.discard(topic_id)
+    progress['phase_remaining'][phase_index] -= 1
+
+    unlocked = []
+    touched_phases = {phase_index}
+    for dependent_id in progress['unlocks'].get(topic_id, []):
+        progress['pending_prerequisites'][dependent_id] -= 1
+        if progress['pending_prerequisites'][dependent_id] > 0:
+            continue
+        dependent_phase, dependent = _locate(roadmap, dependent_id)
+        if dependent.get('status') == 'completed' or not dependent.get('locked'):
+            continue
+        dependent['locked'] = False
+        frontier.add(dependent_id)
+        unlocked.append(dependent_id)
+        touched_phases.add(dependent_phase)
+
+    phases = roadmap['phases']
+    while progress['current_phase'] < len(phases) and progress['phase_remaining'][progress['current_phase']] == 0:
+        progress['current_phase'] += 1
+        touched_phases.add(progress['current_phase'] - 1)
+        if progress['current_phase'] < len(phases):
+            touched_phases.add(progress['current_phase'])
+
+    for index in touched_phases:
+        _update_phase_status(roadmap, index)
+    _update_totals(roadmap)
+    return unlocked
+
+
+def complete_topics(roadmap, topic_ids):
+    """Complete several topics, initializing the engine state if needed"""
+    if 'frontier' not in roadmap.get('progress', {}):
+        init_progress(roadmap)
+    unlocked = []
+    for topic_id in topic_ids:
+        unlocked.extend(complete_topic(roadmap, topic_id))
+    return unlocked
+
+
+def next_topics(roadmap):
+    """Topics whose prerequisites are all completed, in roadmap order"""
+    if 'frontier' not in roadmap.get('progress', {}):
+        init_progress(roadmap)
+    frontier = _frontier(roadmap['progress'])
+    return [topic for phase in roadmap['phases'] for topic in phase['topics'] if topic['id'] in frontier]
@@ -0,0 +1,113 @@
+"""
+In-process read-through cache for user profiles
+Holds the user row, the user's preferences and the derived profile completion
+so that page loads after the first one do not touch the database. Forked
+workers can share invalidations through generation counters in shared memory.
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+
+PROFILE_FIELDS = ['role', 'target_company', 'position', 'previous_skills', 'specialization', 'skill_focus']
+
+
+def compute_profile_completion(preferences):
+    """Calculate profile completion percentage from a preferences mapping"""
+    if not preferences:
+        return 0
+    filled_fields = sum(1 for field in PROFILE_FIELDS if preferences.get(field))
+    return int((filled_fields / len(PROFILE_FIELDS)) * 100)
+
+
+class ProfileCache:
+    """Thread-safe LRU cache with a per-entry time to live
+
+    After share_invalidations(), each entry remembers the generation of its
+    user's counter slot when it was loaded, and invalidate() bumps that
+    counter, so an invalidation in one forked worker drops the entry in all
+    of them.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generations = None
+        self.hits = 0
+        self.misses = 0
+
+    def share_invalidations(self, slots=4096):
+        """Keep generation counters in shared memory, for processes forked after this call"""
+        self._generations = multiprocessing.Array('Q', slots)
+
+    def _generation(self, user_id):
+        if self._generations is None:
+            return 0
+        return self._generations.get_obj()[hash(user_id) % len(self._generations)]
+
+    def get(self, user_id):
+        """Return the cached profile for a user, or None if missing, expired or invalidated"""
+        generation = self._generation(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, entry_generation, profile = entry
+            if expires_at < time.monotonic() or entry_generation != generation:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return profile
+
+    def set(self, user_id, profile, generation=None):
+        """Store a profile, evicting the least recently used entry when full
+
+        generation is the counter value read before the profile was loaded;
+        an invalidation in between then makes the entry a miss.
+        """
+        if generation is None:
+            generation = self._generation(user_id)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, generation, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, user_id, loader):
+        """Return the cached profile, calling loader(user_id) on a miss"""
+        profile = self.get(user_id)
+        if profile is not None:
+            return profile
+        generation = self._generation(user_id)
+        profile = loader(user_id)
+        if profile is not None:
+            self.set(user_id, profile, generation)
+        return profile
+
+    def invalidate(self, user_id):
+        """Drop a user's cached profile, in every process sharing invalidations"""
+        if self._generations is not None:
+            with self._generations.get_lock():
+                self._generations[hash(user_id) % len(self._generations)] += 1
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every cached profile"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return cache statistics"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Global instance
+profile_cache = ProfileCache()
@@ -0,0 +1,216 @@
+"""
+Slow-query log
+Connections from get_db() use cursor classes that time every statement.
+Statements slower than the threshold are recorded in a bounded in-memory
+ring buffer with their normalized SQL, number of bound parameters,
+duration and the route and request that ran them, and logged as a
+warning. The query plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on
+PostgreSQL) is captured the first time each distinct normalized statement
+is slow and reused after that. The buffer is per process.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, request
+
+try:
+    import psycopg
+    POSTGRES_AVAILABLE = True
+except ImportError:
+    POSTGRES_AVAILABLE = False
+
+DEFAULT_THRESHOLD_MS = 100
+DEFAULT_LOG_SIZE = 200
+
+# Distinct statements whose plan is kept; the cache is emptied when it fills up
+MAX_PLANS = 500
+
+# Statements that can be explained without side effects
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and replace literals and placeholder lists, so one statement shape has one key"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(?, ...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def bind_count(params):
+    """Number of bound parameters (keys of a named-parameter mapping)"""
+    if params is None:
+        return 0
+    try:
+        return len(params)
+    except TypeError:
+        return 0
+
+
+class SlowQueryLog:
+    """Ring buffer of statements slower than threshold_ms; 0 turns tracing off"""
+
+    def __init__(self, threshold_ms=DEFAULT_THRESHOLD_MS, size=DEFAULT_LOG_SIZE):
+        self.threshold_ms = threshold_ms
+        self.entries = deque(maxlen=size)
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self.entries.maxlen
+
+    @size.setter
+    def size(self, size):
+        self.entries = deque(self.entries, maxlen=size)
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def observe(self, conn, sql, params, seconds, many=False):
+        """Record a statement if it took longer than the threshold"""
+        duration_ms = seconds * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        normalized = normalize_sql(sql)
+        entry = {
+            'sql': normalized,
+            'binds': 0 if many else bind_count(params),
+            'many': many,
+            'duration_ms': round(duration_ms, 2),
+            'at': time.time(),
+            'route': None,
+            'request_id': None,
+            'plan': self.plan(conn, normalized, sql, None if many else params)
+        }
+        if has_request_context():
+            entry['route'] = request.url_rule.rule if request.url_rule else request.path
+            entry['request_id'] = getattr(g, 'request_id', None)
+        self.entries.append(entry)
+        logger.warning('Slow query (%.1f ms): %s', duration_ms, normalized, extra={'duration_ms': entry['duration_ms']})
+
+    def plan(self, conn, normalized, sql, params):
+        """Query plan lines of a statement, explained once per normalized statement"""
+        with self._lock:
+            if normalized in self._plans:
+                return self._plans[normalized]
+        if not sql.lstrip().upper().startswith(EXPLAINABLE) or params is None:
+            plan = None
+        else:
+            try:
+                plan = explain(conn, sql, params)
+            except Exception as e:
+                plan = [f"EXPLAIN failed: {e}"]
+        with self._lock:
+            if len(self._plans) >= MAX_PLANS:
+                self._plans.clear()
+            self._plans[normalized] = plan
+        return plan
+
+    def recent(self, limit=None):
+        """Recorded slow statements, newest first"""
+        entries = list(self.entries)[::-1]
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self._plans.clear()
+
+
+def explain(conn, sql, params):
+    """Plan of a statement on an untraced cursor, as a list of lines"""
+    if isinstance(conn, sqlite3.Connection):
+        cursor = sqlite3.Cursor(conn)
+        try:
+            # Rows are (id, parent, notused, detail)
+            return [row[3] for row in cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        finally:
+            cursor.close()
+    # In a savepoint, so a failed EXPLAIN does not abort the request's transaction
+    with conn.transaction(), psycopg.Cursor(conn) as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        return [next(iter(row.values())) if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+
+
+class TracedCursor(sqlite3.Cursor):
+    """SQLite cursor that reports statement times to slow_query_log"""
+
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            slow_query_log.observe(self.connection, sql, params, time.perf_counter() - start)
+
+    def executemany(self, sql, rows):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, rows)
+        finally:
+            slow_query_log.observe(self.connection, sql, None, time.perf_counter() - start, many=True)
+
+
+class TracedConnection(sqlite3.Connection):
+    """SQLite connection whose cursors, including those of execute(), are TracedCursors"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, rows):
+        return self.cursor().executemany(sql, rows)
+
+
+if POSTGRES_AVAILABLE:
+    class TracedPgCursor(psycopg.Cursor):
+        """psycopg cursor that reports statement times to slow_query_log"""
+
+        def execute(self, query, params=None, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().execute(query, params, **kwargs)
+            finally:
+                slow_query_log.observe(self.connection, query, params, time.perf_counter() - start)
+
+        def executemany(self, query, params_seq, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().executemany(query, params_seq, **kwargs)
+            finally:
+                slow_query_log.observe(self.connection, query, None, time.perf_counter() - start, many=True)
+
+
+def connect_sqlite(path):
+    """sqlite3.connect() with statement tracing when the slow-query log is enabled"""
+    if slow_query_log.enabled:
+        return sqlite3.connect(path, factory=TracedConnection)
+    return sqlite3.connect(path)
+
+
+def connect_postgres(url, **kwargs):
+    """psycopg.connect() with statement tracing when the slow-query log is enabled"""
+    if slow_query_log.enabled:
+        kwargs['cursor_factory'] = TracedPgCursor
+    return psycopg.connect(url, **kwargs)
+
+
+# Global instance
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Compiled question banks
+A <topic>_mcqs.json bank is compiled into a binary file of question records
+over a deduplicated string pool, with offset tables at the end. Readers mmap
+the file and decode a question only when it is asked for, so opening a bank
+costs the same for fifty questions as for fifty thousand and the pages are
+shared by every process that maps it.
+
+Usage:
+    python question_bank.py [path/to/topic_mcqs.json ...]
+"""
+
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+
+from array_codec import from_bytes, to_bytes
+
+BANKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'question_banks')
+BANK_EXTENSION = '.qbank'
+SOURCE_SUFFIX = '_mcqs.json'
+
+# magic, format version, question count, string count, index offset
+_HEADER = struct.Struct('<4sHIIQ')
+_MAGIC = b'QBNK'
+_FORMAT_VERSION = 1
+
+# Set on a key's string id when its value is stored as JSON text rather than a plain string
+_JSON_VALUE = 0x80000000
+
+# Longest string an append reuses from earlier in the same append; longer ones are rarely repeated
+APPEND_SHARED_LENGTH = 64
+
+
+def bank_path(topic, banks_dir=BANKS_DIR):
+    """Path of a topic's compiled bank"""
+    return os.path.join(banks_dir, topic + BANK_EXTENSION)
+
+
+def _flatten(question, prefix=''):
+    """Yield (path, value, is_json) for the leaves of a question; dicts nest with '.'"""
+    for key, value in question.items():
+        if '.' in key:
+            raise ValueError(f"Question keys cannot contain '.': {key!r}")
+        path = prefix + key
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, path + '.')
+        elif isinstance(value, str):
+            yield path, value, False
+        else:
+            yield path, json.dumps(value), True
+
+
+def _unflatten(pairs):
+    question = {}
+    for path, value in pairs:
+        target = question
+        *parents, leaf = path.split('.')
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return question
+
+
+class _StringPool:
+    """Deduplicating string table written alongside the records
+
+    Strings longer than max_shared_length are written without being
+    remembered, which bounds the memory the table needs.
+    """
+
+    def __init__(self, count=0, max_shared_length=None):
+        self.ids = {}
+        self.max_shared_length = max_shared_length
+        self.offsets = array.array('Q')
+        self.lengths = array.array('I')
+        self.count = count
+
+    def add(self, text, f):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            data = text.encode('utf-8')
+            self.offsets.append(f.tell())
+            self.lengths.append(len(data))
+            f.write(data)
+            string_id = self.count
+            if self.max_shared_length is None or len(text) <= self.max_shared_length:
+                self.ids[text] = string_id
+            self.count += 1
+        return string_id
+
+
+def _align(f, size):
+    """Pad with zero bytes up to a multiple of size, so array views stay aligned"""
+    padding = -f.tell() % size
+    if padding:
+        f.write(b'\0' * padding)
+
+
+def _write_questions(f, questions, pool, record_offsets):
+    """Append question records (and their new strings) at the current position"""
+    for question in questions:
+        record = array.array('I')
+        fields = list(_flatten({key: value for key, value in question.items() if key not in ('id', 'topic')}))
+        record.append(len(fields))
+        for path, value, is_json in fields:
+            key_id = pool.add(path, f)
+            record.append(key_id | _JSON_VALUE if is_json else key_id)
+            record.append(pool.add(value, f))
+        _align(f, 4)
+        record_offsets.append(f.tell())
+        f.write(to_bytes(record))
+
+
+def _write_index(f, record_offsets, string_offsets, string_lengths):
+    _align(f, 8)
+    index_offset = f.tell()
+    f.write(to_bytes(record_offsets))
+    f.write(to_bytes(string_offsets))
+    f.write(to_bytes(string_lengths))
+    return index_offset
+
+
+def compile_bank(questions, path):
+    """Write questions to a new compiled bank; returns the question count"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    pool = _StringPool()
+    record_offsets = array.array('Q')
+    with open(temp_path, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        _write_questions(f, questions, pool, record_offsets)
+        index_offset = _write_index(f, record_offsets, pool.offsets, pool.lengths)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(record_offsets), pool.count, index_offset))
+    os.replace(temp_path, path)
+    return len(record_offsets)
+
+
+class BankAppender:
+    """Append questions to a compiled bank without rewriting it
+
+    New strings and records are written after the end of the file and a
+    new index follows them; the header is switched over to it on close().
+    Processes that already mapped the bank keep reading the old index, so
+    the file is never changed under them. The old index is left behind as
+    dead space until the bank is recompiled. Only the offset tables and
+    short strings (keys, answers) are held in memory, not the questions.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'r+b')
+        header = self._file.read(_HEADER.size)
+        magic, version, count, strings, index_offset = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            self._file.close()
+            raise ValueError(f"Not a compiled question bank: {path}")
+        self._file.seek(index_offset)
+        self.record_offsets = from_bytes('Q', self._file.read(count * 8))
+        self._pool = _StringPool(strings, APPEND_SHARED_LENGTH)
+        self._pool.offsets = from_bytes('Q', self._file.read(strings * 8))
+        self._pool.lengths = from_bytes('I', self._file.read(strings * 4))
+        self._file.seek(0, os.SEEK_END)
+        self.added = 0
+
+    def __len__(self):
+        return len(self.record_offsets)
+
+    def add(self, question):
+        """Write one question; returns its index in the bank"""
+        _write_questions(self._file, [question], self._pool, self.record_offsets)
+        self.added += 1
+        return len(self.record_offsets) - 1
+
+    def close(self):
+        """Write the new index and point the header at it"""
+        if self._file.closed:
+            return
+        try:
+            if self.added:
+                index_offset = _write_index(self._file, self.record_offsets, self._pool.offsets, self._pool.lengths)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.seek(0)
+                self._file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(self.record_offsets), self._pool.count,
+                                              index_offset))
+        finally:
+            self._file.close()
+
+    def abort(self):
+        """Stop without publishing the questions written so far"""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class QuestionBank(Sequence):
+    """Read-only, memory-mapped compiled bank
+
+    A sequence of question dicts, decoded on each access. Questions carry
+    'id' ('<topic>:<index>') and 'topic'.
+    """
+
+    def __init__(self, path, topic):
+        self.path = path
+        self.topic = topic
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        magic, version, self._count, strings, index_offset = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"Not a compiled question bank: {path}")
+        position = index_offset
+        sections = []
+        for typecode, size in (('Q', self._count * 8), ('Q', strings * 8), ('I', strings * 4)):
+            sections.append(self._view(typecode, position, size))
+            position += size
+        self._record_offsets, self._string_offsets, self._string_lengths = sections
+
+    def _view(self, typecode, position, size):
+        if sys.byteorder == 'little':
+            # Zero-copy view of the mapped pages
+            return memoryview(self._map)[position:position + size].cast(typecode)
+        return from_bytes(typecode, self._map[position:position + size])
+
+    def __len__(self):
+        return self._count
+
+    def is_stale(self):
+        """Whether the file has changed (e.g. questions were appended) since it was mapped"""
+        try:
+            return os.stat(self.path).st_mtime_ns != self.mtime_ns
+        except OSError:
+            return True
+
+    def _string(self, string_id):
+        offset = self._string_offsets[string_id]
+        return self._map[offset:offset + self._string_lengths[string_id]].decode('utf-8')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        offset = self._record_offsets[index]
+        fields = struct.unpack_from('<I', self._map, offset)[0]
+        record = self._view('I', offset + 4, fields * 8)
+        pairs = []
+        for i in range(0, fields * 2, 2):
+            key_id = record[i]
+            value = self._string(record[i + 1])
+            if key_id & _JSON_VALUE:
+                key_id &= ~_JSON_VALUE
+                value = json.loads(value)
+            pairs.append((self._string(key_id), value))
+        question = _unflatten(pairs)
+        question['id'] = f"{self.topic}:{index}"
+        question['topic'] = self.topic
+        return question
+
+
+def compile_source(source_path, banks_dir=BANKS_DIR):
+    """Compile a <topic>_mcqs.json file; returns (topic, path, question count)"""
+    topic = os.path.basename(source_path)[:-len(SOURCE_SUFFIX)]
+    with open(source_path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    path = bank_path(topic, banks_dir)
+    return topic, path, compile_bank(questions, path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    root = os.path.dirname(os.path.abspath(__file__))
+    sources = argv or sorted(os.path.join(root, name) for name in os.listdir(root) if name.endswith(SOURCE_SUFFIX))
+    if not sources:
+        print('No question banks found')
+        return 1
+    for source in sources:
+        if not source.endswith(SOURCE_SUFFIX):
+            print(f"Skipping {source}: not a <topic>{SOURCE_SUFFIX} file")
+            continue
+        topic, path, count = compile_source(source)
+        print(f"{topic}: {count} questions -> {os.path.relpath(path, root)} ({os.path.getsize(path)} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
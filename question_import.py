@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Bulk question import
+Streams questions from NDJSON or CSV files into a topic's compiled bank.
+Each record is validated and checked for near-duplicates of the questions
+already in the bank and earlier in the import. A MinHash signature is
+computed per question and indexed with locality-sensitive hashing (LSH), so
+each question is compared only with the few questions that share a band,
+not with all of them. Records are written out as they are accepted, so
+memory grows with the bank's index rather than with the import file.
+
+CSV files need 'question' and 'answer' columns and one 'option_<key>'
+column per option; other non-empty columns (such as 'code') are kept.
+
+Usage:
+    python question_import.py <topic> <file.ndjson|file.csv> [...] [--threshold 0.8] [--dry-run]
+"""
+
+import argparse
+import array
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+
+from question_bank import BANKS_DIR, SOURCE_SUFFIX, BankAppender, QuestionBank, bank_path, compile_bank
+
+# MinHash signature length and its split into LSH bands. Questions whose
+# similarity is above roughly (1 / BANDS) ** (1 / ROWS) are likely to share a band.
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+# Questions kept per band value; a very common band would otherwise make lookups quadratic
+MAX_BUCKET = 8
+
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+MIN_OPTIONS = 2
+
+_WORD = re.compile(r'\w+')
+
+
+def iter_ndjson(path):
+    """Yield (line number, record) from a newline-delimited JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, ValueError(f"invalid JSON: {e.msg}")
+
+
+def iter_csv(path):
+    """Yield (line number, record) from a CSV file with option_<key> columns"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            record = {'options': {}}
+            for column, value in row.items():
+                if column is None or value is None or value == '':
+                    continue
+                if column.startswith('option_'):
+                    record['options'][column[len('option_'):]] = value
+                else:
+                    record[column] = value
+            yield reader.line_num, record
+
+
+def iter_records(path):
+    """Yield (line number, record) from an NDJSON or CSV file"""
+    if path.endswith('.csv'):
+        return iter_csv(path)
+    return iter_ndjson(path)
+
+
+def validate_question(record):
+    """Return a list of problems with a question record (empty if it is valid)"""
+    if isinstance(record, Exception):
+        return [str(record)]
+    if not isinstance(record, dict):
+        return ['record is not an object']
+    errors = []
+    question = record.get('question')
+    if not isinstance(question, str) or not question.strip():
+        errors.append('question is missing or empty')
+    options = record.get('options')
+    if not isinstance(options, dict) or len(options) < MIN_OPTIONS:
+        errors.append(f"options must map at least {MIN_OPTIONS} keys to answers")
+    else:
+        texts = [text.strip().lower() if isinstance(text, str) else None for text in options.values()]
+        if None in texts or '' in texts:
+            errors.append('every option must be a non-empty string')
+        elif len(set(texts)) != len(texts):
+            errors.append('options repeat the same answer')
+        answer = record.get('answer')
+        if not isinstance(answer, str):
+            errors.append(f"answer must be an option key, not {answer!r}")
+        elif answer not in options:
+            errors.append(f"answer {answer!r} is not one of the options {sorted(options)}")
+    if not isinstance(record.get('code'), (str, type(None))):
+        errors.append('code must be a string')
+    if any('.' in key for key in record):
+        errors.append("field names cannot contain '.'")
+    return errors
+
+
+def question_text(question):
+    """Text a question is compared on: stem, code and answer options"""
+    parts = [str(question.get('question') or ''), str(question.get('code') or '')]
+    options = question.get('options')
+    if isinstance(options, dict):
+        parts.extend(sorted(str(text) for text in options.values()))
+    return ' '.join(parts)
+
+
+def shingles(text):
+    """Set of word SHINGLE_SIZE-grams of normalized text"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """MinHash signature of a text as NUM_HASHES 32-bit values
+
+    One SHAKE-128 digest per shingle supplies all NUM_HASHES hash values;
+    the digests are laid out as rows of one array and the signature is the
+    minimum of each column.
+    """
+    digests = b''.join(hashlib.shake_128(shingle.encode('utf-8')).digest(NUM_HASHES * 4)
+                       for shingle in shingles(text))
+    values = array.array('I', digests)
+    return array.array('I', [min(values[i::NUM_HASHES]) for i in range(NUM_HASHES)])
+
+
+class NearDuplicateIndex:
+    """LSH index over MinHash signatures
+
+    Signatures are kept in one flat array (4 bytes per hash) and each band
+    value maps to at most MAX_BUCKET questions, so memory per question and
+    the work per lookup stay bounded.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.signatures = array.array('I')
+        self.labels = []
+        self._bands = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _band_keys(self, signature):
+        data = signature.tobytes()
+        size = ROWS * signature.itemsize
+        return [hash((band, data[band * size:(band + 1) * size])) for band in range(BANDS)]
+
+    def _similarity(self, signature, position):
+        start = position * NUM_HASHES
+        stored = self.signatures[start:start + NUM_HASHES]
+        return sum(1 for a, b in zip(signature, stored) if a == b) / NUM_HASHES
+
+    def find(self, signature):
+        """Return (label, estimated similarity) of the closest near-duplicate, or None"""
+        best = None
+        checked = set()
+        for key in self._band_keys(signature):
+            bucket = self._bands.get(key, ())
+            for position in (bucket,) if isinstance(bucket, int) else bucket:
+                if position in checked:
+                    continue
+                checked.add(position)
+                similarity = self._similarity(signature, position)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (self.labels[position], similarity)
+        return best
+
+    def add(self, signature, label):
+        position = len(self.labels)
+        self.signatures.extend(signature)
+        self.labels.append(label)
+        for key in self._band_keys(signature):
+            # Most band values belong to one question, so they map to a bare position
+            bucket = self._bands.get(key)
+            if bucket is None:
+                self._bands[key] = position
+            elif isinstance(bucket, int):
+                self._bands[key] = (bucket, position)
+            elif len(bucket) < MAX_BUCKET:
+                self._bands[key] = bucket + (position,)
+
+
+def import_questions(topic, paths, threshold=DEFAULT_THRESHOLD, dry_run=False, banks_dir=BANKS_DIR,
+                     source_dir=None, report=print):
+    """Validate, deduplicate and append questions to a topic's compiled bank
+
+    A missing compiled bank is first compiled from <topic>_mcqs.json (or
+    created empty). Returns {'accepted', 'invalid', 'duplicates'}.
+    """
+    source_dir = source_dir or os.path.dirname(os.path.abspath(__file__))
+    path = bank_path(topic, banks_dir)
+    if os.path.exists(path):
+        existing = QuestionBank(path, topic)
+    else:
+        source = os.path.join(source_dir, topic + SOURCE_SUFFIX)
+        existing = []
+        if os.path.exists(source):
+            with open(source, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        if not dry_run:
+            compile_bank(existing, path)
+
+    index = NearDuplicateIndex(threshold)
+    for position, question in enumerate(existing):
+        index.add(minhash(question_text(question)), f"{topic}:{position}")
+    del existing
+
+    counts = {'accepted': 0, 'invalid': 0, 'duplicates': 0}
+    appender = None if dry_run else BankAppender(path)
+    try:
+        for source_path in paths:
+            for line_number, record in iter_records(source_path):
+                where = f"{os.path.basename(source_path)}:{line_number}"
+                errors = validate_question(record)
+                if errors:
+                    counts['invalid'] += 1
+                    report(f"{where}: invalid: {'; '.join(errors)}")
+                    continue
+                signature = minhash(question_text(record))
+                duplicate = index.find(signature)
+                if duplicate:
+                    counts['duplicates'] += 1
+                    report(f"{where}: near-duplicate of {duplicate[0]} ({duplicate[1]:.0%} similar)")
+                    continue
+                if appender is None:
+                    label = f"{where} (not imported)"
+                else:
+                    label = f"{topic}:{appender.add(record)}"
+                index.add(signature, label)
+                counts['accepted'] += 1
+    except BaseException:
+        if appender is not None:
+            appender.abort()
+        raise
+    if appender is not None:
+        appender.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import questions into a compiled question bank.')
+    parser.add_argument('topic', help='bank to import into, e.g. python')
+    parser.add_argument('paths', nargs='+', help='NDJSON or CSV files')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='estimated similarity at which a question counts as a duplicate')
+    parser.add_argument('--dry-run', action='store_true', help='validate and deduplicate without writing')
+    parser.add_argument('--quiet', action='store_true', help='only print the totals')
+    args = parser.parse_args(argv)
+
+    counts = import_questions(args.topic, args.paths, args.threshold, args.dry_run,
+                              report=(lambda message: None) if args.quiet else print)
+    action = 'would import' if args.dry_run else 'imported'
+    print(f"{args.topic}: {action} {counts['accepted']}, skipped {counts['invalid']} invalid "
+          f"and {counts['duplicates']} near-duplicate questions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
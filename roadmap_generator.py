@@ -1,7 +1,9 @@
 import json
 import random
 from datetime import datetime, timedelta
+from prerequisite_engine import complete_topics
 from roadmap_references import get_roadmap_reference, get_roadmap_url
+from topic_graph import apply_topic_graph
 
 class RoadmapGenerator:
     """AI-based personalized roadmap generator"""
@@ -213,7 +215,7 @@ class RoadmapGenerator:
             total_weeks = skill_config['weeks']
         
         # Get roadmap template for specialization
-        template = self.roadmap_templates.get(specialization, self.roadmap_templates['Web Development'])
+        template = self._get_roadmap_template(specialization)
         skill_config = self.skill_levels.get(skill_focus, self.skill_levels['Beginner'])
         
         start_date = datetime.now()
@@ -255,6 +257,12 @@ class RoadmapGenerator:
         
         return roadmap
     
+    def _get_roadmap_template(self, specialization):
+        """Roadmap template for a specialization, using its ingested roadmap.sh graph if any"""
+        template = self.roadmap_templates.get(specialization, self.roadmap_templates['Web Development'])
+        template, _ = apply_topic_graph(template, get_roadmap_url(specialization))
+        return template
+    
     def _generate_phases(self, template, skill_config, total_weeks):
         """Generate learning phases based on template and skill level"""
         phases = []
@@ -328,23 +336,7 @@ class RoadmapGenerator:
     
     def update_progress(self, roadmap, completed_topics):
         """Update roadmap progress"""
-        total_topics = roadmap['progress']['total_topics']
-        completed_count = len(completed_topics)
-        
-        roadmap['progress']['completed_topics'] = completed_count
-        roadmap['progress']['completion_percentage'] = int((completed_count / total_topics) * 100)
-        
-        # Update current phase based on progress
-        for i, phase in enumerate(roadmap['phases']):
-            phase_completed = all(topic['id'] in completed_topics for topic in phase['topics'])
-            if phase_completed:
-                phase['status'] = 'completed'
-                roadmap['progress']['current_phase'] = i + 1
-            elif i == roadmap['progress']['current_phase']:
-                phase['status'] = 'current'
-            else:
-                phase['status'] = 'locked'
-        
+        complete_topics(roadmap, completed_topics)
         return roadmap
 
 # Global instance
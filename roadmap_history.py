@@ -0,0 +1,189 @@
+"""
+Versioned roadmap history
+Every save is recorded in roadmap_versions as a JSON Patch against its parent
+version, with a full snapshot every few versions. user_roadmaps keeps one
+materialized head per (user, status) so the dashboard read stays a single row.
+Heads also carry a phase index (character offsets of each phase inside
+roadmap_data) so a single phase can be read without parsing the whole roadmap.
+"""
+
+import json_codec
+from db_utils import execute, upsert_query
+from json_patch import apply_patch, make_patch
+
+ROADMAP_STATUSES = ('draft', 'accepted')
+
+# Store a full copy after this many chained deltas, bounding reconstruction cost
+SNAPSHOT_INTERVAL = 10
+
+HEAD_UPSERT = upsert_query('user_roadmaps', ['user_id', 'status', 'roadmap_data', 'version', 'phase_index'],
+                           ['user_id', 'status'], ['roadmap_data', 'version', 'phase_index'],
+                           touch_columns=['updated_date'])
+
+ACTIVE_HEAD_ORDER = "ORDER BY CASE status WHEN 'accepted' THEN 0 ELSE 1 END LIMIT 1"
+
+
+class RoadmapVersionConflict(Exception):
+    """Raised when a roadmap edit is based on a version that is no longer current"""
+
+    def __init__(self, current_version):
+        super().__init__(f"Roadmap is at version {current_version}")
+        self.current_version = current_version
+
+
+def serialize_roadmap(roadmap):
+    """Serialize a roadmap and index where each phase sits in the text
+
+    Returns (roadmap_json, phase_index_json). The index maps phase id to the
+    1-based [start, length] that SQL substr() needs. Offsets count characters,
+    as substr() does on text in both SQLite and PostgreSQL.
+    """
+    rest = {key: value for key, value in roadmap.items() if key != 'phases'}
+    head = json_codec.dumps(rest)[:-1]
+    parts = [head + (',' if rest else '') + '"phases":[']
+    position = len(parts[0])
+    phase_index = {}
+    for i, phase in enumerate(roadmap.get('phases', [])):
+        if i:
+            parts.append(',')
+            position += 1
+        phase_json = json_codec.dumps(phase)
+        phase_index[str(phase.get('id'))] = [position + 1, len(phase_json)]
+        parts.append(phase_json)
+        position += len(phase_json)
+    parts.append(']}')
+    return ''.join(parts), json_codec.dumps(phase_index)
+
+
+def load_active_head_meta(db, user_id):
+    """Return status, version and phase index of the head the dashboard shows"""
+    return execute(db, f'''
+        SELECT status, version, phase_index FROM user_roadmaps WHERE user_id = ? {ACTIVE_HEAD_ORDER}
+    ''', (user_id,)).fetchone()
+
+
+def load_phase_json(db, user_id, status, start, length):
+    """Read one phase's JSON straight out of the stored roadmap text"""
+    row = execute(db, '''
+        SELECT substr(roadmap_data, ?, ?) AS phase FROM user_roadmaps WHERE user_id = ? AND status = ?
+    ''', (start, length, user_id, status)).fetchone()
+    return row['phase'] if row else None
+
+
+def load_heads(db, user_id):
+    """Return the user's roadmap heads as {status: row}"""
+    rows = execute(db, 'SELECT status, version, roadmap_data FROM user_roadmaps WHERE user_id = ?',
+                   (user_id,)).fetchall()
+    return {row['status']: row for row in rows}
+
+
+def _chain_length(db, user_id, version):
+    """Number of deltas between a version and its nearest snapshot"""
+    row = execute(db, 'SELECT chain_length FROM roadmap_versions WHERE user_id = ? AND version = ?',
+                  (user_id, version)).fetchone()
+    return row['chain_length'] if row else None
+
+
+def record_version(db, user_id, status, roadmap, heads, parent=None, delta=None):
+    """Write a new roadmap version and move the status head to it
+
+    parent is the head row the new version was derived from and delta the
+    patch from it, when known. Without a delta one is computed from the
+    parent document; a snapshot is stored when there is no usable parent,
+    the chain is long, or the delta is not smaller than the document.
+    Runs inside the caller's transaction and returns the new version.
+    """
+    version = max((row['version'] for row in heads.values()), default=0) + 1
+    roadmap_json, phase_index = serialize_roadmap(roadmap)
+
+    base_version = None
+    chain_length = 0
+    data = roadmap_json
+    if parent is not None:
+        parent_chain = _chain_length(db, user_id, parent['version'])
+        if parent_chain is not None and parent_chain + 1 < SNAPSHOT_INTERVAL:
+            if delta is None:
+                # Diffed in stored form, so in-memory types such as sets compare as they are saved
+                delta = make_patch(json_codec.loads(parent['roadmap_data']), json_codec.loads(roadmap_json))
+            delta_json = json_codec.dumps(delta)
+            if len(delta_json) < len(roadmap_json) // 2:
+                base_version = parent['version']
+                chain_length = parent_chain + 1
+                data = delta_json
+
+    execute(db, '''
+        INSERT INTO roadmap_versions (user_id, version, status, base_version, chain_length, data)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (user_id, version, status, base_version, chain_length, data))
+    execute(db, HEAD_UPSERT, (user_id, status, roadmap_json, version, phase_index))
+    return version
+
+
+def save_roadmap(db, user_id, roadmap, status):
+    """Record a full roadmap document as the new head for status"""
+    heads = load_heads(db, user_id)
+    parent = heads.get(status) or _latest_head(heads)
+    return record_version(db, user_id, status, roadmap, heads, parent=parent)
+
+
+def patch_roadmap(db, user_id, operations, base_version, status):
+    """Apply a JSON Patch to the head at base_version and store it under status
+
+    Returns the new version, or None if the user has no roadmap. Raises
+    RoadmapVersionConflict when base_version is no longer a current head.
+    """
+    heads = load_heads(db, user_id)
+    if not heads:
+        return None
+
+    base = next((row for row in heads.values() if row['version'] == base_version), None)
+    if base is None:
+        current = heads.get(status) or _latest_head(heads)
+        raise RoadmapVersionConflict(current['version'])
+    if not operations and base['status'] == status:
+        return base_version
+
+    roadmap = apply_patch(json_codec.loads(base['roadmap_data']), operations)
+    return record_version(db, user_id, status, roadmap, heads, parent=base, delta=operations)
+
+
+def _latest_head(heads):
+    return max(heads.values(), key=lambda row: row['version'], default=None)
+
+
+def get_version(db, user_id, version):
+    """Rebuild a roadmap version from its nearest snapshot and the deltas after it"""
+    deltas = []
+    current = version
+    while True:
+        row = execute(db, '''
+            SELECT base_version, data FROM roadmap_versions WHERE user_id = ? AND version = ?
+        ''', (user_id, current)).fetchone()
+        if not row:
+            return None
+        if row['base_version'] is None:
+            roadmap = json_codec.loads(row['data'])
+            break
+        deltas.append(json_codec.loads(row['data']))
+        current = row['base_version']
+
+    for delta in reversed(deltas):
+        roadmap = apply_patch(roadmap, delta)
+    return roadmap
+
+
+def list_versions(db, user_id):
+    """List the user's roadmap versions, newest first"""
+    rows = execute(db, '''
+        SELECT version, status, base_version IS NULL AS is_snapshot, created_date
+        FROM roadmap_versions WHERE user_id = ? ORDER BY version DESC
+    ''', (user_id,)).fetchall()
+    return [
+        {
+            'version': row['version'],
+            'status': row['status'],
+            'is_snapshot': bool(row['is_snapshot']),
+            'created_date': str(row['created_date'])
+        }
+        for row in rows
+    ]
@@ -0,0 +1,183 @@
+"""
+Compact roadmap object model
+Roadmap, Phase, Topic and Resource use __slots__ instead of per-instance
+dicts, intern their strings and share identical string lists, so roadmaps
+kept in memory cost far less than the nested dicts json.loads produces.
+Plain dicts are only built when a roadmap is serialized (to_dict).
+"""
+
+import sys
+
+from profile_cache import ProfileCache
+
+# Cap on distinct shared string tuples, so user-edited roadmaps cannot grow it forever
+MAX_SHARED_TUPLES = 65536
+_shared_tuples = {}
+
+# Field kinds
+ATOM = 'atom'        # str (interned), number or bool
+STRINGS = 'strings'  # list of strings, stored as a shared tuple
+VALUE = 'value'      # any JSON value, strings interned
+
+
+def intern_value(value):
+    """Intern the strings inside a JSON value"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(key): intern_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [intern_value(item) for item in value]
+    return value
+
+
+def shared_strings(values):
+    """Return an interned tuple of strings, shared with equal tuples"""
+    strings = tuple(sys.intern(value) if isinstance(value, str) else value for value in values)
+    shared = _shared_tuples.get(strings)
+    if shared is not None:
+        return shared
+    if len(_shared_tuples) < MAX_SHARED_TUPLES:
+        _shared_tuples[strings] = strings
+    return strings
+
+
+def _copy_value(value):
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+class _Model:
+    """Base for slotted models built from and serialized to plain dicts
+
+    FIELDS lists (name, kind) in serialization order, where kind is ATOM,
+    STRINGS, VALUE or a _Model subclass for a list of nested models. Fields
+    missing from the source dict stay unset and are left out of to_dict(),
+    and unknown keys are kept in 'extra'.
+    """
+
+    __slots__ = ('extra',)
+    FIELDS = ()
+
+    def __init__(self, **fields):
+        names = self._field_names()
+        for name, value in fields.items():
+            if name not in names:
+                raise TypeError(f"{type(self).__name__} has no field {name!r}")
+            setattr(self, name, self._convert(names[name], value))
+
+    @classmethod
+    def _field_names(cls):
+        names = cls.__dict__.get('_names')
+        if names is None:
+            names = dict(cls.FIELDS)
+            cls._names = names
+        return names
+
+    @staticmethod
+    def _convert(kind, value):
+        if kind == ATOM:
+            return sys.intern(value) if isinstance(value, str) else value
+        if kind == STRINGS:
+            return shared_strings(value) if isinstance(value, (list, tuple)) else intern_value(value)
+        if kind == VALUE:
+            return intern_value(value)
+        if isinstance(value, (list, tuple)):
+            return tuple(item if isinstance(item, kind) else kind.from_dict(item) for item in value)
+        return intern_value(value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a model from a plain dict"""
+        names = cls._field_names()
+        model = cls.__new__(cls)
+        extra = None
+        for key, value in data.items():
+            kind = names.get(key)
+            if kind is None:
+                if extra is None:
+                    extra = {}
+                extra[sys.intern(key)] = intern_value(value)
+            else:
+                setattr(model, key, cls._convert(kind, value))
+        if extra:
+            model.extra = extra
+        return model
+
+    def to_dict(self):
+        """Serialize to plain, independent dicts and lists"""
+        data = {}
+        for name, kind in self.FIELDS:
+            try:
+                value = getattr(self, name)
+            except AttributeError:
+                continue
+            if isinstance(value, tuple):
+                value = [item.to_dict() if isinstance(item, _Model) else item for item in value]
+            elif kind == VALUE:
+                value = _copy_value(value)
+            data[name] = value
+        extra = getattr(self, 'extra', None)
+        if extra:
+            data.update(_copy_value(extra))
+        return data
+
+    def __repr__(self):
+        identifier = getattr(self, 'id', None)
+        return f"<{type(self).__name__} {identifier!r}>" if identifier is not None else f"<{type(self).__name__}>"
+
+
+class Resource(_Model):
+    __slots__ = ('type', 'name', 'platform', 'difficulty')
+    FIELDS = (('type', ATOM), ('name', ATOM), ('platform', ATOM), ('difficulty', ATOM))
+
+
+class Topic(_Model):
+    __slots__ = ('id', 'title', 'estimated_hours', 'start_week', 'end_week', 'resources', 'milestones', 'status',
+                 'fast_tracked', 'locked', 'priority', 'prerequisite_ids', 'prerequisites', 'learning_path',
+                 'practical_exercises')
+    FIELDS = (
+        ('id', ATOM), ('title', ATOM), ('estimated_hours', ATOM), ('start_week', ATOM), ('end_week', ATOM),
+        ('resources', Resource), ('milestones', STRINGS), ('status', ATOM), ('fast_tracked', ATOM),
+        ('locked', ATOM), ('priority', ATOM), ('prerequisite_ids', STRINGS), ('prerequisites', STRINGS),
+        ('learning_path', STRINGS), ('practical_exercises', STRINGS)
+    )
+
+
+class Phase(_Model):
+    __slots__ = ('id', 'name', 'start_week', 'topics', 'status', 'difficulty', 'learning_objectives',
+                 'assessment_criteria', 'end_week', 'weeks')
+    FIELDS = (
+        ('id', ATOM), ('name', ATOM), ('start_week', ATOM), ('topics', Topic), ('status', ATOM),
+        ('difficulty', ATOM), ('learning_objectives', STRINGS), ('assessment_criteria', STRINGS),
+        ('end_week', ATOM), ('weeks', ATOM)
+    )
+
+
+class Roadmap(_Model):
+    __slots__ = ('user_info', 'timeline', 'phases', 'schedule', 'progress', 'reference', 'enhanced_features')
+    FIELDS = (
+        ('user_info', VALUE), ('timeline', VALUE), ('phases', Phase), ('schedule', VALUE), ('progress', VALUE),
+        ('reference', VALUE), ('enhanced_features', VALUE)
+    )
+
+    def to_dict(self, include_phases=True):
+        """Serialize to plain dicts, optionally without the phases"""
+        data = super().to_dict()
+        if not include_phases:
+            data.pop('phases', None)
+        return data
+
+
+def as_dict(roadmap):
+    """Plain dict form of a Roadmap, or the value itself if it already is one"""
+    return roadmap.to_dict() if isinstance(roadmap, _Model) else roadmap
+
+
+# Global instance: user_id -> (version, Roadmap) of the active roadmap
+roadmap_cache = ProfileCache(max_entries=256)
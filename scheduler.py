@@ -0,0 +1,170 @@
+"""
+Weekly-budget roadmap scheduling
+Topics are packed, in prerequisite order, into weeks of a fixed study-hour
+budget. Each phase starts on a fresh week. When a learner falls behind or
+gets ahead, only the topics not yet completed are re-packed from the
+current week onwards.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+DATE_FORMAT = '%B %d, %Y'
+
+# Study hours per topic by phase (Foundation, Core Skills, Advanced Topics, Projects & Portfolio)
+PHASE_TOPIC_HOURS = (10, 14, 16, 20)
+
+# Less experienced learners need longer per topic
+SKILL_LEVEL_HOURS_FACTOR = {
+    'Beginner': 1.25,
+    'Intermediate': 1.0,
+    'Advanced': 0.9,
+    'Expert': 0.8
+}
+
+DEFAULT_WEEKLY_HOURS = 10
+
+# Study hours per week a learner can ask for
+MIN_WEEKLY_HOURS = 1
+MAX_WEEKLY_HOURS = 80
+
+
+def estimate_topic_hours(phase_index, skill_level, completed=False):
+    """Deterministic study-hour estimate for a topic"""
+    if completed:
+        return 0
+    base = PHASE_TOPIC_HOURS[min(phase_index, len(PHASE_TOPIC_HOURS) - 1)]
+    return max(1, round(base * SKILL_LEVEL_HOURS_FACTOR.get(skill_level, 1.0)))
+
+
+class WeeklyScheduler:
+    """Place topics one after another into weeks of weekly_hours hours"""
+
+    def __init__(self, weekly_hours, start_week=1):
+        self.weekly_hours = weekly_hours
+        # Hours scheduled so far, counted from the start of week 1
+        self.cursor = (start_week - 1) * weekly_hours
+
+    @property
+    def week(self):
+        """Week the next hour of study falls in"""
+        return self.cursor // self.weekly_hours + 1
+
+    @property
+    def last_week(self):
+        """Last week with any study scheduled"""
+        return max(1, math.ceil(self.cursor / self.weekly_hours))
+
+    def start_phase(self):
+        """Move to the start of the next week unless already at one"""
+        self.cursor = math.ceil(self.cursor / self.weekly_hours) * self.weekly_hours
+
+    def place(self, hours):
+        """Schedule a topic and return its (start_week, end_week)"""
+        start_week = self.week
+        if hours <= 0:
+            return start_week, start_week
+        self.cursor += hours
+        return start_week, self.last_week
+
+
+def count_weeks(phase_hours, weekly_hours):
+    """Weeks a schedule of phase_hours (a list of topic-hour lists) takes"""
+    scheduler = WeeklyScheduler(weekly_hours)
+    for hours in phase_hours:
+        scheduler.start_phase()
+        for topic_hours in hours:
+            scheduler.place(topic_hours)
+    return scheduler.last_week
+
+
+def budget_for_weeks(phase_hours, weeks):
+    """Smallest whole weekly budget that fits the phases into the given weeks
+
+    If there are fewer weeks than non-empty phases no budget fits; the one
+    returned then gives each phase a single week.
+    """
+    total = sum(sum(hours) for hours in phase_hours)
+    if total == 0:
+        return DEFAULT_WEEKLY_HOURS
+    weeks = max(1, weeks)
+    largest_phase = max(sum(hours) for hours in phase_hours)
+    budget = max(1, math.ceil(total / weeks))
+    while budget < largest_phase and count_weeks(phase_hours, budget) > weeks:
+        budget += 1
+    return budget
+
+
+def apply_timeline(roadmap, start_date, weeks):
+    """Set the timeline fields that depend on the schedule length"""
+    end_date = start_date + timedelta(weeks=weeks)
+    roadmap['timeline']['total_weeks'] = weeks
+    roadmap['timeline']['end_date'] = end_date.strftime(DATE_FORMAT)
+    if 'user_info' in roadmap:
+        roadmap['user_info']['estimated_completion'] = end_date.strftime('%B %Y')
+
+
+def current_week(roadmap, today=None):
+    """Week of the roadmap that today falls in, starting at 1"""
+    today = today or datetime.now()
+    try:
+        start_date = datetime.strptime(roadmap['timeline']['start_date'], DATE_FORMAT)
+    except (KeyError, ValueError):
+        return 1
+    return max(1, (today - start_date).days // 7 + 1)
+
+
+def reschedule(roadmap, week):
+    """Re-plan the topics that are not completed yet, starting at week
+
+    Completed topics keep their place and topics before the first unfinished
+    one are not touched. Roadmaps without a schedule are left alone. Returns
+    the number of topics whose weeks were rewritten.
+    """
+    schedule = roadmap.get('schedule')
+    if not schedule:
+        return 0
+
+    phases = roadmap['phases']
+    first = None
+    for phase_index, phase in enumerate(phases):
+        for topic_index, topic in enumerate(phase['topics']):
+            if topic.get('status') != 'completed':
+                first = (phase_index, topic_index)
+                break
+        if first:
+            break
+    if first is None:
+        return 0
+
+    phase_index, topic_index = first
+    first_topic = phases[phase_index]['topics'][topic_index]
+    if first_topic.get('start_week', 0) <= week <= first_topic.get('end_week', 0):
+        # On schedule: the remaining plan still holds
+        return 0
+
+    scheduler = WeeklyScheduler(schedule['weekly_hours'], start_week=week)
+    rewritten = 0
+    for index in range(phase_index, len(phases)):
+        phase = phases[index]
+        if index > phase_index:
+            scheduler.start_phase()
+        for topic in phase['topics'][topic_index if index == phase_index else 0:]:
+            if topic.get('status') == 'completed':
+                continue
+            topic['start_week'], topic['end_week'] = scheduler.place(topic['estimated_hours'])
+            rewritten += 1
+        _update_phase_weeks(phase)
+
+    start_date = datetime.strptime(roadmap['timeline']['start_date'], DATE_FORMAT)
+    apply_timeline(roadmap, start_date, max(scheduler.last_week, phases[-1]['end_week']))
+    return rewritten
+
+
+def _update_phase_weeks(phase):
+    weeks = [topic['start_week'] for topic in phase['topics'] if 'start_week' in topic]
+    end_weeks = [topic['end_week'] for topic in phase['topics'] if 'end_week' in topic]
+    if weeks:
+        phase['start_week'] = min(weeks)
+        phase['end_week'] = max(end_weeks)
+        phase['weeks'] = phase['end_week'] - phase['start_week'] + 1
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Synthetic data for scale testing
+Fills a SQLite file or PostgreSQL database with generated users,
+questionnaire preferences, graded test attempts (with per-topic scores
+and per-question answers) and accepted roadmaps. Rows are buffered per
+table and written in batches, with executemany on SQLite and COPY on
+PostgreSQL, one transaction per batch, so memory stays flat for any
+number of users. Everything is drawn from one seeded random generator:
+the same arguments (including --end-date) give the same rows, except for
+password salts and the dates inside roadmap documents, which the
+generator takes from today.
+
+Answers follow the Rasch model with a random ability per user and
+difficulty per question, so item_analysis.py and adaptive tests see
+realistic statistics. Roadmaps are generated once per specialization and
+skill focus and stored at random points of progress.
+
+Usage:
+    python seed_data.py DATABASE [--users 100000] [--tests 3] [--roadmaps 0.3] [--seed 1] [--batch-size 5000]
+
+DATABASE is a SQLite file (created if missing) or a postgresql:// URL.
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+import roadmap_history
+from adaptive_test import chance_correct
+from assessment_engine import QUESTIONS_PER_TOPIC, assessment_engine
+from db_utils import execute, executemany, is_sqlite
+from enhanced_roadmap_generator import SPECIALIZATION_MAPPING, EnhancedRoadmapGenerator
+from prerequisite_engine import complete_topics, next_topics
+from roadmap_model import as_dict
+from skill_matching import skills_mask
+
+try:
+    import psycopg
+    POSTGRES_AVAILABLE = True
+    DATABASE_ERRORS = (sqlite3.Error, psycopg.Error)
+except ImportError:
+    POSTGRES_AVAILABLE = False
+    DATABASE_ERRORS = (sqlite3.Error,)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Password of every seeded user
+SEED_PASSWORD = 'password'
+
+# Questionnaire choices, as in templates/questionnaire.html
+ROLES = ('student', 'developer')
+COMPANIES = ('meta', 'apple', 'amazon', 'netflix', 'google', 'microsoft')
+POSITIONS = ('software_engineer', 'data_scientist', 'ml_engineer', 'frontend_developer', 'backend_developer',
+             'devops_engineer')
+SKILLS = ('python', 'cpp', 'java', 'webdev', 'javascript')
+SKILL_FOCUSES = ('soft_skills', 'hard_skills')
+
+FIRST_NAMES = ('Aarav', 'Aditi', 'Ananya', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Nikhil', 'Priya',
+               'Rahul', 'Riya', 'Rohan', 'Sara', 'Tanvi', 'Vikram', 'Alex', 'Maria', 'Sam', 'Wei')
+LAST_NAMES = ('Sharma', 'Patel', 'Iyer', 'Reddy', 'Gupta', 'Nair', 'Singh', 'Das', 'Khan', 'Rao',
+              'Smith', 'Garcia', 'Chen', 'Kim', 'Silva')
+
+# Columns written per table, in foreign key order
+TABLES = {
+    'users': ('id', 'username', 'email', 'password'),
+    'user_preferences': ('user_id', 'user_name', 'role', 'target_company', 'position', 'previous_skills',
+                         'skills_mask', 'specialization', 'skill_focus'),
+    'test_results': ('id', 'user_id', 'user_name', 'python_score', 'cpp_score', 'total_score', 'percentage',
+                     'test_date'),
+    'test_topic_scores': ('result_id', 'topic', 'score', 'questions'),
+    'test_responses': ('result_id', 'position', 'question_id', 'answer', 'correct'),
+    'user_roadmaps': ('user_id', 'status', 'roadmap_data', 'version', 'phase_index'),
+    'roadmap_versions': ('user_id', 'version', 'status', 'base_version', 'chain_length', 'data'),
+}
+
+# Tables whose ids are assigned here; PostgreSQL sequences are moved past them afterwards
+ID_TABLES = ('users', 'test_results')
+
+
+class BatchWriter:
+    """Buffer rows per table and write all buffers once any holds batch_size rows"""
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in TABLES}
+        self.written = dict.fromkeys(TABLES, 0)
+
+    def add(self, table, row):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered row in one transaction"""
+        for table, rows in self.buffers.items():
+            if not rows:
+                continue
+            columns = TABLES[table]
+            if is_sqlite(self.conn):
+                executemany(self.conn, f"INSERT INTO {table} ({', '.join(columns)}) "
+                                       f"VALUES ({', '.join('?' for _ in columns)})", rows)
+            else:
+                with self.conn.cursor() as cursor:
+                    with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                        for row in rows:
+                            copy.write_row(row)
+            self.written[table] += len(rows)
+            rows.clear()
+        self.conn.commit()
+
+
+class Seeder:
+    """Generate the rows of users and everything that belongs to them"""
+
+    def __init__(self, rng, end_date, tests_per_user=3, roadmap_share=0.3, responses=True):
+        self.rng = rng
+        self.end_date = end_date
+        self.tests_per_user = tests_per_user
+        self.roadmap_share = roadmap_share
+        self.responses = responses
+        self.password_hash = generate_password_hash(SEED_PASSWORD)
+        self.questions = self._load_questions()
+        self.roadmaps = self._roadmap_variants() if roadmap_share else {}
+
+    def _load_questions(self):
+        """Per topic, (question id, answer, wrong options, difficulty) of every question"""
+        questions = {}
+        for topic in assessment_engine.topics():
+            questions[topic] = []
+            for index in range(len(assessment_engine.load_bank(topic))):
+                question = assessment_engine.question(f"{topic}:{index}")
+                wrong = sorted(key for key in question['options'] if key != question['answer']) or [None]
+                questions[topic].append((question['id'], question['answer'], wrong, self.rng.gauss(0, 1)))
+        return questions
+
+    def _roadmap_variants(self):
+        """Serialized roadmaps per (specialization, skill focus), one per number of completed topics"""
+        generator = EnhancedRoadmapGenerator(self.rng)
+        variants = {}
+        for specialization in SPECIALIZATION_MAPPING:
+            for skill_focus in SKILL_FOCUSES:
+                roadmap = as_dict(generator.generate_enhanced_roadmap(
+                    {'specialization': specialization, 'skill_focus': skill_focus}))
+                serialized = [roadmap_history.serialize_roadmap(roadmap)]
+                while True:
+                    ready = next_topics(roadmap)
+                    if not ready:
+                        break
+                    complete_topics(roadmap, [ready[0]['id']])
+                    serialized.append(roadmap_history.serialize_roadmap(roadmap))
+                variants[specialization, skill_focus] = serialized
+        return variants
+
+    def user(self, writer, user_id, result_id):
+        """Add one user's rows; returns the next free result id"""
+        rng = self.rng
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        writer.add('users', (user_id, name, f"seed{user_id}@example.com", self.password_hash))
+
+        skills = ','.join(skill for skill in SKILLS if rng.random() < 0.4)
+        specialization = rng.choice(tuple(SPECIALIZATION_MAPPING))
+        skill_focus = rng.choice(SKILL_FOCUSES)
+        writer.add('user_preferences', (user_id, name, rng.choice(ROLES), rng.choice(COMPANIES),
+                                        rng.choice(POSITIONS), skills, skills_mask(skills), specialization,
+                                        skill_focus))
+
+        ability = rng.gauss(0, 1)
+        for _ in range(rng.randint(0, 2 * self.tests_per_user)):
+            self.test_attempt(writer, user_id, name, result_id, ability)
+            result_id += 1
+            ability += abs(rng.gauss(0, 0.2))
+
+        if rng.random() < self.roadmap_share:
+            variants = self.roadmaps[specialization, skill_focus]
+            roadmap_json, phase_index = rng.choice(variants)
+            writer.add('user_roadmaps', (user_id, 'accepted', roadmap_json, 1, phase_index))
+            writer.add('roadmap_versions', (user_id, 1, 'accepted', None, 0, roadmap_json))
+        return result_id
+
+    def test_attempt(self, writer, user_id, name, result_id, ability):
+        rng = self.rng
+        scores = {}
+        position = 0
+        for topic, questions in self.questions.items():
+            score = 0
+            for question_id, answer, wrong, difficulty in rng.sample(questions, min(QUESTIONS_PER_TOPIC,
+                                                                                    len(questions))):
+                roll = rng.random()
+                if roll < 0.03:
+                    given, correct = None, 0
+                elif roll < chance_correct(ability, difficulty):
+                    given, correct = answer, 1
+                else:
+                    given, correct = rng.choice(wrong), 0
+                score += correct
+                if self.responses:
+                    writer.add('test_responses', (result_id, position, question_id, given, correct))
+                position += 1
+            scores[topic] = score
+            writer.add('test_topic_scores', (result_id, topic, score, min(QUESTIONS_PER_TOPIC, len(questions))))
+
+        total = sum(scores.values())
+        test_date = self.end_date - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        writer.add('test_results', (result_id, user_id, name, scores.get('python', 0), scores.get('cpp', 0), total,
+                                    total / position * 100 if position else 0,
+                                    test_date.strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def connect(database):
+    """Connection to a postgresql:// URL or a SQLite file, creating the SQLite schema if needed"""
+    if database.startswith(('postgres://', 'postgresql://')):
+        if not POSTGRES_AVAILABLE:
+            raise RuntimeError('psycopg is not installed')
+        return psycopg.connect(database)
+    conn = sqlite3.connect(database)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'roadmap_versions'").fetchone():
+        conn.close()
+        # Imported here since it sets up the whole app
+        import index
+        index.app.config['DATABASE_PATH'] = database
+        index.init_db()
+        conn = sqlite3.connect(database)
+    # Seeded data can be generated again, so skip waiting for the disk on every commit
+    conn.execute('PRAGMA synchronous = OFF')
+    return conn
+
+
+def next_id(conn, table):
+    return (execute(conn, f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0) + 1
+
+
+def seed(conn, users, seeder, batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Add users (and their data) after the existing ones; returns rows written per table"""
+    writer = BatchWriter(conn, batch_size)
+    user_id = next_id(conn, 'users')
+    result_id = next_id(conn, 'test_results')
+    for count in range(1, users + 1):
+        result_id = seeder.user(writer, user_id, result_id)
+        user_id += 1
+        if report and count % 100000 == 0:
+            report(count)
+    writer.flush()
+    if not is_sqlite(conn):
+        for table in ID_TABLES:
+            execute(conn, f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))")
+        conn.commit()
+    return writer.written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fill a database with synthetic users, tests and roadmaps.')
+    parser.add_argument('database', help='SQLite file or postgresql:// URL')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--tests', type=int, default=3, help='mean test attempts per user')
+    parser.add_argument('--roadmaps', type=float, default=0.3, help='share of users with a roadmap')
+    parser.add_argument('--no-responses', action='store_true', help='skip per-question answers')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--end-date', type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                        default=datetime.now().replace(microsecond=0),
+                        help='latest test date (YYYY-MM-DD); tests spread over the year before it')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    seeder = Seeder(random.Random(args.seed), args.end_date, args.tests, args.roadmaps,
+                    not args.no_responses)
+    start = time.perf_counter()
+    try:
+        conn = connect(args.database)
+        try:
+            written = seed(conn, args.users, seeder, args.batch_size,
+                           report=lambda count: print(f"{count} users ({time.perf_counter() - start:.0f} s)"))
+        finally:
+            conn.close()
+    except DATABASE_ERRORS + (RuntimeError,) as e:
+        print(f"Error seeding database: {e}")
+        return 1
+
+    elapsed = time.perf_counter() - start
+    for table, count in written.items():
+        print(f"{table:20}{count:>12}")
+    print(f"{sum(written.values())} rows in {elapsed:.1f} s ({sum(written.values()) / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Pre-fork production server
+The master process imports the app, loads the question banks, roadmap
+templates and topic graphs, compiles every Jinja template, then freezes the
+garbage collector and forks the workers. Workers accept on the master's
+listening socket and share the preloaded data copy-on-write.
+
+Each worker has its own profile cache; invalidations are shared through
+generation counters the master allocates before forking.
+
+Usage:
+    python serve.py [--host 0.0.0.0] [--port 8000] [--workers N]
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+from assessment_engine import assessment_engine
+from enhanced_roadmap_generator import SPECIALIZATION_MAPPING, enhanced_roadmap_generator
+from index import app, init_db
+from profile_cache import profile_cache
+from template_cache import warm_templates
+
+# Seconds the master waits for workers to start before reporting their memory
+SUMMARY_DELAY = 1.0
+
+
+def preload():
+    """Load the read-only data every worker needs and return a summary"""
+    questions = sum(len(assessment_engine.load_bank(topic)) for topic in assessment_engine.topics())
+    specializations = sorted(set(SPECIALIZATION_MAPPING.values()))
+    graphs = sum(1 for specialization in specializations
+                 if enhanced_roadmap_generator._get_roadmap_template(specialization)[1] is not None)
+    templates = warm_templates(app)
+    return {
+        'questions': questions,
+        'roadmap templates': len(specializations),
+        'topic graphs': graphs,
+        'jinja templates': len(templates)
+    }
+
+
+def memory_usage(pid):
+    """Return {'rss', 'shared', 'private'} in KiB from /proc, or None"""
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0])
+    except (OSError, ValueError):
+        return None
+    return {
+        'rss': fields.get('Rss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def print_summary(preloaded, workers):
+    print('Preloaded: ' + ', '.join(f"{count} {name}" for name, count in preloaded.items()))
+    print(f"{'process':>16}{'rss':>12}{'shared':>12}{'private':>12}")
+    for label, pid in [('master', os.getpid())] + [(f'worker {pid}', pid) for pid in workers]:
+        usage = memory_usage(pid)
+        if usage is None:
+            print(f"{label:>16}{'n/a':>12}")
+            continue
+        print(f"{label:>16}" + ''.join(f"{usage[key] / 1024:>10.1f}MB" for key in ('rss', 'shared', 'private')))
+    sys.stdout.flush()
+
+
+def run_worker(listener, host, port):
+    """Serve requests on the shared socket until terminated"""
+    gc.enable()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+    server.serve_forever()
+
+
+def spawn_worker(listener, host, port):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(listener, host, port)
+        except BaseException as e:
+            print(f"Worker {os.getpid()} error: {e}")
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the app with pre-forked workers.')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)))
+    args = parser.parse_args(argv)
+
+    if app.config.get('USE_SQLITE', True):
+        init_db()
+
+    # Objects created from here on are never collected in the master
+    gc.disable()
+    preloaded = preload()
+    profile_cache.share_invalidations()
+
+    listener = socket.create_server((args.host, args.port), reuse_port=False, backlog=128)
+    listener.set_inheritable(True)
+
+    # Move everything loaded so far out of the collector's reach, so that
+    # collections in the workers do not touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    workers = {spawn_worker(listener, args.host, args.port) for _ in range(max(1, args.workers))}
+    print(f"Serving on http://{args.host}:{args.port} with {len(workers)} workers")
+
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    time.sleep(SUMMARY_DELAY)
+    if running:
+        print_summary(preloaded, workers)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if running:
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            workers.add(spawn_worker(listener, args.host, args.port))
+
+    listener.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Cohort skill-gap report
+For each specialization, count how many users lack each skill its roadmap
+requires, using the skill bitsets stored with the questionnaire answers.
+
+Usage:
+    python skill_gap_report.py [path/to/users.db]
+"""
+
+import sqlite3
+import sys
+
+from config import Config
+from enhanced_roadmap_generator import SPECIALIZATION_MAPPING, enhanced_roadmap_generator
+from skill_matching import mask_skills, skill_gap_report, skills_mask
+
+
+def iter_profiles(conn):
+    """Yield (specialization, skills_mask) for every questionnaire row"""
+    rows = conn.execute('SELECT specialization, skills_mask, previous_skills FROM user_preferences')
+    for specialization, mask, previous_skills in rows:
+        # Rows saved before skills_mask existed still need their string parsed
+        yield specialization, mask if mask is not None else skills_mask(previous_skills)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    db_path = argv[0] if argv else Config.DATABASE_PATH
+
+    required_masks = {specialization: enhanced_roadmap_generator.required_skills_mask(specialization)
+                      for specialization in SPECIALIZATION_MAPPING}
+
+    conn = sqlite3.connect(db_path)
+    try:
+        report = skill_gap_report(iter_profiles(conn), required_masks)
+    finally:
+        conn.close()
+
+    for specialization, entry in sorted(report.items()):
+        required = mask_skills(required_masks.get(specialization, 0))
+        print(f"{specialization}: {entry['users']} users, {entry['ready']} with every required skill")
+        print(f"  requires: {', '.join(required) or 'nothing tracked'}")
+        for skill, count in sorted(entry['missing'].items(), key=lambda item: -item[1]):
+            print(f"  missing {skill}: {count}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
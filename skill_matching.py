@@ -0,0 +1,126 @@
+"""
+Skill bitsets
+Skills are normalized onto a fixed vocabulary and held as integer bitsets,
+both for what a user already knows (questionnaire previous_skills) and for
+what a roadmap topic requires. Matching a topic or a whole cohort is then a
+handful of bitwise operations per profile.
+"""
+
+import re
+from functools import lru_cache
+
+# Bit positions are persisted in user_preferences.skills_mask: append only
+SKILL_VOCABULARY = (
+    'python', 'cpp', 'java', 'webdev', 'javascript',
+    'html', 'css', 'git', 'sql', 'statistics', 'linux', 'networking',
+)
+SKILL_BITS = {skill: 1 << i for i, skill in enumerate(SKILL_VOCABULARY)}
+
+SKILL_ALIASES = {
+    'c++': 'cpp',
+    'js': 'javascript',
+    'web_development': 'webdev',
+    'web development': 'webdev',
+    'html5': 'html',
+    'css3': 'css',
+    'version control': 'git',
+    'stats': 'statistics',
+}
+
+# Knowing a skill implies knowing these as well
+SKILL_IMPLIES = {
+    'webdev': ('html', 'css'),
+}
+
+# Topic title patterns and the skill each one requires
+TOPIC_SKILL_PATTERNS = [
+    (re.compile(r'\bpython\b', re.I), 'python'),
+    (re.compile(r'c\+\+', re.I), 'cpp'),
+    (re.compile(r'\bjava\b(?!script)', re.I), 'java'),
+    (re.compile(r'\bjavascript\b', re.I), 'javascript'),
+    (re.compile(r'\bhtml5?\b', re.I), 'html'),
+    (re.compile(r'\bcss3?\b', re.I), 'css'),
+    (re.compile(r'\bgit\b|version control', re.I), 'git'),
+    (re.compile(r'\bsql\b', re.I), 'sql'),
+    (re.compile(r'\bstatistic|\bprobability\b', re.I), 'statistics'),
+    (re.compile(r'\blinux\b', re.I), 'linux'),
+    (re.compile(r'\bnetworking\b|\bnetwork security\b', re.I), 'networking'),
+]
+
+
+def normalize_skill(skill):
+    """Map a raw skill name onto the vocabulary, or None if unknown"""
+    skill = skill.strip().lower()
+    skill = SKILL_ALIASES.get(skill, skill)
+    return skill if skill in SKILL_BITS else None
+
+
+def skills_mask(skills):
+    """Bitset of a list of skills or a comma-separated skills string"""
+    if not skills:
+        return 0
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    mask = 0
+    for raw_skill in skills:
+        skill = normalize_skill(raw_skill)
+        if skill is None:
+            continue
+        mask |= SKILL_BITS[skill]
+        for implied in SKILL_IMPLIES.get(skill, ()):
+            mask |= SKILL_BITS[implied]
+    return mask
+
+
+def mask_skills(mask):
+    """Skill names set in a bitset"""
+    return [skill for skill in SKILL_VOCABULARY if mask & SKILL_BITS[skill]]
+
+
+@lru_cache(maxsize=4096)
+def topic_mask(title):
+    """Bitset of the skills a topic title requires"""
+    mask = 0
+    for pattern, skill in TOPIC_SKILL_PATTERNS:
+        if pattern.search(title):
+            mask |= SKILL_BITS[skill]
+    return mask
+
+
+def is_known(required, known):
+    """True if a topic requires skills and the user has all of them"""
+    return bool(required) and not required & ~known
+
+
+def skill_gap_report(profiles, required_masks):
+    """Count missing skills across a cohort
+
+    profiles is an iterable of (specialization, skills_mask) and
+    required_masks maps a specialization to the bitset its roadmap needs.
+    Returns {specialization: {'users', 'ready', 'missing': {skill: users}}}.
+    """
+    counters = {}
+    for specialization, known in profiles:
+        required = required_masks.get(specialization, 0)
+        entry = counters.get(specialization)
+        if entry is None:
+            entry = counters[specialization] = [0, 0, [0] * len(SKILL_VOCABULARY)]
+        entry[0] += 1
+        gap = required & ~(known or 0)
+        if not gap:
+            entry[1] += 1
+            continue
+        missing = entry[2]
+        while gap:
+            lowest = gap & -gap
+            missing[lowest.bit_length() - 1] += 1
+            gap ^= lowest
+
+    return {
+        specialization: {
+            'users': users,
+            'ready': ready,
+            'missing': {SKILL_VOCABULARY[bit]: count for bit, count in enumerate(missing) if count}
+        }
+        for specialization, (users, ready, missing) in counters.items()
+    }
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Jinja bytecode cache and template warmup
+Compiled templates are stored on disk, so a new process loads them instead
+of parsing and compiling the template source again. Running this module
+compiles every template into the cache directory; do so before deploying
+so cold starts find the cache filled. A read-only cache directory (as on
+Vercel) is still read, and writes to it are skipped.
+
+Usage:
+    python template_cache.py [cache_dir]
+"""
+
+import os
+import sys
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """Filesystem bytecode cache that tolerates a read-only directory"""
+
+    def __init__(self, directory):
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            pass
+        super().__init__(directory, '%s.jinja.cache')
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def install_bytecode_cache(app):
+    """Use the app's JINJA_CACHE_DIR, if set, as its Jinja bytecode cache"""
+    directory = app.config.get('JINJA_CACHE_DIR')
+    if directory:
+        app.jinja_env.bytecode_cache = TemplateBytecodeCache(directory)
+
+
+def warm_templates(app):
+    """Compile (or load from the bytecode cache) every template; returns their names"""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    from index import app
+
+    if argv:
+        app.config['JINJA_CACHE_DIR'] = argv[0]
+        install_bytecode_cache(app)
+    if app.jinja_env.bytecode_cache is None:
+        print('JINJA_CACHE_DIR is not set; nothing to write')
+        return 1
+
+    start = time.perf_counter()
+    names = warm_templates(app)
+    elapsed = time.perf_counter() - start
+    print(f"Compiled {len(names)} templates into {app.config['JINJA_CACHE_DIR']} in {elapsed * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
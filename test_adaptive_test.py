@@ -0,0 +1,90 @@
+import json
+import random
+
+import pytest
+
+from adaptive_test import (MAX_QUESTIONS_PER_TOPIC, MIN_QUESTIONS_PER_TOPIC, TARGET_STANDARD_ERROR,
+                           AdaptiveTestEngine, DifficultyIndex, chance_correct, standard_error)
+from assessment_engine import AssessmentEngine
+
+BANK_SIZE = 41
+
+
+def difficulty(index):
+    """Questions of the test bank range evenly from -4 to 4 logits"""
+    return (index - (BANK_SIZE - 1) / 2) / 5
+
+
+@pytest.fixture
+def engine(tmp_path, db):
+    questions = [{'question': f'Question {index}', 'options': {'a': 'right', 'b': 'wrong'}, 'answer': 'a'}
+                 for index in range(BANK_SIZE)]
+    (tmp_path / 'python_mcqs.json').write_text(json.dumps(questions), encoding='utf-8')
+    db.executemany('INSERT INTO question_difficulty (question_id, difficulty, responses) VALUES (?, ?, ?)',
+                   [(f'python:{index}', difficulty(index), 100) for index in range(BANK_SIZE)])
+    db.commit()
+    engine = AdaptiveTestEngine(AssessmentEngine(str(tmp_path), compiled_dir=str(tmp_path / 'banks')),
+                                random.Random(0))
+    engine.load_difficulties(db)
+    return engine
+
+
+def test_rasch_probability():
+    assert chance_correct(0, 0) == 0.5
+    assert chance_correct(1, 0) == pytest.approx(0.7311, abs=1e-4)
+    assert chance_correct(0, 1) == pytest.approx(1 - chance_correct(1, 0))
+    assert standard_error({'information': 0.0}) == 1
+    assert standard_error({'information': 3.0}) == 0.5
+
+
+def test_nearest_questions_by_difficulty():
+    index = DifficultyIndex(5, {0: -2.0, 1: -1.0, 2: 0.0, 3: 1.0, 4: 2.0}, random.Random(0))
+    assert index.nearest(0.9) == [3]
+    assert index.nearest(0.9, count=3) == [3, 2, 4]
+    assert index.nearest(0.9, exclude={3, 4}, count=2) == [2, 1]
+    assert index.nearest(-9, count=10) == [0, 1, 2, 3, 4]
+    assert index.expected_score(0) == pytest.approx(0.5)
+
+
+def test_answer_takes_a_newton_step(engine):
+    state = engine.start()
+    question = engine.next_question(state)
+    assert engine.next_question(state) == question
+    topic_state = state['topics']['python']
+    index = topic_state['asked'][0]
+    expected = chance_correct(0, difficulty(index))
+
+    assert engine.answer(state, 'a')
+    information = expected * (1 - expected)
+    assert topic_state['information'] == pytest.approx(information)
+    assert topic_state['ability'] == pytest.approx((1 - expected) / (1 + information))
+    assert state['question_ids'] == [question['id']] and state['current'] is None
+
+
+@pytest.mark.parametrize('ability', [-2.0, 0.0, 1.5])
+def test_estimate_converges_on_the_candidates_ability(engine, ability):
+    """A candidate who answers every question easier than their ability, and none harder"""
+    state = engine.start()
+    while (question := engine.next_question(state)) is not None:
+        index = int(question['id'].rpartition(':')[2])
+        engine.answer(state, 'a' if difficulty(index) < ability else 'b')
+
+    topic_state = state['topics']['python']
+    asked = len(topic_state['asked'])
+    assert MIN_QUESTIONS_PER_TOPIC <= asked <= MAX_QUESTIONS_PER_TOPIC
+    assert len(set(topic_state['asked'])) == asked
+    assert asked == MAX_QUESTIONS_PER_TOPIC or standard_error(topic_state) <= TARGET_STANDARD_ERROR
+    assert topic_state['ability'] == pytest.approx(ability, abs=1)
+    assert engine.progress(state) == (asked, asked)
+
+    result, questions, answers = engine.result(state)
+    assert result['adaptive'] and len(questions) == len(answers) == asked
+    assert result['percentage'] == pytest.approx(engine.index('python').expected_score(topic_state['ability']) * 100)
+
+
+def test_start_needs_enough_questions(tmp_path):
+    (tmp_path / 'python_mcqs.json').write_text(json.dumps([{'question': 'Q', 'options': {}, 'answer': 'a'}]),
+                                               encoding='utf-8')
+    engine = AdaptiveTestEngine(AssessmentEngine(str(tmp_path), compiled_dir=str(tmp_path / 'banks')))
+    with pytest.raises(ValueError):
+        engine.start()
@@ -0,0 +1,181 @@
+import copy
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import json_codec
+from enhanced_roadmap_generator import enhanced_roadmap_generator
+from json_patch import JsonPatchError, JsonPatchTestFailed, apply_patch, make_patch
+
+
+@pytest.fixture
+def document():
+    return {'title': 'Roadmap', 'phases': [{'id': 1, 'topics': ['a', 'b', 'c']}, {'id': 2, 'topics': []}],
+            'a/b': 1, 'm~n': 2}
+
+
+def test_add(document):
+    apply_patch(document, [
+        {'op': 'add', 'path': '/owner', 'value': 'me'},
+        {'op': 'add', 'path': '/phases/0/topics/1', 'value': 'x'},
+        {'op': 'add', 'path': '/phases/1/topics/-', 'value': 'y'},
+    ])
+    assert document['owner'] == 'me'
+    assert document['phases'][0]['topics'] == ['a', 'x', 'b', 'c']
+    assert document['phases'][1]['topics'] == ['y']
+
+
+def test_remove_and_replace(document):
+    apply_patch(document, [
+        {'op': 'remove', 'path': '/phases/0/topics/0'},
+        {'op': 'replace', 'path': '/title', 'value': 'Edited'},
+        {'op': 'replace', 'path': '/phases/0/topics/1', 'value': 'z'},
+    ])
+    assert document['title'] == 'Edited'
+    assert document['phases'][0]['topics'] == ['b', 'z']
+
+
+def test_escaped_keys(document):
+    apply_patch(document, [{'op': 'remove', 'path': '/a~1b'}, {'op': 'replace', 'path': '/m~0n', 'value': 3}])
+    assert 'a/b' not in document
+    assert document['m~n'] == 3
+
+
+def test_move(document):
+    apply_patch(document, [
+        {'op': 'move', 'from': '/phases/0/topics/2', 'path': '/phases/0/topics/0'},
+        {'op': 'move', 'from': '/phases/0/topics/0', 'path': '/phases/1/topics/-'},
+    ])
+    assert document['phases'][0]['topics'] == ['a', 'b']
+    assert document['phases'][1]['topics'] == ['c']
+
+
+def test_move_into_own_child_is_rejected(document):
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [{'op': 'move', 'from': '/phases/0', 'path': '/phases/0/topics/0'}])
+
+
+def test_copy_is_independent(document):
+    apply_patch(document, [{'op': 'copy', 'from': '/phases/0', 'path': '/phases/-'}])
+    document['phases'][2]['topics'].append('d')
+    assert document['phases'][0]['topics'] == ['a', 'b', 'c']
+
+
+def test_test_operation(document):
+    apply_patch(document, [{'op': 'test', 'path': '/phases/0/topics/1', 'value': 'b'}])
+    with pytest.raises(JsonPatchTestFailed):
+        apply_patch(document, [{'op': 'test', 'path': '/title', 'value': 'Other'}])
+
+
+def test_root_replace():
+    assert apply_patch({'a': 1}, [{'op': 'replace', 'path': '', 'value': [1]}]) == [1]
+
+
+@pytest.mark.parametrize('operation', [
+    {'op': 'remove', 'path': 'title'},
+    {'op': 'remove', 'path': '/missing'},
+    {'op': 'remove', 'path': ''},
+    {'op': 'replace', 'path': '/phases/5', 'value': 1},
+    {'op': 'replace', 'path': '/phases/01', 'value': 1},
+    {'op': 'replace', 'path': '/phases/-1', 'value': 1},
+    {'op': 'replace', 'path': '/phases/²', 'value': 1},
+    {'op': 'replace', 'path': '/phases/-', 'value': 1},
+    {'op': 'add', 'path': '/title/x', 'value': 1},
+    {'op': 'add', 'path': '/phases/0/topics/4', 'value': 1},
+    {'op': 'add', 'path': '/x'},
+    {'op': 'copy', 'from': '/missing', 'path': '/x'},
+    {'op': 'move', 'path': '/x'},
+    {'op': 'frobnicate', 'path': '/x'},
+    {'path': '/x'},
+    'remove',
+])
+def test_bad_operations(document, operation):
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [operation])
+
+
+def test_patch_must_be_a_list(document):
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, {'op': 'remove', 'path': '/title'})
+
+
+@pytest.mark.parametrize('target', [
+    {'title': 'Roadmap', 'phases': [{'id': 1, 'topics': ['c', 'a', 'b']}, {'id': 2, 'topics': []}], 'a/b': 1,
+     'm~n': 2},
+    {'title': 'New', 'phases': [{'id': 2, 'topics': []}, {'id': 1, 'topics': ['a', 'b', 'c']}], 'extra': True},
+    {'title': 'Roadmap', 'phases': [{'id': 1, 'topics': ['a']}], 'a/b': [1, 2], 'm~n': None},
+])
+def test_make_patch_round_trip(document, target):
+    patch = make_patch(document, target)
+    assert apply_patch(copy.deepcopy(document), patch) == target
+
+
+def test_make_patch_uses_moves_for_reordering(document):
+    target = copy.deepcopy(document)
+    target['phases'][0]['topics'] = ['c', 'a', 'b']
+    assert make_patch(document, target) == [{'op': 'move', 'from': '/phases/0/topics/2',
+                                             'path': '/phases/0/topics/0'}]
+
+
+def _roadmap_page_diff():
+    """diffRoadmap and its helpers from roadmap_page.html, as a node script reading [source, target] pairs"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'roadmap_page.html'),
+              encoding='utf-8') as f:
+        page = f.read()
+    start = page.index('function escapePointer')
+    end = page.index('function sendRoadmapEdit')
+    return page[start:end] + '''
+let input = '';
+process.stdin.on('data', chunk => { input += chunk; });
+process.stdin.on('end', () => {
+    const cases = JSON.parse(input);
+    process.stdout.write(JSON.stringify(cases.map(([source, target]) => diffRoadmap(source, target))));
+});
+'''
+
+
+def _edited_roadmaps():
+    roadmap = json.loads(json_codec.dumps(enhanced_roadmap_generator.generate_enhanced_roadmap(
+        {'specialization': 'web_development', 'skill_focus': 'Intermediate'})))
+    edits = []
+
+    edited = copy.deepcopy(roadmap)
+    topics = edited['phases'][1]['topics']
+    topics.insert(0, topics.pop())
+    edits.append(edited)
+
+    edited = copy.deepcopy(roadmap)
+    edited['phases'][0]['topics'][0]['status'] = 'completed'
+    edited['phases'][0]['name'] = 'Basics / Setup ~ 1'
+    edits.append(edited)
+
+    edited = copy.deepcopy(roadmap)
+    del edited['phases'][2]['topics'][1]
+    edited['notes'] = {'a/b': ['x', {'y': None}]}
+    edits.append(edited)
+
+    edited = copy.deepcopy(roadmap)
+    edited['phases'].reverse()
+    del edited['timeline']
+    edits.append(edited)
+
+    edited = copy.deepcopy(roadmap)
+    edited['phases'][0]['topics'][0]['resources'] = []
+    edited['phases'][3]['topics'][0]['estimated_hours'] += 5
+    edits.append(edited)
+    return [(roadmap, target) for target in edits]
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node to run the roadmap page script')
+def test_roadmap_page_diff_matches_make_patch(tmp_path):
+    script = tmp_path / 'diff.js'
+    script.write_text(_roadmap_page_diff(), encoding='utf-8')
+    cases = _edited_roadmaps()
+    output = subprocess.run(['node', str(script)], input=json.dumps(cases), capture_output=True, text=True,
+                            check=True).stdout
+    for (source, target), js_patch in zip(cases, json.loads(output), strict=True):
+        assert js_patch == make_patch(source, target)
+        assert apply_patch(copy.deepcopy(source), js_patch) == target
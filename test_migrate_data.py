@@ -0,0 +1,121 @@
+import random
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import index
+import migrate_data
+import seed_data
+from migrate_data import TABLES, SQLWriter, export_database, import_database
+
+USERS = 12
+
+
+def create_database(path, monkeypatch):
+    monkeypatch.setitem(index.app.config, 'DATABASE_PATH', str(path))
+    index.init_db()
+    return sqlite3.connect(path)
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    """An export of a seeded database"""
+    conn = create_database(tmp_path / 'source.db', monkeypatch)
+    seeder = seed_data.Seeder(random.Random(1), datetime(2026, 1, 1), roadmap_share=0.5)
+    seed_data.seed(conn, USERS, seeder, batch_size=50)
+    directory = tmp_path / 'export'
+    export_database(conn, str(directory), report=lambda message: None)
+    conn.close()
+    return directory
+
+
+def table_rows(conn, table, skip=()):
+    columns = [column for column in migrate_data.table_columns(conn, table) if column not in skip]
+    return [tuple(row) for row in conn.execute(
+        f"SELECT {', '.join(columns)} FROM {table} ORDER BY {', '.join(TABLES[table]['key'])}")]
+
+
+def import_into(conn, directory, **options):
+    return import_database(str(directory), SQLWriter(conn), migrate_data.state_path(str(directory), 'target'),
+                           report=lambda message: None, **options)
+
+
+def test_round_trip_into_an_empty_database(tmp_path, export_dir, monkeypatch):
+    target = create_database(tmp_path / 'target.db', monkeypatch)
+    state = import_into(target, export_dir)
+    assert not any(state['id_offsets'].values())
+
+    source = sqlite3.connect(tmp_path / 'source.db')
+    for table in TABLES:
+        assert table_rows(target, table) == table_rows(source, table), table
+    assert len(table_rows(target, 'users')) == USERS
+
+
+def test_export_skips_finished_tables(tmp_path, export_dir):
+    source = sqlite3.connect(tmp_path / 'source.db')
+    messages = []
+    manifest = export_database(source, str(export_dir), report=messages.append)
+    assert messages == []
+    assert manifest['tables']['users']['rows'] == USERS
+
+
+def test_import_shifts_ids_and_matches_existing_users(tmp_path, export_dir, monkeypatch):
+    target = create_database(tmp_path / 'target.db', monkeypatch)
+    target.executemany('INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+                       [('Existing', 'someone@example.com', 'x'), ('Seed Two', 'seed2@example.com', 'x')])
+    target.execute("INSERT INTO user_preferences (user_id, user_name, role, target_company, position, "
+                   "previous_skills, specialization, skill_focus) "
+                   "VALUES (2, 'Seed Two', 'Student', 'Tech Company', 'Developer', '', 'web_development', 'Beginner')")
+    target.commit()
+
+    state = import_into(target, export_dir)
+    assert state['id_offsets']['users'] == 2
+    assert state['id_map'] == {'users': {'2': 2}}
+
+    source = sqlite3.connect(tmp_path / 'source.db')
+    emails = {row[0]: row[1] for row in target.execute('SELECT id, email FROM users')}
+    assert len(emails) == USERS + 1
+    for user_id, in source.execute('SELECT id FROM users'):
+        target_id = 2 if user_id == 2 else user_id + 2
+        assert emails[target_id] == f'seed{user_id}@example.com'
+        source_results = source.execute('SELECT COUNT(*) FROM test_results WHERE user_id = ?', (user_id,))
+        target_results = target.execute('SELECT COUNT(*) FROM test_results WHERE user_id = ?', (target_id,))
+        assert source_results.fetchone() == target_results.fetchone()
+    # The existing user keeps their own preferences
+    assert target.execute('SELECT user_name FROM user_preferences WHERE user_id = 2').fetchall() == [('Seed Two',)]
+
+
+class InterruptedWriter(SQLWriter):
+    """Fails after a number of batches, as if the import had been killed"""
+
+    def __init__(self, conn, batches):
+        super().__init__(conn)
+        self.batches = batches
+
+    def write(self, table, columns, rows):
+        if self.batches == 0:
+            raise KeyboardInterrupt
+        self.batches -= 1
+        return super().write(table, columns, rows)
+
+
+@pytest.mark.parametrize('batches', [1, 4, 9])
+def test_interrupted_import_resumes_from_its_checkpoint(tmp_path, export_dir, monkeypatch, batches):
+    target = create_database(tmp_path / 'target.db', monkeypatch)
+    checkpoint = migrate_data.state_path(str(export_dir), 'target')
+    with pytest.raises(KeyboardInterrupt):
+        import_database(str(export_dir), InterruptedWriter(target, batches), checkpoint, batch_size=5,
+                        report=lambda message: None)
+
+    state = import_into(target, export_dir, batch_size=5)
+    assert all(progress['done'] for progress in state['tables'].values())
+    source = sqlite3.connect(tmp_path / 'source.db')
+    for table in TABLES:
+        assert table_rows(target, table) == table_rows(source, table), table
+
+    # Once finished, importing again writes nothing
+    assert import_into(target, export_dir) == state
+    # A restart maps everything past the rows now in the target, skipping the matched users
+    state = import_into(target, export_dir, restart=True)
+    assert len(state['id_map']['users']) == USERS
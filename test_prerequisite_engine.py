@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import json_codec
+from prerequisite_engine import complete_topic, complete_topics, init_progress, next_topics
+
+
+def make_roadmap():
+    """Two phases; 2.1 needs 1.1 and 1.2, 2.2 needs 1.2, 2.3 needs 2.1"""
+    return {'phases': [
+        {'topics': [{'id': '1.1', 'prerequisite_ids': []}, {'id': '1.2', 'prerequisite_ids': []}]},
+        {'topics': [{'id': '2.1', 'prerequisite_ids': ['1.1', '1.2']}, {'id': '2.2', 'prerequisite_ids': ['1.2']},
+                    {'id': '2.3', 'prerequisite_ids': ['2.1']}]},
+    ]}
+
+
+def ids(topics):
+    return [topic['id'] for topic in topics]
+
+
+def test_init_progress():
+    roadmap = init_progress(make_roadmap())
+    progress = roadmap['progress']
+    assert progress['frontier'] == {'1.1', '1.2'}
+    assert progress['pending_prerequisites'] == {'1.1': 0, '1.2': 0, '2.1': 2, '2.2': 1, '2.3': 1}
+    assert [topic['locked'] for topic in roadmap['phases'][1]['topics']] == [True, True, True]
+    assert [phase['status'] for phase in roadmap['phases']] == ['current', 'locked']
+
+
+def test_completing_topics_unlocks_dependents():
+    roadmap = init_progress(make_roadmap())
+    assert complete_topic(roadmap, '1.2') == ['2.2']
+    assert ids(next_topics(roadmap)) == ['1.1', '2.2']
+    assert roadmap['phases'][1]['status'] == 'current'
+
+    assert complete_topic(roadmap, '1.1') == ['2.1']
+    assert roadmap['phases'][0]['status'] == 'completed'
+    assert roadmap['progress']['current_phase'] == 1
+    assert ids(next_topics(roadmap)) == ['2.1', '2.2']
+    assert roadmap['progress']['completion_percentage'] == 40
+
+    # Completing a topic twice changes nothing
+    assert complete_topic(roadmap, '1.1') == []
+    assert roadmap['progress']['completed_topics'] == 2
+
+
+def test_topic_completed_before_its_prerequisites():
+    roadmap = init_progress(make_roadmap())
+    assert complete_topic(roadmap, '2.3') == []
+    complete_topics(roadmap, ['1.1', '1.2'])
+    assert ids(next_topics(roadmap)) == ['2.1', '2.2']
+    # 2.3 was already done, so finishing 2.1 unlocks nothing
+    assert complete_topic(roadmap, '2.1') == []
+
+
+def test_unknown_topic():
+    with pytest.raises(KeyError):
+        complete_topics(make_roadmap(), ['9.9'])
+
+
+def test_roadmaps_without_prerequisites_lock_by_phase():
+    roadmap = {'phases': [{'topics': [{'id': '1.1'}, {'id': '1.2', 'status': 'completed'}]},
+                          {'topics': [{'id': '2.1'}]}]}
+    init_progress(roadmap)
+    assert roadmap['phases'][1]['topics'][0]['prerequisite_ids'] == ['1.1', '1.2']
+    assert ids(next_topics(roadmap)) == ['1.1']
+    assert complete_topic(roadmap, '1.1') == ['2.1']
+
+
+def test_stored_roadmap_resumes_from_its_frontier():
+    roadmap = init_progress(make_roadmap())
+    complete_topic(roadmap, '1.2')
+    stored = json.loads(json_codec.dumps(roadmap))
+    assert stored['progress']['frontier'] == ['1.1', '2.2']
+
+    assert complete_topics(stored, ['1.1']) == ['2.1']
+    assert stored['progress']['frontier'] == {'2.1', '2.2'}
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from question_bank import BankAppender, QuestionBank, bank_path, compile_bank, compile_source
+
+QUESTIONS = [
+    {'question': 'What does len([1, 2]) return?', 'options': {'a': '1', 'b': '2'}, 'answer': 'b'},
+    {'question': 'Which keyword defines a function?', 'options': {'a': 'def', 'b': 'fun', 'c': 'lambda'},
+     'answer': 'a', 'code': 'def f():\n    pass', 'tags': ['syntax', 'functions'], 'points': 2},
+    {'question': 'Is None falsy?', 'options': {'a': 'Yes', 'b': 'No'}, 'answer': 'a', 'explanation': '',
+     'meta': {'difficulty': -0.5, 'source': 'seed'}},
+]
+
+
+def expected(topic, index, question):
+    return dict(question, id=f"{topic}:{index}", topic=topic)
+
+
+def test_compiled_bank_round_trip(tmp_path):
+    path = bank_path('python', str(tmp_path))
+    assert compile_bank(QUESTIONS, path) == len(QUESTIONS)
+    bank = QuestionBank(path, 'python')
+    assert len(bank) == len(QUESTIONS)
+    assert list(bank) == [expected('python', i, question) for i, question in enumerate(QUESTIONS)]
+    assert bank[-1] == bank[2]
+    assert bank[1:] == [bank[1], bank[2]]
+    with pytest.raises(IndexError):
+        bank[3]
+
+
+def test_empty_bank(tmp_path):
+    path = bank_path('empty', str(tmp_path))
+    compile_bank([], path)
+    assert list(QuestionBank(path, 'empty')) == []
+
+
+def test_keys_with_dots_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        compile_bank([{'question.text': 'x'}], str(tmp_path / 'bad.qbank'))
+
+
+def test_not_a_bank(tmp_path):
+    path = tmp_path / 'bad.qbank'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        QuestionBank(str(path), 'bad')
+    with pytest.raises(ValueError):
+        BankAppender(str(path))
+
+
+def test_compile_source(tmp_path):
+    source = tmp_path / 'python_mcqs.json'
+    source.write_text(json.dumps(QUESTIONS), encoding='utf-8')
+    topic, path, count = compile_source(str(source), str(tmp_path / 'banks'))
+    assert (topic, count) == ('python', len(QUESTIONS))
+    assert QuestionBank(path, topic)[1] == expected('python', 1, QUESTIONS[1])
+
+
+def test_appended_questions_are_published_on_close(tmp_path):
+    path = bank_path('python', str(tmp_path))
+    compile_bank(QUESTIONS[:1], path)
+    bank = QuestionBank(path, 'python')
+
+    with BankAppender(path) as appender:
+        assert appender.add(QUESTIONS[1]) == 1
+        assert appender.add(QUESTIONS[2]) == 2
+        # Readers that mapped the bank earlier keep seeing the old questions
+        assert len(QuestionBank(path, 'python')) == 1
+
+    assert len(bank) == 1
+    reopened = QuestionBank(path, 'python')
+    assert list(reopened) == [expected('python', i, question) for i, question in enumerate(QUESTIONS)]
+
+
+def test_aborted_append_leaves_the_bank_unchanged(tmp_path):
+    path = bank_path('python', str(tmp_path))
+    compile_bank(QUESTIONS[:2], path)
+    with pytest.raises(RuntimeError):
+        with BankAppender(path) as appender:
+            appender.add(QUESTIONS[2])
+            raise RuntimeError('stop')
+    assert list(QuestionBank(path, 'python')) == [expected('python', i, question)
+                                                  for i, question in enumerate(QUESTIONS[:2])]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from question_bank import QuestionBank, bank_path, compile_bank
+from question_import import import_questions, validate_question
+
+EXISTING = [
+    {'question': 'Which built-in returns the number of items in a list?',
+     'options': {'a': 'len', 'b': 'size', 'c': 'count', 'd': 'length'}, 'answer': 'a'},
+]
+
+
+def question(text, answer='a'):
+    return {'question': text, 'options': {'a': 'Yes', 'b': 'No'}, 'answer': answer}
+
+
+@pytest.mark.parametrize('record, problem', [
+    (ValueError('invalid JSON'), 'invalid JSON'),
+    ([], 'not an object'),
+    ({'options': {'a': 'x', 'b': 'y'}, 'answer': 'a'}, 'question is missing'),
+    ({'question': 'Q', 'options': {'a': 'x'}, 'answer': 'a'}, 'at least 2'),
+    ({'question': 'Q', 'options': {'a': 'x', 'b': ' X '}, 'answer': 'a'}, 'repeat'),
+    ({'question': 'Q', 'options': {'a': 'x', 'b': ''}, 'answer': 'a'}, 'non-empty'),
+    ({'question': 'Q', 'options': {'a': 'x', 'b': 'y'}, 'answer': 'c'}, 'not one of the options'),
+    ({'question': 'Q', 'options': {'a': 'x', 'b': 'y'}, 'answer': 1}, 'option key'),
+    ({'question': 'Q', 'options': {'a': 'x', 'b': 'y'}, 'answer': 'a', 'code': 3}, 'code'),
+    ({'question': 'Q', 'options': {'a': 'x', 'b': 'y'}, 'answer': 'a', 'a.b': 1}, "'.'"),
+])
+def test_invalid_records(record, problem):
+    errors = validate_question(record)
+    assert any(problem in error for error in errors), errors
+
+
+def test_valid_record():
+    assert validate_question(question('Is a list mutable?')) == []
+
+
+def write_ndjson(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records) + 'not json\n', encoding='utf-8')
+    return str(path)
+
+
+def test_near_duplicates_are_skipped(tmp_path):
+    banks_dir = str(tmp_path / 'banks')
+    compile_bank(EXISTING, bank_path('python', banks_dir))
+    records = [
+        # Same question as the bank's with different punctuation and option order
+        {'question': 'Which built-in returns the number of items in a list',
+         'options': {'a': 'size', 'b': 'len', 'c': 'length', 'd': 'count'}, 'answer': 'b'},
+        question('Does a Python tuple support item assignment after it has been created?', 'b'),
+        question('Does a Python tuple support item assignment after it has been created?!', 'b'),
+        question('Can a Python dictionary use a list as one of its keys?', 'b'),
+        {'question': 'Missing options', 'answer': 'a'},
+    ]
+    messages = []
+    counts = import_questions('python', [write_ndjson(tmp_path / 'new.ndjson', records)],
+                              banks_dir=banks_dir, report=messages.append)
+
+    assert counts == {'accepted': 2, 'invalid': 2, 'duplicates': 2}
+    assert any('near-duplicate of python:0' in message for message in messages)
+    assert any('near-duplicate of python:1' in message for message in messages)
+    bank = QuestionBank(bank_path('python', banks_dir), 'python')
+    assert [item['question'] for item in bank] == [EXISTING[0]['question'], records[1]['question'],
+                                                   records[3]['question']]
+
+
+def test_csv_import_compiles_a_missing_bank(tmp_path):
+    (tmp_path / 'cpp_mcqs.json').write_text(json.dumps(EXISTING), encoding='utf-8')
+    source = tmp_path / 'new.csv'
+    source.write_text('question,option_a,option_b,answer,code\n'
+                      'What does this print?,1,2,b,"std::cout << 1 + 1;"\n', encoding='utf-8')
+    banks_dir = str(tmp_path / 'banks')
+
+    counts = import_questions('cpp', [str(source)], banks_dir=banks_dir, source_dir=str(tmp_path),
+                              report=lambda message: None)
+    assert counts == {'accepted': 1, 'invalid': 0, 'duplicates': 0}
+    bank = QuestionBank(bank_path('cpp', banks_dir), 'cpp')
+    assert len(bank) == 2
+    assert bank[1]['options'] == {'a': '1', 'b': '2'}
+    assert bank[1]['code'] == 'std::cout << 1 + 1;'
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    banks_dir = tmp_path / 'banks'
+    source = write_ndjson(tmp_path / 'new.ndjson', [question('Is a list mutable?')] * 2)
+    counts = import_questions('python', [source], dry_run=True, banks_dir=str(banks_dir),
+                              source_dir=str(tmp_path), report=lambda message: None)
+    assert counts == {'accepted': 1, 'invalid': 1, 'duplicates': 1}
+    assert not banks_dir.exists()
@@ -0,0 +1,89 @@
+import pytest
+
+import roadmap_history
+from roadmap_history import SNAPSHOT_INTERVAL, RoadmapVersionConflict
+
+
+def make_roadmap(weeks=8):
+    return {
+        'timeline': {'total_weeks': weeks},
+        'phases': [{'id': number, 'name': f'Phase {number}',
+                    'topics': [{'id': f'{number}.{topic}', 'title': f'Topic {number}.{topic} ' + 'x' * 200}
+                               for topic in range(1, 6)]}
+                   for number in range(1, 5)]
+    }
+
+
+def versions(db, user_id):
+    return {row['version']: row for row in db.execute(
+        'SELECT version, base_version, chain_length FROM roadmap_versions WHERE user_id = ?', (user_id,))}
+
+
+def test_small_edits_are_stored_as_deltas_and_rebuilt(db, user_id):
+    saved = []
+    for weeks in range(1, SNAPSHOT_INTERVAL + 3):
+        roadmap = make_roadmap(weeks)
+        roadmap_history.save_roadmap(db, user_id, roadmap, 'draft')
+        saved.append(roadmap)
+    db.commit()
+
+    rows = versions(db, user_id)
+    assert rows[1]['base_version'] is None
+    assert rows[2]['base_version'] == 1
+    # The chain is cut with a new snapshot after SNAPSHOT_INTERVAL - 1 deltas
+    assert rows[SNAPSHOT_INTERVAL + 1]['base_version'] is None
+    assert max(row['chain_length'] for row in rows.values()) == SNAPSHOT_INTERVAL - 1
+
+    for version, roadmap in enumerate(saved, start=1):
+        assert roadmap_history.get_version(db, user_id, version) == roadmap
+    assert roadmap_history.get_version(db, user_id, len(saved) + 1) is None
+
+
+def test_patch_applies_to_the_base_version(db, user_id):
+    base_version = roadmap_history.save_roadmap(db, user_id, make_roadmap(), 'draft')
+    version = roadmap_history.patch_roadmap(db, user_id, [
+        {'op': 'replace', 'path': '/timeline/total_weeks', 'value': 12},
+        {'op': 'move', 'from': '/phases/0/topics/4', 'path': '/phases/0/topics/0'}
+    ], base_version, 'accepted')
+    db.commit()
+
+    expected = make_roadmap(12)
+    topics = expected['phases'][0]['topics']
+    topics.insert(0, topics.pop())
+    assert roadmap_history.get_version(db, user_id, version) == expected
+    heads = roadmap_history.load_heads(db, user_id)
+    assert heads['accepted']['version'] == version
+    assert heads['draft']['version'] == base_version
+
+
+def test_patch_on_a_stale_version_conflicts(db, user_id):
+    first = roadmap_history.save_roadmap(db, user_id, make_roadmap(), 'draft')
+    current = roadmap_history.save_roadmap(db, user_id, make_roadmap(10), 'draft')
+    with pytest.raises(RoadmapVersionConflict) as conflict:
+        roadmap_history.patch_roadmap(db, user_id, [], first, 'draft')
+    assert conflict.value.current_version == current
+
+
+def test_patch_without_a_roadmap(db, user_id):
+    assert roadmap_history.patch_roadmap(db, user_id, [], 1, 'draft') is None
+
+
+def test_save_endpoint_returns_409_for_a_stale_base_version(client, user_id):
+    version = client.post('/save-roadmap-draft', json={'roadmap': make_roadmap()}).get_json()['version']
+    patch = [{'op': 'replace', 'path': '/timeline/total_weeks', 'value': 9}]
+
+    response = client.post('/save-roadmap-draft', json={'patch': patch, 'base_version': version})
+    assert response.status_code == 200
+    new_version = response.get_json()['version']
+
+    response = client.post('/save-roadmap-draft', json={'patch': patch, 'base_version': version})
+    assert response.status_code == 409
+    assert response.get_json()['version'] == new_version
+
+
+def test_save_endpoint_rejects_bad_patches(client):
+    version = client.post('/save-roadmap-draft', json={'roadmap': make_roadmap()}).get_json()['version']
+    response = client.post('/save-roadmap-draft', json={'patch': [{'op': 'remove', 'path': '/phases/²'}],
+                                                        'base_version': version})
+    assert response.status_code == 422
+    assert client.post('/save-roadmap-draft', json=[1]).status_code == 400
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from scheduler import DATE_FORMAT, WeeklyScheduler, budget_for_weeks, count_weeks, current_week, reschedule
+
+
+def test_scheduler_packs_topics_into_weeks():
+    scheduler = WeeklyScheduler(10)
+    assert scheduler.place(4) == (1, 1)
+    assert scheduler.place(8) == (1, 2)
+    assert scheduler.place(0) == (2, 2)
+    scheduler.start_phase()
+    assert scheduler.place(10) == (3, 3)
+    assert scheduler.last_week == 3
+
+
+def test_count_weeks_starts_each_phase_on_a_new_week():
+    assert count_weeks([[5], [5]], 10) == 2
+    assert count_weeks([[5, 5], [5]], 10) == 2
+    assert count_weeks([[5, 6], [5]], 10) == 3
+
+
+def test_budget_is_the_smallest_that_fits():
+    phase_hours = [[10, 10], [14, 14, 14], [16], [20, 20]]
+    for weeks in (4, 6, 8, 12):
+        budget = budget_for_weeks(phase_hours, weeks)
+        assert count_weeks(phase_hours, budget) <= weeks
+        assert budget == 1 or count_weeks(phase_hours, budget - 1) > weeks
+
+
+def test_budget_edge_cases():
+    assert budget_for_weeks([[], []], 8) == 10
+    # Fewer weeks than phases: each phase gets one week
+    assert count_weeks([[10], [10], [10]], budget_for_weeks([[10], [10], [10]], 1)) == 3
+    assert budget_for_weeks([[10]], 0) == 10
+
+
+def make_roadmap(start_date):
+    topics = [{'id': f'1.{number}', 'estimated_hours': 10, 'start_week': number, 'end_week': number}
+              for number in range(1, 5)]
+    return {
+        'timeline': {'start_date': start_date.strftime(DATE_FORMAT), 'total_weeks': 4},
+        'schedule': {'weekly_hours': 10},
+        'phases': [{'topics': topics, 'start_week': 1, 'end_week': 4, 'weeks': 4}]
+    }
+
+
+def test_current_week():
+    roadmap = make_roadmap(datetime(2026, 1, 1))
+    assert current_week(roadmap, datetime(2026, 1, 1)) == 1
+    assert current_week(roadmap, datetime(2026, 1, 15)) == 3
+    assert current_week(roadmap, datetime(2025, 12, 1)) == 1
+    assert current_week({'timeline': {}}) == 1
+
+
+def test_reschedule_only_moves_unfinished_topics():
+    roadmap = make_roadmap(datetime(2026, 1, 1))
+    roadmap['phases'][0]['topics'][0]['status'] = 'completed'
+
+    # On schedule: nothing changes
+    assert reschedule(roadmap, 2) == 0
+
+    # Two weeks behind: the remaining three topics start in week 4
+    assert reschedule(roadmap, 4) == 3
+    topics = roadmap['phases'][0]['topics']
+    assert [(topic['start_week'], topic['end_week']) for topic in topics] == [(1, 1), (4, 4), (5, 5), (6, 6)]
+    assert roadmap['phases'][0]['end_week'] == 6
+    assert roadmap['timeline']['total_weeks'] == 6
+
+
+def test_reschedule_without_a_schedule():
+    roadmap = make_roadmap(datetime(2026, 1, 1))
+    del roadmap['schedule']
+    assert reschedule(roadmap, 5) == 0
@@ -0,0 +1,332 @@
+"""
+Compiled roadmap.sh topic graphs
+roadmap.sh JSON exports (nodes and edges) are compiled into a topic DAG with
+prerequisite edges and saved as a small binary file the generators load at
+start-up in place of their hand-typed topic lists.
+"""
+
+import array
+import heapq
+import json
+import logging
+import os
+import struct
+from functools import lru_cache
+
+from array_codec import from_bytes, to_bytes
+
+try:
+    import ijson
+except ImportError:  # optional: streams large exports instead of loading them whole
+    ijson = None
+
+GRAPHS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'roadmap_graphs')
+
+TOPIC = 0
+SUBTOPIC = 1
+NODE_KINDS = {'topic': TOPIC, 'subtopic': SUBTOPIC}
+
+# magic, format version, node count, edge count, metadata length, ids length, labels length
+_HEADER = struct.Struct('<4sHIIIII')
+_MAGIC = b'TDAG'
+_FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def _uint_array(values=()):
+    """Array of 32-bit unsigned ints"""
+    return array.array('I', values)
+
+
+class TopicDAG:
+    """Topic graph in topological order with prerequisites in CSR form
+
+    Node i only depends on nodes with a smaller index, so walking the nodes
+    in order always visits prerequisites first. Prerequisites of node i are
+    prereq_indices[prereq_offsets[i]:prereq_offsets[i + 1]].
+    """
+
+    def __init__(self, ids, labels, kinds, parents, prereq_offsets, prereq_indices, meta=None):
+        self.ids = ids
+        self.labels = labels
+        self.kinds = kinds
+        self.parents = parents
+        self.prereq_offsets = prereq_offsets
+        self.prereq_indices = prereq_indices
+        self.meta = meta or {}
+        self._label_index = None
+        self._dependents = None
+        self._children = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.prereq_indices)
+
+    def prerequisites(self, node):
+        """Indices of the direct prerequisites of a node"""
+        return self.prereq_indices[self.prereq_offsets[node]:self.prereq_offsets[node + 1]]
+
+    def dependents(self, node):
+        """Indices of the nodes that directly require a node"""
+        if self._dependents is None:
+            counts = [0] * (len(self) + 1)
+            for target in self.prereq_indices:
+                counts[target + 1] += 1
+            for i in range(len(self)):
+                counts[i + 1] += counts[i]
+            offsets = _uint_array(counts)
+            indices = _uint_array([0] * self.edge_count)
+            fill = counts[:-1]
+            for node_index in range(len(self)):
+                for prerequisite in self.prerequisites(node_index):
+                    indices[fill[prerequisite]] = node_index
+                    fill[prerequisite] += 1
+            self._dependents = (offsets, indices)
+        offsets, indices = self._dependents
+        return indices[offsets[node]:offsets[node + 1]]
+
+    def topics(self):
+        """Indices of the main topics in learning order"""
+        return [i for i, kind in enumerate(self.kinds) if kind == TOPIC]
+
+    def subtopics(self, node):
+        """Indices of the subtopics attached to a topic"""
+        if self._children is None:
+            children = {}
+            for i, parent in enumerate(self.parents):
+                if parent >= 0:
+                    children.setdefault(parent, []).append(i)
+            self._children = children
+        return self._children.get(node, [])
+
+    def index_of(self, label):
+        """Index of the first node with a label, or None"""
+        if self._label_index is None:
+            self._label_index = {}
+            for i, node_label in enumerate(self.labels):
+                self._label_index.setdefault(node_label, i)
+        return self._label_index.get(label)
+
+    def phase_topics(self, phases):
+        """Split the main topics into consecutive, evenly sized phases"""
+        topics = [self.labels[i] for i in self.topics()]
+        size, extra = divmod(len(topics), phases)
+        groups = []
+        start = 0
+        for phase in range(phases):
+            end = start + size + (1 if phase < extra else 0)
+            groups.append(topics[start:end])
+            start = end
+        return groups
+
+    def save(self, path):
+        """Write the graph in the compiled binary format"""
+        meta = json.dumps(self.meta).encode('utf-8')
+        ids = '\0'.join(self.ids).encode('utf-8')
+        labels = '\0'.join(self.labels).encode('utf-8')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(self), self.edge_count,
+                                 len(meta), len(ids), len(labels)))
+            f.write(bytes(self.kinds))
+            f.write(to_bytes(self.parents))
+            f.write(to_bytes(self.prereq_offsets))
+            f.write(to_bytes(self.prereq_indices))
+            f.write(meta)
+            f.write(ids)
+            f.write(labels)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a graph written by save()"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, nodes, edges, meta_len, ids_len, labels_len = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"Not a compiled topic graph: {path}")
+
+        position = _HEADER.size
+        sections = []
+        for typecode, size in (('B', nodes), ('i', nodes * 4), ('I', (nodes + 1) * 4), ('I', edges * 4)):
+            sections.append(from_bytes(typecode, data[position:position + size]))
+            position += size
+        kinds, parents, prereq_offsets, prereq_indices = sections
+
+        strings = []
+        for size in (meta_len, ids_len, labels_len):
+            strings.append(data[position:position + size].decode('utf-8'))
+            position += size
+        meta, ids, labels = strings
+
+        return cls(ids.split('\0') if nodes else [], labels.split('\0') if nodes else [], kinds, parents,
+                   prereq_offsets, prereq_indices, json.loads(meta))
+
+
+def iter_roadmap_items(path):
+    """Yield ('nodes', node) and ('edges', edge) from a roadmap.sh export
+
+    With ijson installed the file is streamed, so only one node or edge is
+    in memory at a time; otherwise it is loaded with the json module.
+    """
+    if ijson is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for key in ('nodes', 'edges'):
+            for item in data.get(key) or []:
+                yield key, item
+        return
+
+    wanted = {'nodes.item': 'nodes', 'edges.item': 'edges'}
+    with open(path, 'rb') as f:
+        parser = ijson.parse(f, use_float=True)
+        for prefix, event, value in parser:
+            if event != 'start_map' or prefix not in wanted:
+                continue
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            for item_prefix, item_event, item_value in parser:
+                if item_prefix == prefix and item_event == 'end_map':
+                    break
+                builder.event(item_event, item_value)
+            yield wanted[prefix], builder.value
+
+
+def compile_topic_dag(items, meta=None):
+    """Compile roadmap.sh nodes and edges into a TopicDAG
+
+    Only topic and subtopic nodes are kept. roadmap.sh edges are drawn
+    lines rather than dependencies, so they are oriented: a topic always
+    comes before the subtopics attached to it, and between nodes of the
+    same kind the one placed higher (then further left) on the roadmap
+    comes first. This makes every graph acyclic.
+    """
+    nodes = {}
+    raw_edges = []
+    for key, item in items:
+        if key == 'nodes':
+            kind = NODE_KINDS.get(item.get('type'))
+            label = ((item.get('data') or {}).get('label') or '').strip()
+            if kind is None or not label or 'id' not in item:
+                continue
+            position = item.get('position') or {}
+            nodes[str(item['id'])] = (kind, label, position.get('y') or 0, position.get('x') or 0)
+        elif key == 'edges':
+            raw_edges.append((str(item.get('source')), str(item.get('target'))))
+
+    def placement(node_id):
+        _, _, y, x = nodes[node_id]
+        return (y, x, node_id)
+
+    prerequisites = {node_id: set() for node_id in nodes}
+    for source, target in raw_edges:
+        if source == target or source not in nodes or target not in nodes:
+            continue
+        source_kind, target_kind = nodes[source][0], nodes[target][0]
+        if source_kind != target_kind:
+            before, after = (source, target) if source_kind == TOPIC else (target, source)
+        else:
+            before, after = sorted((source, target), key=placement)
+        prerequisites[after].add(before)
+
+    # Kahn's algorithm, releasing ready nodes in roadmap reading order
+    remaining = {node_id: len(prereqs) for node_id, prereqs in prerequisites.items()}
+    dependents = {node_id: [] for node_id in nodes}
+    for node_id, prereqs in prerequisites.items():
+        for prerequisite in prereqs:
+            dependents[prerequisite].append(node_id)
+    ready = [placement(node_id) for node_id, count in remaining.items() if count == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        node_id = heapq.heappop(ready)[2]
+        order.append(node_id)
+        for dependent in dependents[node_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                heapq.heappush(ready, placement(dependent))
+
+    index = {node_id: i for i, node_id in enumerate(order)}
+    kinds = bytearray()
+    parents = array.array('i')
+    prereq_offsets = _uint_array([0])
+    prereq_indices = _uint_array()
+    for node_id in order:
+        kind = nodes[node_id][0]
+        prereqs = sorted(index[prerequisite] for prerequisite in prerequisites[node_id])
+        parent = -1
+        if kind == SUBTOPIC:
+            topic_parents = [i for i in prereqs if kinds[i] == TOPIC]
+            if topic_parents:
+                parent = topic_parents[-1]
+            elif prereqs:
+                parent = parents[prereqs[-1]]
+        kinds.append(kind)
+        parents.append(parent)
+        prereq_indices.extend(prereqs)
+        prereq_offsets.append(len(prereq_indices))
+
+    return TopicDAG(order, [nodes[node_id][1] for node_id in order], kinds, parents,
+                    prereq_offsets, prereq_indices, meta)
+
+
+def ingest_roadmap(path, slug=None):
+    """Compile a roadmap.sh export and save it under GRAPHS_DIR
+
+    The slug defaults to the file name, matching roadmap.sh's
+    src/data/roadmaps/<slug>/<slug>.json layout. Returns (dag, output_path).
+    """
+    slug = slug or os.path.splitext(os.path.basename(path))[0]
+    dag = compile_topic_dag(iter_roadmap_items(path), meta={'slug': slug, 'source': f"https://roadmap.sh/{slug}"})
+    output_path = graph_path(slug)
+    dag.save(output_path)
+    load_topic_dag.cache_clear()
+    return dag, output_path
+
+
+def graph_path(slug):
+    """Path of the compiled graph for a roadmap.sh slug"""
+    return os.path.join(GRAPHS_DIR, f"{slug}.dag")
+
+
+@lru_cache(maxsize=None)
+def load_topic_dag(slug):
+    """Load the compiled graph for a roadmap.sh slug, or None if not ingested"""
+    path = graph_path(slug)
+    if not os.path.exists(path):
+        return None
+    try:
+        return TopicDAG.load(path)
+    except (OSError, ValueError, struct.error):
+        logger.exception('Error loading topic graph %s', path)
+        return None
+
+
+def roadmap_slug(url):
+    """roadmap.sh slug from a roadmap URL"""
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+def apply_topic_graph(template, url):
+    """Return (template, topic_graph) for the roadmap.sh roadmap at url
+
+    When its graph has been ingested with parse_roadmap.py, the graph's
+    topics replace the template's foundation, core and advanced lists;
+    otherwise the template is returned unchanged and topic_graph is None.
+    """
+    topic_graph = load_topic_dag(roadmap_slug(url))
+    if topic_graph is None or not topic_graph.topics():
+        return template, None
+
+    core_key = next(key for key in template if key.startswith('core_'))
+    foundations, core, advanced = topic_graph.phase_topics(3)
+    template = dict(template, foundations=foundations, advanced=advanced)
+    template[core_key] = core
+    return template, topic_graph